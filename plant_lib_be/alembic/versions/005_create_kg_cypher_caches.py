@@ -0,0 +1,29 @@
+# versions/005_create_kg_cypher_caches.py
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+# ---- Alembic identifiers ----
+revision = "005_create_kg_cypher_caches"
+down_revision = "004_create_kg_pipeline_tables"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "kg_cypher_caches",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("cache_key", sa.String(length=64), nullable=False, unique=True, index=True),
+        sa.Column("schema_fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("clarification_key", sa.Text(), nullable=False),
+        sa.Column("cypher_result", pg.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("hit_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("last_accessed", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("kg_cypher_caches")
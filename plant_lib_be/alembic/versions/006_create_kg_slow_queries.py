@@ -0,0 +1,31 @@
+# versions/006_create_kg_slow_queries.py
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+# ---- Alembic identifiers ----
+revision = "006_create_kg_slow_queries"
+down_revision = "005_create_kg_cypher_caches"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "kg_slow_queries",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("chat_id", sa.String(length=36), nullable=True, index=True),
+        sa.Column("query_kind", sa.String(length=20), nullable=False),
+        sa.Column("query_hash", sa.String(length=64), nullable=False, index=True),
+        sa.Column("query_text", sa.Text(), nullable=False),
+        sa.Column("params", pg.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("elapsed_ms", sa.Float(), nullable=False),
+        sa.Column("rows", sa.Integer(), nullable=True),
+        sa.Column("db_hits", sa.BigInteger(), nullable=True),
+        sa.Column("plan", pg.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False, index=True),
+    )
+
+
+def downgrade():
+    op.drop_table("kg_slow_queries")
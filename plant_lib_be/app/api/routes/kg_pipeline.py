@@ -1,6 +1,8 @@
+import json
 from functools import lru_cache
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
 
 from app.schemas.kg import (
     KGChatSessionCreate,
@@ -10,6 +12,7 @@ from app.schemas.kg import (
     KGSessionCreate,
     KGSessionOut,
     KGSessionShort,
+    KGSlowQueryOut,
     KGUserCreate,
     KGUserOut,
 )
@@ -122,11 +125,49 @@ def get_chat_history(session_token: str, limit: int = 50, svc: KGPipelineService
     return {"items": items}
 
 
+@router.get("/admin/slow-queries", response_model=KGSlowQueryOut)
+def list_slow_queries(
+    limit: int = 20,
+    hours: int = 24,
+    admin_token: str = Header(..., alias="X-Admin-Token"),
+    svc: KGPipelineService = Depends(get_kg_service),
+):
+    # Top truy vấn Neo4j chậm theo tổng thời gian; token qua header X-Admin-Token (KG_SLOW_QUERY__ADMIN_TOKEN)
+    offenders = svc.list_slow_queries(admin_token=admin_token, limit=limit, hours=hours)
+    for item in offenders:
+        item["last_seen"] = item["last_seen"].isoformat() if item.get("last_seen") else None
+    return {"items": offenders}
+
+
 @router.post("/query", response_model=KGQueryResponse)
-def run_kg_query(payload: KGQueryRequest, svc: KGPipelineService = Depends(get_kg_service)):
-    return svc.process_query(
+async def run_kg_query(payload: KGQueryRequest, svc: KGPipelineService = Depends(get_kg_service)):
+    return await svc.aprocess_query(
+        session_token=payload.session_token,
+        query=payload.query,
+        image_path=payload.image_path,
+        use_cache=payload.use_cache,
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/query/stream")
+async def stream_kg_query(payload: KGQueryRequest, svc: KGPipelineService = Depends(get_kg_service)):
+    events = svc.astream_query(
         session_token=payload.session_token,
         query=payload.query,
         image_path=payload.image_path,
         use_cache=payload.use_cache,
     )
+
+    async def event_stream():
+        async for event, data in events:
+            yield _sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -4,5 +4,6 @@ class Settings(BaseSettings):
     DATABASE_URL: str = (
         "postgresql+psycopg2://plantlib_user:plantlib123@db:5432/plant_lib"
     )
+    KG_ENABLED: bool = True
 
 settings = Settings()
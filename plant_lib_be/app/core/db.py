@@ -1,8 +1,10 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from .config import settings
+from .metrics import register_engine_pool
 
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, future=True)
+register_engine_pool("app", engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 # FastAPI dependency để lấy session
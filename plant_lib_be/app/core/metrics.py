@@ -0,0 +1,191 @@
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+STAGE_LATENCY = Histogram(
+    "kg_stage_duration_seconds",
+    "Wall time spent in each KG pipeline stage",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+QUERY_CACHE_REQUESTS = Counter(
+    "kg_query_cache_requests_total",
+    "KG query cache lookups by result",
+    ["result"],
+)
+
+CLARIFIER_REQUESTS = Counter(
+    "kg_clarifier_requests_total",
+    "Query clarifications by path (rule-based fast path or LLM)",
+    ["path"],
+)
+
+COALESCED_QUERIES = Counter(
+    "kg_coalesced_queries_total",
+    "KG queries answered by joining an identical in-flight computation",
+)
+
+CYPHER_QUERY_TEXT_REPEATS = Counter(
+    "kg_cypher_query_text_repeats_total",
+    "Cypher executions whose normalized query text this worker already sent recently (repeat) or not (new)",
+    ["result"],
+)
+
+CYPHER_CACHE_REQUESTS = Counter(
+    "kg_cypher_cache_requests_total",
+    "Generated-Cypher cache lookups by tier that answered (memory, postgres) or miss",
+    ["tier"],
+)
+
+RETRIEVAL_CACHE_REQUESTS = Counter(
+    "kg_retrieval_cache_requests_total",
+    "Neo4j retrieval result cache lookups by result",
+    ["result"],
+)
+
+RETRIEVAL_CACHE_BYTES = Gauge(
+    "kg_retrieval_cache_bytes",
+    "Approximate serialized size of cached Neo4j retrieval results",
+)
+
+RETRIEVAL_CACHE_ENTRIES = Gauge(
+    "kg_retrieval_cache_entries",
+    "Neo4j retrieval results held in the cache",
+)
+
+EMBEDDING_CACHE_REQUESTS = Counter(
+    "kg_embedding_cache_requests_total",
+    "Text embedding cache lookups by result",
+    ["result"],
+)
+
+EMBEDDING_BATCH_SIZE = Histogram(
+    "kg_embedding_batch_size",
+    "Items per micro-batched embedding forward pass",
+    ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+PIPELINE_COMPONENT_INIT_SECONDS = Gauge(
+    "kg_pipeline_component_init_seconds",
+    "Time taken to initialize each KG pipeline component during warmup",
+    ["component"],
+)
+
+NEO4J_QUERY_SECONDS = Histogram(
+    "kg_neo4j_query_duration_seconds",
+    "Neo4j transaction time including result streaming, by access mode",
+    ["access"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+NEO4J_ROWS = Histogram(
+    "kg_neo4j_rows_returned",
+    "Rows fetched per Neo4j query",
+    ["access"],
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 1000, 5000),
+)
+
+NEO4J_TRUNCATED_QUERIES = Counter(
+    "kg_neo4j_truncated_queries_total",
+    "Neo4j queries stopped early at the row limit",
+)
+
+NEO4J_SLOW_QUERIES = Counter(
+    "kg_neo4j_slow_queries_total",
+    "Retrieval queries over the slow-query threshold, by query kind and whether a PROFILE was captured",
+    ["kind", "profiled"],
+)
+
+WRITE_BEHIND_ROWS = Counter(
+    "kg_write_behind_rows_total",
+    "Rows flushed by the KG write-behind writer",
+    ["kind"],
+)
+
+WRITE_BEHIND_DROPPED_ROWS = Counter(
+    "kg_write_behind_dropped_rows_total",
+    "Rows the KG write-behind writer gave up on after the batch and the single-row retry both failed",
+    ["kind"],
+)
+
+WRITE_BEHIND_SYNC_FALLBACKS = Counter(
+    "kg_write_behind_sync_fallbacks_total",
+    "Writes done synchronously because the write-behind queue was full",
+    ["kind"],
+)
+
+WRITE_BEHIND_QUEUE_DEPTH = Gauge(
+    "kg_write_behind_queue_depth",
+    "Items waiting in the KG write-behind queue",
+)
+
+
+class EnginePoolCollector:
+    def __init__(self):
+        self.engines = {}
+
+    def register(self, name: str, engine):
+        self.engines[name] = engine
+
+    def collect(self):
+        gauges = {
+            "size": GaugeMetricFamily("db_pool_size", "Configured pool size", labels=["engine"]),
+            "checked_out": GaugeMetricFamily("db_pool_checked_out", "Connections in use", labels=["engine"]),
+            "checked_in": GaugeMetricFamily("db_pool_checked_in", "Idle connections in the pool", labels=["engine"]),
+            "overflow": GaugeMetricFamily("db_pool_overflow", "Connections above pool size", labels=["engine"]),
+        }
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            for key, method in (
+                ("size", "size"),
+                ("checked_out", "checkedout"),
+                ("checked_in", "checkedin"),
+                ("overflow", "overflow"),
+            ):
+                if hasattr(pool, method):
+                    gauges[key].add_metric([name], getattr(pool, method)())
+        return list(gauges.values())
+
+
+class Neo4jPoolCollector:
+    def __init__(self):
+        self.drivers = {}
+
+    def register(self, name: str, driver, max_size: int):
+        self.drivers[name] = (driver, max_size)
+
+    def collect(self):
+        gauges = {
+            "size": GaugeMetricFamily("kg_neo4j_pool_max_size", "Configured Neo4j pool size", labels=["driver"]),
+            "in_use": GaugeMetricFamily("kg_neo4j_pool_in_use", "Neo4j connections in use", labels=["driver"]),
+            "idle": GaugeMetricFamily("kg_neo4j_pool_idle", "Idle Neo4j connections", labels=["driver"]),
+        }
+        for name, (driver, max_size) in self.drivers.items():
+            gauges["size"].add_metric([name], max_size)
+            # The driver has no public pool stats; read its pool when the internals are available.
+            connections = getattr(getattr(driver, "_pool", None), "connections", None)
+            if connections is None:
+                continue
+            try:
+                open_connections = [conn for queue in list(connections.values()) for conn in list(queue)]
+            except RuntimeError:
+                continue
+            in_use = sum(1 for conn in open_connections if getattr(conn, "in_use", False))
+            gauges["in_use"].add_metric([name], in_use)
+            gauges["idle"].add_metric([name], len(open_connections) - in_use)
+        return list(gauges.values())
+
+
+pool_collector = EnginePoolCollector()
+REGISTRY.register(pool_collector)
+neo4j_pool_collector = Neo4jPoolCollector()
+REGISTRY.register(neo4j_pool_collector)
+
+
+def register_engine_pool(name: str, engine):
+    pool_collector.register(name, engine)
+
+
+def register_neo4j_driver(name: str, driver, max_size: int):
+    neo4j_pool_collector.register(name, driver, max_size)
@@ -1,3 +1,17 @@
-from app.kg_pipeline.bootstrap import get_pipeline_bundle
+from app.kg_pipeline.bootstrap import (
+    PipelineWarmingUp,
+    get_pipeline_bundle,
+    get_ready_bundle,
+    preload_embedders,
+    readiness,
+    start_warmup,
+)
 
-__all__ = ["get_pipeline_bundle"]
+__all__ = [
+    "PipelineWarmingUp",
+    "get_pipeline_bundle",
+    "get_ready_bundle",
+    "preload_embedders",
+    "readiness",
+    "start_warmup",
+]
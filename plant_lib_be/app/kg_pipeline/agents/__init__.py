@@ -1,11 +1,27 @@
 from app.kg_pipeline.agents.clarifier import QueryClarifier
+from app.kg_pipeline.agents.cypher_cache import CypherCache
 from app.kg_pipeline.agents.cypher_generator import CypherGenerator
+from app.kg_pipeline.agents.cypher_templates import CypherTemplate, CypherTemplateLibrary
+from app.kg_pipeline.agents.fast_path import EntityDictionary, RuleBasedClarifier
+from app.kg_pipeline.agents.intent_classifier import IntentClassifier
+from app.kg_pipeline.agents.planner import QueryPlanner
+from app.kg_pipeline.agents.retrieval_cache import RetrievalCache
 from app.kg_pipeline.agents.retriever import InformationRetriever
+from app.kg_pipeline.agents.slow_query_log import SlowQueryLog
 from app.kg_pipeline.agents.synthesizer import AnswerSynthesizer
 
 __all__ = [
     "QueryClarifier",
+    "QueryPlanner",
+    "CypherCache",
     "CypherGenerator",
+    "CypherTemplate",
+    "CypherTemplateLibrary",
+    "EntityDictionary",
+    "RuleBasedClarifier",
     "InformationRetriever",
+    "RetrievalCache",
+    "SlowQueryLog",
+    "IntentClassifier",
     "AnswerSynthesizer",
 ]
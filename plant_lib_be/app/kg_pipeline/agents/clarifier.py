@@ -1,18 +1,36 @@
+import asyncio
 import json
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from langchain_core.prompts.prompt import PromptTemplate
 
+from app.core.metrics import CLARIFIER_REQUESTS
 from app.kg_pipeline.config.logging_config import get_logger
-from app.kg_pipeline.utils.retry import retry_with_backoff
+from app.kg_pipeline.utils.retry import async_retry_with_backoff, retry_with_backoff
 
 logger = get_logger(__name__)
 
 
+def image_matches(image_results: List[Dict[str, Any]]) -> List[str]:
+    return [f"{r['disease_name']} ({r['crop_name']})" for r in image_results]
+
+
+def image_context(image_results: List[Dict[str, Any]]) -> str:
+    return ", ".join(image_matches(image_results))
+
+
+def apply_image_results(clarification: Dict[str, Any], image_results: List[Dict[str, Any]]):
+    if image_results:
+        clarification["image_matches"] = image_matches(image_results)
+        clarification["clarified_query"] += f"\nDựa trên hình ảnh, có thể là: {image_context(image_results)}"
+        logger.info(f"Found {len(image_results)} image matches")
+
+
 class QueryClarifier:
-    def __init__(self, llm, translator):
+    def __init__(self, llm, translator, fast_path=None):
         self.llm = llm
         self.translator = translator
+        self.fast_path = fast_path
         self.prompt = PromptTemplate(
             input_variables=["query", "language"],
             template="""You are a query clarifier for plant disease database.
@@ -54,30 +72,15 @@ class QueryClarifier:
         )
         logger.info("Query clarifier initialized")
 
-    @retry_with_backoff(max_retries=3)
-    def clarify(self, query: str) -> Dict[str, Any]:
-        translated_query, detected_lang = self.translator.process_query(query)
-        prompt_text = self.prompt.format(query=translated_query, language=detected_lang)
+    def _parse_response(self, response_text: str, query: str, translated_query: str, detected_lang: str) -> Dict[str, Any]:
+        response_text = response_text.strip()
+        if response_text.startswith("```"):
+            response_text = response_text.split("```")[1]
+            if response_text.startswith("json"):
+                response_text = response_text[4:]
 
         try:
-            response = self.llm.invoke(prompt_text)
-            response_text = response.content.strip()
-
-            if response_text.startswith("```"):
-                response_text = response_text.split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:]
-
             clarification = json.loads(response_text)
-            clarification["original_query"] = query
-            clarification["translated_query"] = translated_query
-            clarification["language"] = detected_lang
-
-            logger.info(
-                f"Query clarified: intent={clarification['intent']}, strategy={clarification['search_strategy']}"
-            )
-            return clarification
-
         except json.JSONDecodeError as exc:
             logger.warning(f"Failed to parse clarification JSON: {exc}")
             return {
@@ -89,3 +92,54 @@ class QueryClarifier:
                 "translated_query": translated_query,
                 "language": detected_lang,
             }
+
+        clarification["original_query"] = query
+        clarification["translated_query"] = translated_query
+        clarification["language"] = detected_lang
+
+        logger.info(
+            f"Query clarified: intent={clarification['intent']}, strategy={clarification['search_strategy']}"
+        )
+        return clarification
+
+    def try_fast_path(self, query: str) -> Dict[str, Any] | None:
+        if self.fast_path is None:
+            return None
+        detected_lang = self.translator.detect_language(query)
+        if detected_lang != self.translator.data_language:
+            logger.debug(f"Skipping fast path for {detected_lang} query")
+            CLARIFIER_REQUESTS.labels("llm").inc()
+            return None
+        clarification = self.fast_path.clarify(query)
+        CLARIFIER_REQUESTS.labels("fast" if clarification else "llm").inc()
+        return clarification
+
+    def fast_path_stats(self, clarification: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "fast_path": bool(clarification.get("fast_path")),
+            "fast_path_hit_rate": self.fast_path.hit_rate if self.fast_path is not None else 0.0,
+        }
+
+    @retry_with_backoff(max_retries=3)
+    def clarify(self, query: str) -> Dict[str, Any]:
+        clarification = self.try_fast_path(query)
+        if clarification:
+            return clarification
+
+        translated_query, detected_lang = self.translator.process_query(query)
+        prompt_text = self.prompt.format(query=translated_query, language=detected_lang)
+
+        response = self.llm.invoke(prompt_text)
+        return self._parse_response(response.content, query, translated_query, detected_lang)
+
+    @async_retry_with_backoff(max_retries=3)
+    async def aclarify(self, query: str) -> Dict[str, Any]:
+        clarification = await asyncio.to_thread(self.try_fast_path, query)
+        if clarification:
+            return clarification
+
+        translated_query, detected_lang = await self.translator.aprocess_query(query)
+        prompt_text = self.prompt.format(query=translated_query, language=detected_lang)
+
+        response = await self.llm.ainvoke(prompt_text)
+        return self._parse_response(response.content, query, translated_query, detected_lang)
@@ -0,0 +1,117 @@
+import copy
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.metrics import CYPHER_CACHE_REQUESTS
+from app.kg_pipeline.config.logging_config import get_logger
+from app.kg_pipeline.utils.text import normalize_text
+
+logger = get_logger(__name__)
+
+CACHED_FIELDS = ("count_query", "result_query", "params", "requires_embeddings", "embedding_params", "explanation")
+
+
+def schema_fingerprint(schema: str) -> str:
+    return hashlib.sha256((schema or "").encode()).hexdigest()
+
+
+def canonical_key(clarification: Dict[str, Any]) -> str:
+    entities = clarification.get("entities") or {}
+    canonical = {
+        "intent": clarification.get("intent", "general"),
+        "search_strategy": clarification.get("search_strategy", "hybrid"),
+        "entities": {
+            kind: sorted({normalize_text(str(value)) for value in entities.get(kind) or [] if value})
+            for kind in ("crops", "diseases", "symptoms")
+        },
+        "image_matches": sorted(clarification.get("image_matches") or []),
+    }
+    return json.dumps(canonical, ensure_ascii=False, sort_keys=True)
+
+
+class CypherCache:
+    def __init__(self, max_entries: int = 1000, ttl_seconds: int = 86400, store=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.store = store
+        self.fingerprint = ""
+        self.entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.lock = Lock()
+        logger.info(
+            f"Cypher cache initialized (max_entries={max_entries}, ttl={ttl_seconds}s, "
+            f"persistent={store is not None})"
+        )
+
+    def set_schema(self, schema: str):
+        fingerprint = schema_fingerprint(schema)
+        if fingerprint == self.fingerprint:
+            return
+        with self.lock:
+            if self.fingerprint:
+                logger.info(f"Graph schema changed, dropping {len(self.entries)} cached Cypher entries")
+            self.entries.clear()
+            self.fingerprint = fingerprint
+
+    def _key(self, clarification_key: str) -> str:
+        return hashlib.sha256(clarification_key.encode()).hexdigest()
+
+    def _remember(self, key: str, cypher_result: Dict[str, Any]):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, cypher_result)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get(self, clarification: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        key = self._key(canonical_key(clarification))
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, cypher_result = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    CYPHER_CACHE_REQUESTS.labels("memory").inc()
+                    return copy.deepcopy(cypher_result)
+                del self.entries[key]
+
+        if self.store is not None:
+            try:
+                cypher_result = self.store.get_cached_cypher(key, self.fingerprint)
+            except Exception as exc:
+                logger.warning(f"Cypher cache lookup in Postgres failed: {exc}")
+                cypher_result = None
+            if cypher_result is not None:
+                self._remember(key, cypher_result)
+                CYPHER_CACHE_REQUESTS.labels("postgres").inc()
+                return copy.deepcopy(cypher_result)
+
+        CYPHER_CACHE_REQUESTS.labels("miss").inc()
+        return None
+
+    def put(self, clarification: Dict[str, Any], cypher_result: Dict[str, Any]):
+        clarification_key = canonical_key(clarification)
+        key = self._key(clarification_key)
+        entry = copy.deepcopy({field: cypher_result[field] for field in CACHED_FIELDS if field in cypher_result})
+        self._remember(key, entry)
+
+        if self.store is not None:
+            try:
+                self.store.queue_cached_cypher(
+                    key,
+                    self.fingerprint,
+                    clarification_key,
+                    entry,
+                    datetime.utcnow() + timedelta(seconds=self.ttl_seconds),
+                )
+            except Exception as exc:
+                logger.warning(f"Cypher cache write to Postgres failed: {exc}")
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -1,20 +1,30 @@
+import asyncio
 import json
+import time
 from typing import Any, Dict
 
 from langchain_core.prompts.prompt import PromptTemplate
 
 from app.kg_pipeline.config.logging_config import get_logger
-from app.kg_pipeline.utils.retry import retry_with_backoff
+from app.kg_pipeline.config.settings import settings
+from app.kg_pipeline.utils.retry import async_retry_with_backoff, retry_with_backoff
+from app.kg_pipeline.utils.timing import timed
 
 logger = get_logger(__name__)
 
 
 class CypherGenerator:
-    def __init__(self, llm, embedder, graph):
+    def __init__(self, llm, embedder, graph, templates=None, cache=None):
         self.llm = llm
         self.embedder = embedder
         self.graph = graph
+        self.templates = templates
+        self.cache = cache
         self.schema = graph.get_schema
+        self.schema_refresh_seconds = settings.cypher.schema_refresh_seconds
+        self.schema_checked_at = time.monotonic()
+        if cache is not None:
+            cache.set_schema(self.schema)
 
         dims = embedder.get_dimensions()
         self.text_dim = dims["text"]
@@ -137,13 +147,15 @@ class CypherGenerator:
             f"Cypher generator initialized (text_dim={self.text_dim}, image_dim={self.image_dim}, indexes={len(self.vector_indexes)})"
         )
 
-    @retry_with_backoff(max_retries=3)
-    def generate_cypher(self, clarification: Dict) -> Dict[str, Any]:
-        vector_indexes_str = "\n".join(
+    def vector_indexes_text(self) -> str:
+        return "\n".join(
             [f"- {key}: index='{idx}', label='{label}', property='{prop}'" for key, (idx, label, prop) in self.vector_indexes.items()]
         )
 
-        prompt = self.cypher_prompt.format(
+    def _build_prompt(self, clarification: Dict) -> str:
+        vector_indexes_str = self.vector_indexes_text()
+
+        return self.cypher_prompt.format(
             schema=self.schema,
             clarified_query=clarification["clarified_query"],
             intent=clarification["intent"],
@@ -152,44 +164,135 @@ class CypherGenerator:
             vector_indexes=vector_indexes_str,
         )
 
+    @staticmethod
+    def parse_response(response_text: str) -> Dict[str, Any]:
+        response_text = response_text.strip()
+        if response_text.startswith("```"):
+            response_text = response_text.split("```")[1]
+            if response_text.startswith("json"):
+                response_text = response_text[4:]
+        return json.loads(response_text)
+
+    def _embed_params(self, embedding_params: Dict[str, str]) -> Dict[str, Any]:
+        names = list(embedding_params)
+        if not names:
+            return {}
+
+        try:
+            with timed("text_embed"):
+                vectors = self.embedder.embed_texts([embedding_params[name] for name in names])
+        except Exception as exc:
+            logger.error(f"Failed to generate embeddings for {names}: {exc}")
+            vectors = [None] * len(names)
+
+        embeddings: Dict[str, Any] = {}
+        for param_name, vector in zip(names, vectors):
+            if vector is None:
+                logger.error(f"Failed to generate embedding for {param_name}")
+                vector = [0.0] * self.text_dim
+            embeddings[param_name] = vector
+        return embeddings
+
+    def attach_embeddings(self, cypher_result: Dict[str, Any]) -> Dict[str, Any]:
+        if cypher_result.get("requires_embeddings", False):
+            cypher_result["embeddings"] = self._embed_params(cypher_result.get("embedding_params", {}))
+        else:
+            cypher_result["embeddings"] = {}
+        return cypher_result
+
+    async def aattach_embeddings(self, cypher_result: Dict[str, Any]) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.attach_embeddings, cypher_result)
+
+    def from_template(self, clarification: Dict) -> Dict[str, Any] | None:
+        if self.templates is None:
+            return None
+        return self.templates.select(clarification)
+
+    def _refresh_schema(self):
+        if self.schema_refresh_seconds <= 0 or time.monotonic() - self.schema_checked_at < self.schema_refresh_seconds:
+            return
+        self.schema_checked_at = time.monotonic()
         try:
-            response = self.llm.invoke(prompt)
-            response_text = response.content.strip()
+            self.graph.refresh_schema()
+            self.schema = self.graph.get_schema
+        except Exception as exc:
+            logger.warning(f"Graph schema refresh failed: {exc}")
+            return
+        self.cache.set_schema(self.schema)
 
-            if response_text.startswith("```"):
-                response_text = response_text.split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:]
+    def _from_cache(self, clarification: Dict) -> Dict[str, Any] | None:
+        if self.cache is None:
+            return None
+        self._refresh_schema()
+        return self.cache.get(clarification)
 
-            cypher_result = json.loads(response_text)
+    async def _afrom_cache(self, clarification: Dict) -> Dict[str, Any] | None:
+        if self.cache is None:
+            return None
+        return await asyncio.to_thread(self._from_cache, clarification)
 
-            if cypher_result.get("requires_embeddings", False):
-                embeddings: Dict[str, Any] = {}
-                for param_name, param_text in cypher_result.get("embedding_params", {}).items():
-                    try:
-                        embedding_vector = self.embedder.embed_text(param_text)
-                        embeddings[param_name] = embedding_vector
-                    except Exception as exc:
-                        logger.error(f"Failed to generate embedding for {param_name}: {exc}")
-                        embeddings[param_name] = [0.0] * self.text_dim
+    def remember(self, clarification: Dict, cypher_result: Dict[str, Any]):
+        if self.cache is not None:
+            self.cache.put(clarification, cypher_result)
 
-                cypher_result["embeddings"] = embeddings
-            else:
-                cypher_result["embeddings"] = {}
+    async def aremember(self, clarification: Dict, cypher_result: Dict[str, Any]):
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, clarification, cypher_result)
 
-            logger.info(f"Cypher generated successfully: requires_embeddings={cypher_result.get('requires_embeddings')}")
-            return cypher_result
+    def fallback(self, clarification: Dict) -> Dict[str, Any]:
+        entities = clarification["entities"]
+        crop_names = entities.get("crops", [])
+        crop_filter = "WHERE $crop IS NULL OR c.name CONTAINS $crop"
+        return {
+            "count_query": f"MATCH (c:Crop) {crop_filter} RETURN COUNT(c) AS total_count",
+            "result_query": f"MATCH (c:Crop) {crop_filter} RETURN c.name AS crop_name LIMIT 5",
+            "params": {"crop": crop_names[0] if crop_names else None},
+            "requires_embeddings": False,
+            "embedding_params": {},
+            "embeddings": {},
+            "explanation": "Fallback: simple pattern matching",
+        }
 
+    @retry_with_backoff(max_retries=3)
+    def generate_cypher(self, clarification: Dict) -> Dict[str, Any]:
+        cypher_result = self.from_template(clarification) or self._from_cache(clarification)
+        if cypher_result is not None:
+            return self.attach_embeddings(cypher_result)
+
+        prompt = self._build_prompt(clarification)
+
+        try:
+            with timed("cypher_gen"):
+                response = self.llm.invoke(prompt)
+            cypher_result = self.parse_response(response.content)
         except json.JSONDecodeError as exc:
             logger.warning(f"Failed to parse Cypher JSON: {exc}")
-            entities = clarification["entities"]
-            crop_names = entities.get("crops", [])
-            crop_filter = f"WHERE c.name CONTAINS '{crop_names[0]}'" if crop_names else ""
-            return {
-                "count_query": f"MATCH (c:Crop) {crop_filter} RETURN COUNT(c) AS total_count",
-                "result_query": f"MATCH (c:Crop) {crop_filter} RETURN c.name AS crop_name LIMIT 5",
-                "requires_embeddings": False,
-                "embedding_params": {},
-                "embeddings": {},
-                "explanation": "Fallback: simple pattern matching",
-            }
+            return self.fallback(clarification)
+
+        self.remember(clarification, cypher_result)
+        self.attach_embeddings(cypher_result)
+
+        logger.info(f"Cypher generated successfully: requires_embeddings={cypher_result.get('requires_embeddings')}")
+        return cypher_result
+
+    @async_retry_with_backoff(max_retries=3)
+    async def agenerate_cypher(self, clarification: Dict) -> Dict[str, Any]:
+        cypher_result = self.from_template(clarification) or await self._afrom_cache(clarification)
+        if cypher_result is not None:
+            return await self.aattach_embeddings(cypher_result)
+
+        prompt = self._build_prompt(clarification)
+
+        try:
+            with timed("cypher_gen"):
+                response = await self.llm.ainvoke(prompt)
+            cypher_result = self.parse_response(response.content)
+        except json.JSONDecodeError as exc:
+            logger.warning(f"Failed to parse Cypher JSON: {exc}")
+            return self.fallback(clarification)
+
+        await self.aremember(clarification, cypher_result)
+        await self.aattach_embeddings(cypher_result)
+
+        logger.info(f"Cypher generated successfully: requires_embeddings={cypher_result.get('requires_embeddings')}")
+        return cypher_result
@@ -0,0 +1,205 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.kg_pipeline.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+ENTITY_FIELDS = {"crop": "crops", "disease": "diseases", "symptom": "symptoms"}
+
+
+@dataclass(frozen=True)
+class CypherTemplate:
+    name: str
+    intents: Tuple[str, ...]
+    required: Tuple[str, ...]
+    count_query: str
+    result_query: str
+    embedding_params: Dict[str, str] = field(default_factory=dict)
+    optional: Tuple[str, ...] = ()
+
+    def matches(self, intent: str, slots: Dict[str, Optional[str]]) -> bool:
+        return intent in self.intents and all(slots.get(slot) for slot in self.required)
+
+    def render(self, slots: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        embedding_params = {param: slots[slot] for param, slot in self.embedding_params.items()}
+        params = {
+            slot: slots.get(slot) or None
+            for slot in self.required + self.optional
+            if slot not in self.embedding_params.values()
+        }
+        return {
+            "count_query": self.count_query,
+            "result_query": self.result_query,
+            "params": params,
+            "requires_embeddings": bool(embedding_params),
+            "embedding_params": embedding_params,
+            "template": self.name,
+            "explanation": f"Template {self.name}",
+        }
+
+
+SYMPTOM_VECTOR_MATCH = """CALL db.index.vector.queryNodes('symptom_vector', {top_k}, $embedding_symptom) YIELD node AS s, score
+WHERE score > 0.7
+MATCH (d:Disease)-[:HAS_SYMPTOM]->(s)
+MATCH (c:Crop)<-[:AFFECTED_BY]-(d)
+WHERE $crop IS NULL OR toLower(c.name) CONTAINS toLower($crop)"""
+
+DISEASE_NAME_MATCH = """MATCH (d:Disease)
+WHERE toLower(d.name) CONTAINS toLower($disease)"""
+
+DISEASE_CROP_FILTER = """MATCH (c:Crop)<-[:AFFECTED_BY]-(d)
+WHERE $crop IS NULL OR toLower(c.name) CONTAINS toLower($crop)"""
+
+CROP_NAME_MATCH = """MATCH (c:Crop)
+WHERE toLower(c.name) CONTAINS toLower($crop)"""
+
+TEMPLATES: List[CypherTemplate] = [
+    CypherTemplate(
+        name="disease_by_name",
+        intents=("disease_info", "symptom_diagnosis", "general"),
+        required=("disease",),
+        count_query=f"""{DISEASE_NAME_MATCH}
+RETURN COUNT(DISTINCT d) AS total_count""",
+        result_query=f"""{DISEASE_NAME_MATCH}
+OPTIONAL MATCH (c:Crop)<-[:AFFECTED_BY]-(d)
+OPTIONAL MATCH (d)-[:HAS_SYMPTOM]->(s:Symptom)
+OPTIONAL MATCH (d)-[:HAS_ORGANIC_CONTROL]->(oc:OrganicControl)
+OPTIONAL MATCH (d)-[:HAS_CHEMICAL_CONTROL]->(cc:ChemicalControl)
+RETURN d.name AS disease_name, d.scientific_name AS scientific_name,
+       collect(DISTINCT c.name) AS affected_crops,
+       collect(DISTINCT s.text)[0..3] AS symptoms,
+       collect(DISTINCT oc.text)[0..2] AS organic_treatment,
+       collect(DISTINCT cc.text)[0..2] AS chemical_treatment
+LIMIT 3""",
+    ),
+    CypherTemplate(
+        name="disease_by_symptom",
+        intents=("symptom_diagnosis", "general"),
+        required=("symptom",),
+        optional=("crop",),
+        embedding_params={"embedding_symptom": "symptom"},
+        count_query=f"""{SYMPTOM_VECTOR_MATCH.format(top_k=10)}
+RETURN COUNT(DISTINCT d) AS total_count""",
+        result_query=f"""{SYMPTOM_VECTOR_MATCH.format(top_k=5)}
+OPTIONAL MATCH (d)-[:HAS_ORGANIC_CONTROL]->(oc:OrganicControl)
+OPTIONAL MATCH (d)-[:HAS_CHEMICAL_CONTROL]->(cc:ChemicalControl)
+RETURN DISTINCT c.name AS crop_name, d.name AS disease_name, s.text AS symptom, score AS similarity,
+       oc.text AS organic_treatment, cc.text AS chemical_treatment
+ORDER BY score DESC LIMIT 5""",
+    ),
+    CypherTemplate(
+        name="treatment_by_disease",
+        intents=("treatment",),
+        required=("disease",),
+        optional=("crop",),
+        count_query=f"""{DISEASE_NAME_MATCH}
+{DISEASE_CROP_FILTER}
+RETURN COUNT(DISTINCT d) AS total_count""",
+        result_query=f"""{DISEASE_NAME_MATCH}
+{DISEASE_CROP_FILTER}
+OPTIONAL MATCH (d)-[:HAS_ORGANIC_CONTROL]->(oc:OrganicControl)
+OPTIONAL MATCH (d)-[:HAS_CHEMICAL_CONTROL]->(cc:ChemicalControl)
+RETURN d.name AS disease_name, collect(DISTINCT c.name) AS affected_crops,
+       collect(DISTINCT oc.text) AS organic_treatment,
+       collect(DISTINCT cc.text) AS chemical_treatment
+LIMIT 3""",
+    ),
+    CypherTemplate(
+        name="treatment_by_symptom",
+        intents=("treatment",),
+        required=("symptom",),
+        optional=("crop",),
+        embedding_params={"embedding_symptom": "symptom"},
+        count_query=f"""{SYMPTOM_VECTOR_MATCH.format(top_k=10)}
+RETURN COUNT(DISTINCT d) AS total_count""",
+        result_query=f"""{SYMPTOM_VECTOR_MATCH.format(top_k=5)}
+OPTIONAL MATCH (d)-[:HAS_ORGANIC_CONTROL]->(oc:OrganicControl)
+OPTIONAL MATCH (d)-[:HAS_CHEMICAL_CONTROL]->(cc:ChemicalControl)
+RETURN d.name AS disease_name, c.name AS crop_name, max(score) AS similarity,
+       collect(DISTINCT oc.text) AS organic_treatment,
+       collect(DISTINCT cc.text) AS chemical_treatment
+ORDER BY similarity DESC LIMIT 5""",
+    ),
+    CypherTemplate(
+        name="prevention_by_disease",
+        intents=("prevention",),
+        required=("disease",),
+        count_query=f"""{DISEASE_NAME_MATCH}
+RETURN COUNT(DISTINCT d) AS total_count""",
+        result_query=f"""{DISEASE_NAME_MATCH}
+OPTIONAL MATCH (c:Crop)<-[:AFFECTED_BY]-(d)
+OPTIONAL MATCH (d)--(pm:PreventiveMeasure)
+OPTIONAL MATCH (d)--(cause:Cause)
+RETURN d.name AS disease_name, collect(DISTINCT c.name) AS affected_crops,
+       collect(DISTINCT pm.text) AS preventive_measures,
+       collect(DISTINCT cause.text)[0..3] AS causes
+LIMIT 3""",
+    ),
+    CypherTemplate(
+        name="care_by_crop",
+        intents=("crop_care",),
+        required=("crop",),
+        count_query=f"""{CROP_NAME_MATCH}
+RETURN COUNT(DISTINCT c) AS total_count""",
+        result_query=f"""{CROP_NAME_MATCH}
+OPTIONAL MATCH (c)--(care:Care)
+OPTIONAL MATCH (c)--(soil:Soil)
+OPTIONAL MATCH (c)--(climate:Climate)
+RETURN c.name AS crop_name,
+       collect(DISTINCT care.text)[0..5] AS care,
+       collect(DISTINCT soil.text)[0..2] AS soil,
+       collect(DISTINCT climate.text)[0..2] AS climate
+LIMIT 3""",
+    ),
+    CypherTemplate(
+        name="diseases_by_crop",
+        intents=("disease_info", "prevention", "treatment", "general"),
+        required=("crop",),
+        count_query=f"""{CROP_NAME_MATCH}
+MATCH (c)<-[:AFFECTED_BY]-(d:Disease)
+RETURN COUNT(DISTINCT d) AS total_count""",
+        result_query=f"""{CROP_NAME_MATCH}
+MATCH (c)<-[:AFFECTED_BY]-(d:Disease)
+OPTIONAL MATCH (d)-[:HAS_SYMPTOM]->(s:Symptom)
+RETURN c.name AS crop_name, d.name AS disease_name, collect(DISTINCT s.text)[0..2] AS symptoms
+LIMIT 10""",
+    ),
+]
+
+
+class CypherTemplateLibrary:
+    def __init__(self, templates: List[CypherTemplate] | None = None):
+        self.templates = list(templates or TEMPLATES)
+        logger.info(f"Cypher template library loaded ({len(self.templates)} templates)")
+
+    @staticmethod
+    def _slots(clarification: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        entities = clarification.get("entities") or {}
+        crops = [c for c in entities.get("crops") or [] if c]
+        diseases = [d for d in entities.get("diseases") or [] if d]
+        symptoms = [s for s in entities.get("symptoms") or [] if s]
+        return {
+            "crop": crops[0] if crops else None,
+            "disease": diseases[0] if diseases else None,
+            "symptom": ", ".join(symptoms) or None,
+        }
+
+    def coverage(self) -> List[str]:
+        lines = []
+        for template in self.templates:
+            slots = " and ".join(f"at least one of entities.{ENTITY_FIELDS[slot]}" for slot in template.required)
+            line = f"- intent {' / '.join(template.intents)} with {slots}"
+            if line not in lines:
+                lines.append(line)
+        return lines
+
+    def select(self, clarification: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        intent = clarification.get("intent", "general")
+        slots = self._slots(clarification)
+        for template in self.templates:
+            if template.matches(intent, slots):
+                logger.info(f"Selected Cypher template {template.name} for intent={intent}")
+                return template.render(slots)
+        logger.info(f"No Cypher template for intent={intent}, slots={[k for k, v in slots.items() if v]}")
+        return None
@@ -0,0 +1,357 @@
+import re
+import threading
+import unicodedata
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.kg_pipeline.config import get_logger, settings
+from app.kg_pipeline.utils.text import fold_accents, has_diacritics
+
+logger = get_logger(__name__)
+
+CROP = "crop"
+DISEASE = "disease"
+
+INTENT_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "treatment": ("trị", "chữa", "thuốc", "phun", "xử lý", "diệt", "khắc phục"),
+    "prevention": ("phòng", "ngừa", "phòng tránh", "hạn chế"),
+    "crop_care": ("chăm sóc", "bón", "tưới", "trồng", "đất", "khí hậu", "thời vụ"),
+    "symptom_diagnosis": ("triệu chứng", "dấu hiệu", "bị", "héo", "vàng", "đốm", "thối", "khô", "rụng"),
+    "disease_info": ("là gì", "thông tin", "nguyên nhân", "tác nhân"),
+}
+
+STRIP_PUNCTUATION = " \t\n?!.,;:"
+SYMPTOM_SUFFIXES = ("thì sao", "là bệnh gì", "là sao", "phải làm sao", "làm sao", "thì phải làm gì")
+
+
+class AhoCorasick:
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, Any]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, payload: Any):
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = nxt
+        self._output[node].append((len(pattern), payload))
+        self._built = False
+
+    def build(self):
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                if self._fail[nxt] == nxt:
+                    self._fail[nxt] = 0
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+        self._built = True
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        if not self._built:
+            self.build()
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, payload in self._output[node]:
+                yield index - length + 1, index + 1, payload
+
+
+def _is_boundary(text: str, start: int, end: int) -> bool:
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not before.isalnum() and not after.isalnum()
+
+
+def disease_aliases(name: str) -> List[str]:
+    name = unicodedata.normalize("NFC", name).strip()
+    aliases = {name}
+
+    inner = re.findall(r"\(([^)]+)\)", name)
+    base = re.sub(r"\s*\([^)]*\)", "", name).strip()
+    aliases.add(base)
+    aliases.update(part.strip() for part in inner if part.strip())
+
+    for candidate in list(aliases):
+        if candidate.lower().startswith("bệnh "):
+            aliases.add(candidate[5:].strip())
+    for candidate in list(aliases):
+        for sep in (" ở ", " trên "):
+            if sep in candidate.lower():
+                head = candidate[: candidate.lower().index(sep)].strip()
+                if len(head.split()) >= 2:
+                    aliases.add(head)
+
+    return [alias for alias in aliases if len(alias) >= 3]
+
+
+class EntityDictionary:
+    def __init__(self, crops: Iterable[str] = (), diseases: Iterable[str] = ()):
+        self.crops = sorted({unicodedata.normalize("NFC", c).strip() for c in crops if c and c.strip()})
+        self.diseases = sorted({unicodedata.normalize("NFC", d).strip() for d in diseases if d and d.strip()})
+        self._exact = AhoCorasick()
+        self._folded = AhoCorasick()
+
+        for crop in self.crops:
+            self._add(crop, (CROP, crop))
+        for disease in self.diseases:
+            for alias in disease_aliases(disease):
+                self._add(alias, (DISEASE, disease))
+
+        self._exact.build()
+        self._folded.build()
+        logger.info(f"Entity dictionary built: {len(self.crops)} crops, {len(self.diseases)} diseases")
+
+    def _add(self, surface: str, payload: Tuple[str, str]):
+        self._exact.add(surface.lower(), payload)
+        self._folded.add(fold_accents(surface), payload)
+
+    def match(self, text: str) -> List[Tuple[int, int, str, str]]:
+        text = unicodedata.normalize("NFC", text)
+        if has_diacritics(text):
+            haystack, automaton = text.lower(), self._exact
+        else:
+            haystack, automaton = fold_accents(text), self._folded
+
+        candidates = [
+            (start, end, kind, name)
+            for start, end, (kind, name) in automaton.finditer(haystack)
+            if _is_boundary(haystack, start, end)
+        ]
+        candidates.sort(key=lambda m: (-(m[1] - m[0]), m[0]))
+
+        taken: List[Tuple[int, int, str, str]] = []
+        for candidate in candidates:
+            if all(candidate[1] <= t[0] or candidate[0] >= t[1] for t in taken):
+                taken.append(candidate)
+        return sorted(taken)
+
+    @classmethod
+    def load(cls, graph=None) -> "EntityDictionary":
+        crops: List[str] = []
+        diseases: List[str] = []
+
+        try:
+            from sqlalchemy import select
+
+            from app.core.db import SessionLocal
+            from app.models import Crop, Disease
+
+            with SessionLocal() as db:
+                crops.extend(db.execute(select(Crop.name)).scalars().all())
+                diseases.extend(db.execute(select(Disease.name)).scalars().all())
+        except Exception as exc:
+            logger.warning(f"Could not load library names for entity dictionary: {exc}")
+
+        if graph is not None:
+            try:
+                crop_rows = graph.query("MATCH (c:Crop) RETURN DISTINCT c.name AS name", max_rows=0)
+                crops.extend(r["name"] for r in crop_rows if r["name"])
+                disease_rows = graph.query("MATCH (d:Disease) RETURN DISTINCT d.name AS name", max_rows=0)
+                diseases.extend(r["name"] for r in disease_rows if r["name"])
+            except Exception as exc:
+                logger.warning(f"Could not load graph names for entity dictionary: {exc}")
+
+        return cls(crops, diseases)
+
+
+class RuleBasedClarifier:
+    def __init__(
+        self,
+        dictionary: EntityDictionary,
+        intent_classifier=None,
+        min_confidence: float | None = None,
+        max_words: int | None = None,
+    ):
+        self.dictionary = dictionary
+        self.intent_classifier = intent_classifier
+        self.min_confidence = min_confidence if min_confidence is not None else settings.clarifier.fast_path_min_confidence
+        self.max_words = max_words if max_words is not None else settings.clarifier.fast_path_max_words
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.hits = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return round(self.hits / self.attempts, 4) if self.attempts else 0.0
+
+    def _record(self, hit: bool):
+        with self._lock:
+            self.attempts += 1
+            if hit:
+                self.hits += 1
+
+    @staticmethod
+    def _keyword_intents(text: str) -> List[str]:
+        lowered = text.lower()
+        folded = fold_accents(text)
+        accented = has_diacritics(text)
+        found = []
+        for intent, keywords in INTENT_KEYWORDS.items():
+            for keyword in keywords:
+                needle, haystack = (keyword, lowered) if accented else (fold_accents(keyword), folded)
+                if re.search(rf"(?<!\w){re.escape(needle)}(?!\w)", haystack):
+                    found.append(intent)
+                    break
+        return found
+
+    @staticmethod
+    def _symptom_after_bi(text: str, matches: List[Tuple[int, int, str, str]]) -> Optional[str]:
+        lowered = unicodedata.normalize("NFC", text).lower()
+        folded = fold_accents(text)
+        haystack = lowered if has_diacritics(text) else folded
+        marker = "bị" if haystack is lowered else "bi"
+
+        crop_ends = [end for _, end, kind, _ in matches if kind == CROP]
+        if not crop_ends:
+            return None
+        found = re.search(rf"(?<!\w){marker}(?!\w)", haystack[crop_ends[0]:])
+        if not found:
+            return None
+
+        start = crop_ends[0] + found.end()
+        symptom = unicodedata.normalize("NFC", text)[start:].strip(STRIP_PUNCTUATION)
+        for suffix in SYMPTOM_SUFFIXES:
+            if fold_accents(symptom).endswith(fold_accents(suffix)):
+                symptom = symptom[: -len(suffix)].strip(STRIP_PUNCTUATION)
+        return symptom or None
+
+    def _classify(
+        self, query: str, crops: List[str], diseases: List[str], symptom: Optional[str]
+    ) -> Tuple[str, float]:
+        keyword_intents = self._keyword_intents(query)
+
+        if diseases:
+            for intent in ("treatment", "prevention"):
+                if intent in keyword_intents:
+                    return intent, 0.9
+            if "crop_care" in keyword_intents:
+                return "disease_info", 0.6
+            return "disease_info", 0.9
+
+        if crops and symptom:
+            if "treatment" in keyword_intents:
+                return "treatment", 0.7
+            return "symptom_diagnosis", 0.85
+
+        if crops and "crop_care" in keyword_intents:
+            return "crop_care", 0.85
+
+        if keyword_intents:
+            return keyword_intents[0], 0.4
+        return "general", 0.0
+
+    def _embedding_classify(
+        self, query: str, crops: List[str], diseases: List[str], symptom: Optional[str]
+    ) -> Tuple[str, float, List[str]]:
+        intent, confidence = self.intent_classifier.predict(query)
+        symptoms = [symptom] if symptom else []
+
+        if intent in ("disease_info", "prevention") and not diseases:
+            confidence *= 0.5
+        elif intent == "treatment" and not (diseases or symptoms):
+            confidence *= 0.5
+        elif intent == "crop_care" and not crops:
+            confidence *= 0.5
+        elif intent == "symptom_diagnosis" and not symptoms and not diseases:
+            symptoms = [query.strip(STRIP_PUNCTUATION)]
+        return intent, confidence, symptoms
+
+    @staticmethod
+    def _strategy(crops: List[str], diseases: List[str], symptoms: List[str]) -> str:
+        if diseases:
+            return "pattern"
+        if symptoms:
+            return "hybrid" if crops else "vector"
+        return "pattern"
+
+    @staticmethod
+    def _clarified_query(
+        query: str, intent: str, crops: List[str], diseases: List[str], symptoms: List[str]
+    ) -> str:
+        crop_text = ", ".join(c.lower() for c in crops)
+        disease_text = ", ".join(diseases)
+        symptom_text = ", ".join(symptoms)
+        crop_part = f" trên cây {crop_text}" if crop_text else ""
+        if intent == "symptom_diagnosis" and symptom_text:
+            return f"Tìm bệnh{crop_part} có triệu chứng {symptom_text}"
+        if intent == "treatment" and (disease_text or symptom_text):
+            target = disease_text or f"bệnh{crop_part} có triệu chứng {symptom_text}"
+            return f"Cách điều trị {target}"
+        if intent == "prevention" and disease_text:
+            return f"Cách phòng ngừa {disease_text}"
+        if intent == "crop_care" and crop_text:
+            return f"Cách chăm sóc cây {crop_text}"
+        if disease_text:
+            return f"Thông tin về {disease_text}{crop_part}"
+        if crop_text:
+            return f"Thông tin về bệnh trên cây {crop_text}"
+        return query.strip(STRIP_PUNCTUATION)
+
+    def clarify(self, query: str) -> Optional[Dict[str, Any]]:
+        text = query.strip()
+        if not text or len(text.split()) > self.max_words:
+            self._record(False)
+            return None
+
+        matches = self.dictionary.match(text)
+        crops = list(dict.fromkeys(name for _, _, kind, name in matches if kind == CROP))
+        diseases = list(dict.fromkeys(name for _, _, kind, name in matches if kind == DISEASE))
+        symptom = None if diseases else self._symptom_after_bi(text, matches)
+        if not (crops or diseases or symptom):
+            # Không có thực thể nào: để LLM làm rõ thay vì đoán intent từ cả câu
+            self._record(False)
+            return None
+
+        if self.intent_classifier is not None:
+            try:
+                intent, confidence, symptoms = self._embedding_classify(text, crops, diseases, symptom)
+            except Exception as exc:
+                logger.warning(f"Intent classifier failed, falling back to LLM clarification: {exc}")
+                self._record(False)
+                return None
+            intent_source = "embedding"
+        else:
+            intent, confidence = self._classify(text, crops, diseases, symptom)
+            symptoms = [symptom] if symptom else []
+            intent_source = "keywords"
+
+        if confidence < self.min_confidence:
+            self._record(False)
+            return None
+
+        self._record(True)
+        strategy = self._strategy(crops, diseases, symptoms)
+        logger.info(
+            f"Fast-path clarification: intent={intent} ({intent_source}), strategy={strategy}, confidence={confidence}"
+        )
+        return {
+            "intent": intent,
+            "entities": {"crops": crops, "diseases": diseases, "symptoms": symptoms},
+            "clarified_query": self._clarified_query(text, intent, crops, diseases, symptoms),
+            "search_strategy": strategy,
+            "original_query": query,
+            "translated_query": query,
+            "language": settings.language.data_language,
+            "fast_path": True,
+            "fast_path_confidence": round(confidence, 4),
+            "intent_source": intent_source,
+        }
@@ -0,0 +1,110 @@
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.kg_pipeline.config import get_logger, settings
+
+logger = get_logger(__name__)
+
+INTENTS = ("disease_info", "symptom_diagnosis", "crop_care", "treatment", "prevention")
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+DEFAULT_EXAMPLES_PATH = DATA_DIR / "intent_examples.json"
+DEFAULT_CENTROIDS_PATH = DATA_DIR / "intent_centroids.npz"
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.clip(norms, 1e-12, None)
+
+
+def load_examples(path: Path | str = DEFAULT_EXAMPLES_PATH) -> List[Tuple[str, str]]:
+    with open(path, encoding="utf-8") as handle:
+        raw: Dict[str, List[str]] = json.load(handle)
+    return [(text, intent) for intent, texts in raw.items() if intent in INTENTS for text in texts]
+
+
+def load_history_examples(limit: int = 5000) -> List[Tuple[str, str]]:
+    from app.kg_pipeline.database import ChatHistory, db_connection
+
+    db = db_connection.get_session()
+    try:
+        rows = (
+            db.query(ChatHistory.query, ChatHistory.intent, ChatHistory.pipeline_data)
+            .filter(ChatHistory.intent.in_(INTENTS), ChatHistory.from_cache.is_(False))
+            .order_by(ChatHistory.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+    finally:
+        db.close()
+
+    examples = []
+    for query, intent, pipeline_data in rows:
+        clarification = (pipeline_data or {}).get("clarification") or {}
+        if clarification.get("fast_path"):
+            continue
+        examples.append((query, intent))
+    return examples
+
+
+class IntentClassifier:
+    def __init__(self, embedder, centroids: np.ndarray, labels: List[str], temperature: float = 20.0):
+        self.embedder = embedder
+        self.centroids = _normalize_rows(np.asarray(centroids, dtype=np.float32))
+        self.labels = list(labels)
+        self.temperature = temperature
+        logger.info(f"Intent classifier ready ({len(self.labels)} intents)")
+
+    @staticmethod
+    def train(
+        embed_batch: Callable[[List[str]], List[Optional[List[float]]]],
+        examples: Iterable[Tuple[str, str]],
+    ) -> Tuple[np.ndarray, List[str]]:
+        examples = [(text, intent) for text, intent in examples if text and intent in INTENTS]
+        embedded = embed_batch([text for text, _ in examples])
+        examples = [example for example, vector in zip(examples, embedded) if vector is not None]
+        vectors = _normalize_rows(np.asarray([vector for vector in embedded if vector is not None], dtype=np.float32))
+
+        labels: List[str] = []
+        centroids: List[np.ndarray] = []
+        for intent in INTENTS:
+            mask = np.array([label == intent for _, label in examples])
+            if not mask.any():
+                logger.warning(f"No training examples for intent {intent}")
+                continue
+            centroids.append(vectors[mask].mean(axis=0))
+            labels.append(intent)
+            logger.info(f"Intent {intent}: {int(mask.sum())} examples")
+        return _normalize_rows(np.stack(centroids)), labels
+
+    @staticmethod
+    def save(path: Path | str, centroids: np.ndarray, labels: List[str], model_name: str):
+        np.savez(path, centroids=centroids.astype(np.float32), labels=np.array(labels), model=np.array(model_name))
+        logger.info(f"Intent centroids saved to {path}")
+
+    @classmethod
+    def load(cls, embedder, path: Path | str | None = None) -> Optional["IntentClassifier"]:
+        path = Path(path or settings.clarifier.intent_centroids_path or DEFAULT_CENTROIDS_PATH)
+        if not path.exists():
+            logger.info(f"No intent centroids at {path}, using keyword intents")
+            return None
+
+        data = np.load(path, allow_pickle=False)
+        model_name = str(data["model"])
+        if model_name != settings.embedding.text_model:
+            logger.warning(
+                f"Intent centroids were trained with {model_name}, "
+                f"current text model is {settings.embedding.text_model}; ignoring them"
+            )
+            return None
+        return cls(embedder, data["centroids"], [str(label) for label in data["labels"]])
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        vector = _normalize_rows(np.asarray(self.embedder.embed_text(text), dtype=np.float32))
+        similarities = self.centroids @ vector
+        logits = (similarities - similarities.max()) * self.temperature
+        probabilities = np.exp(logits) / np.exp(logits).sum()
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(round(probabilities[best], 4))
@@ -0,0 +1,238 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.prompts.prompt import PromptTemplate
+
+from app.kg_pipeline.agents.clarifier import apply_image_results, image_context
+from app.kg_pipeline.config.logging_config import get_logger
+from app.kg_pipeline.utils.retry import async_retry_with_backoff, retry_with_backoff
+from app.kg_pipeline.utils.timing import timed
+
+logger = get_logger(__name__)
+
+FULL_EXAMPLE = """Input: "Cây lúa bị lá vàng"
+Output:
+{
+    "intent": "symptom_diagnosis",
+    "entities": {
+        "crops": ["Lúa"],
+        "diseases": [],
+        "symptoms": ["lá vàng"]
+    },
+    "clarified_query": "Tìm bệnh trên cây lúa có triệu chứng lá vàng",
+    "search_strategy": "hybrid",
+    "count_query": "CALL db.index.vector.queryNodes('symptom_vector', 10, $embedding_symptom) YIELD node AS s, score WHERE score > 0.7 MATCH (d:Disease)-[:HAS_SYMPTOM]->(s) MATCH (c:Crop)<-[:AFFECTED_BY]-(d) WHERE c.name CONTAINS 'Lúa' RETURN COUNT(DISTINCT d) AS total_count",
+    "result_query": "CALL db.index.vector.queryNodes('symptom_vector', 5, $embedding_symptom) YIELD node AS s, score WHERE score > 0.7 MATCH (d:Disease)-[:HAS_SYMPTOM]->(s) MATCH (c:Crop)<-[:AFFECTED_BY]-(d) WHERE c.name CONTAINS 'Lúa' OPTIONAL MATCH (d)-[:HAS_ORGANIC_CONTROL]->(oc:OrganicControl) OPTIONAL MATCH (d)-[:HAS_CHEMICAL_CONTROL]->(cc:ChemicalControl) RETURN DISTINCT c.name AS crop_name, d.name AS disease_name, s.text AS symptom, score AS similarity, oc.text AS organic_treatment, cc.text AS chemical_treatment ORDER BY score DESC LIMIT 5",
+    "requires_embeddings": true,
+    "embedding_params": {
+        "embedding_symptom": "lá vàng"
+    },
+    "explanation": "Use vector search on symptoms with crop name pattern matching"
+}"""
+
+TEMPLATED_EXAMPLE = """Input: "Cây lúa bị lá vàng"
+Output (symptom_diagnosis with a symptom is covered by a template, so no Cypher):
+{
+    "intent": "symptom_diagnosis",
+    "entities": {
+        "crops": ["Lúa"],
+        "diseases": [],
+        "symptoms": ["lá vàng"]
+    },
+    "clarified_query": "Tìm bệnh trên cây lúa có triệu chứng lá vàng",
+    "search_strategy": "hybrid",
+    "count_query": "",
+    "result_query": ""
+}"""
+
+CYPHER_FIELDS = ("count_query", "result_query", "requires_embeddings", "embedding_params", "explanation")
+
+
+class QueryPlanner:
+    def __init__(self, llm, clarifier, cypher_generator):
+        self.llm = llm
+        self.clarifier = clarifier
+        self.cypher_generator = cypher_generator
+        self.prompt = PromptTemplate(
+            input_variables=[
+                "schema",
+                "vector_indexes",
+                "query",
+                "language",
+                "image_hint",
+                "template_rule",
+                "example",
+            ],
+            template="""You are a query planner for a Neo4j plant disease database.
+            In ONE step, clarify the user query and write the Cypher queries that answer it.
+
+            ### Database Schema:
+            {schema}
+
+            ### Available Vector Indexes (for semantic search):
+            {vector_indexes}
+
+            ### User Query:
+            {query}
+            Language: {language}
+            {image_hint}
+
+            ### Step 1 - Clarify:
+            1. Identify intent (disease_info, symptom_diagnosis, crop_care, treatment, prevention)
+            2. Extract entities (crop names, disease names, symptoms). When extracting crop names, remove prefixes like 'Cây ' and capitalize the first letter, e.g., 'Cây lúa' => 'Lúa', 'Cây cà chua' => 'Cà chua'.
+            3. Rephrase clearly in Vietnamese (keep concise, max 2 sentences)
+            4. Pick a search strategy: vector (symptoms, vague descriptions), pattern (exact crop/disease names) or hybrid
+
+            ### Step 2 - Generate Cypher for the clarified query:
+            - Vector search: `CALL db.index.vector.queryNodes('<index_name>', <top_k>, $embedding_<node_type>)`,
+              parameter names MUST be `$embedding_<node_type>` and every one MUST be listed in embedding_params
+            - Pattern matching: `WHERE n.name CONTAINS '<name>'`
+            - Always produce a COUNT query returning `total_count` and a RESULT query with a LIMIT
+
+            ### Output JSON Format:
+            {{
+                "intent": "<intent_type>",
+                "entities": {{
+                    "crops": ["crop1"],
+                    "diseases": ["disease1"],
+                    "symptoms": ["symptom1"]
+                }},
+                "clarified_query": "<clear, concise query>",
+                "search_strategy": "<vector|pattern|hybrid>",
+                "count_query": "<cypher for counting>",
+                "result_query": "<cypher for results>",
+                "requires_embeddings": true/false,
+                "embedding_params": {{
+                    "embedding_symptom": "Query about symptoms"
+                }},
+                "explanation": "<brief explanation of query strategy>"
+            }}
+
+            {template_rule}
+
+            ### Example:
+            {example}
+
+            Respond ONLY with valid JSON:""",
+        )
+        self.template_rule = ""
+        self.example = FULL_EXAMPLE
+        if cypher_generator.templates is not None:
+            self.template_rule = "\n".join(
+                [
+                    "### Skip Cypher when a built-in template covers the query:",
+                    "If the clarified intent and entities match any line below, set count_query and result_query "
+                    'to "" and omit requires_embeddings, embedding_params and explanation:',
+                    *cypher_generator.templates.coverage(),
+                ]
+            )
+            self.example = TEMPLATED_EXAMPLE
+        logger.info("Query planner initialized (combined clarify + cypher)")
+
+    def _build_prompt(self, translated_query: str, detected_lang: str, image_results: List[Dict[str, Any]]) -> str:
+        image_hint = ""
+        if image_results:
+            image_hint = f"Image search suggests: {image_context(image_results)}"
+        return self.prompt.format(
+            schema=self.cypher_generator.schema,
+            vector_indexes=self.cypher_generator.vector_indexes_text(),
+            query=translated_query,
+            language=detected_lang,
+            image_hint=image_hint,
+            template_rule=self.template_rule,
+            example=self.example,
+        )
+
+    def _split_plan(
+        self,
+        response_text: str,
+        query: str,
+        translated_query: str,
+        detected_lang: str,
+        image_results: List[Dict[str, Any]],
+    ) -> Tuple[Dict[str, Any], Dict[str, Any] | None]:
+        try:
+            plan = self.cypher_generator.parse_response(response_text)
+        except json.JSONDecodeError as exc:
+            logger.warning(f"Failed to parse plan JSON: {exc}")
+            plan = {}
+
+        clarification = {
+            "intent": plan.get("intent", "general"),
+            "entities": plan.get("entities") or {"crops": [], "diseases": [], "symptoms": []},
+            "clarified_query": plan.get("clarified_query") or translated_query,
+            "search_strategy": plan.get("search_strategy", "hybrid"),
+            "original_query": query,
+            "translated_query": translated_query,
+            "language": detected_lang,
+        }
+        apply_image_results(clarification, image_results)
+
+        if not plan.get("result_query"):
+            return clarification, None
+
+        cypher_result = {field: plan.get(field) for field in CYPHER_FIELDS}
+        cypher_result["requires_embeddings"] = bool(cypher_result["requires_embeddings"])
+        cypher_result["embedding_params"] = cypher_result["embedding_params"] or {}
+        logger.info(
+            f"Query planned: intent={clarification['intent']}, strategy={clarification['search_strategy']}, "
+            f"requires_embeddings={cypher_result['requires_embeddings']}"
+        )
+        return clarification, cypher_result
+
+    @retry_with_backoff(max_retries=3)
+    def plan(self, query: str, image_results: List[Dict[str, Any]] | None = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        image_results = image_results or []
+
+        clarification = self.clarifier.try_fast_path(query)
+        if clarification:
+            apply_image_results(clarification, image_results)
+            return clarification, self.cypher_generator.generate_cypher(clarification)
+
+        translated_query, detected_lang = self.clarifier.translator.process_query(query)
+        prompt_text = self._build_prompt(translated_query, detected_lang, image_results)
+
+        with timed("plan"):
+            response = self.llm.invoke(prompt_text)
+        clarification, cypher_result = self._split_plan(
+            response.content, query, translated_query, detected_lang, image_results
+        )
+        templated = self.cypher_generator.from_template(clarification)
+        if templated is not None:
+            return clarification, self.cypher_generator.attach_embeddings(templated)
+        if cypher_result is None and self.cypher_generator.templates is not None:
+            return clarification, self.cypher_generator.generate_cypher(clarification)
+        if cypher_result is None:
+            return clarification, self.cypher_generator.fallback(clarification)
+        self.cypher_generator.remember(clarification, cypher_result)
+        return clarification, self.cypher_generator.attach_embeddings(cypher_result)
+
+    @async_retry_with_backoff(max_retries=3)
+    async def aplan(
+        self, query: str, image_results: List[Dict[str, Any]] | None = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        image_results = image_results or []
+
+        clarification = await asyncio.to_thread(self.clarifier.try_fast_path, query)
+        if clarification:
+            apply_image_results(clarification, image_results)
+            return clarification, await self.cypher_generator.agenerate_cypher(clarification)
+
+        translated_query, detected_lang = await self.clarifier.translator.aprocess_query(query)
+        prompt_text = self._build_prompt(translated_query, detected_lang, image_results)
+
+        with timed("plan"):
+            response = await self.llm.ainvoke(prompt_text)
+        clarification, cypher_result = self._split_plan(
+            response.content, query, translated_query, detected_lang, image_results
+        )
+        templated = self.cypher_generator.from_template(clarification)
+        if templated is not None:
+            return clarification, await self.cypher_generator.aattach_embeddings(templated)
+        if cypher_result is None and self.cypher_generator.templates is not None:
+            return clarification, await self.cypher_generator.agenerate_cypher(clarification)
+        if cypher_result is None:
+            return clarification, self.cypher_generator.fallback(clarification)
+        await self.cypher_generator.aremember(clarification, cypher_result)
+        return clarification, await self.cypher_generator.aattach_embeddings(cypher_result)
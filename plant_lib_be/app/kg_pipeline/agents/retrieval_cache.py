@@ -0,0 +1,150 @@
+import copy
+import hashlib
+import json
+import struct
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.metrics import RETRIEVAL_CACHE_BYTES, RETRIEVAL_CACHE_ENTRIES, RETRIEVAL_CACHE_REQUESTS
+from app.kg_pipeline.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def digest_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {str(k): digest_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, float) for item in value):
+            packed = struct.pack(f"{len(value)}d", *value)
+            return f"vector:{len(value)}:{hashlib.blake2b(packed, digest_size=16).hexdigest()}"
+        return [digest_value(item) for item in value]
+    return value
+
+
+def retrieval_key(count_query: str, result_query: str, params: Dict[str, Any]) -> str:
+    canonical = json.dumps(
+        [" ".join(count_query.split()), " ".join(result_query.split()), digest_value(params)],
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.blake2b(canonical.encode(), digest_size=20).hexdigest()
+
+
+def _size(retrieval_result: Dict[str, Any]) -> int:
+    return len(json.dumps(retrieval_result, ensure_ascii=False, default=str).encode())
+
+
+class RetrievalCache:
+    def __init__(self, graph, max_entries: int = 2000, ttl_seconds: int = 900, version_refresh_seconds: int = 30):
+        self.graph = graph
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_refresh_seconds = version_refresh_seconds
+        self.version: Optional[int] = None
+        self.version_checked_at = 0.0
+        self.entries: "OrderedDict[str, Tuple[float, int, int, Dict[str, Any]]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.lookups = 0
+        self.lock = Lock()
+        logger.info(
+            f"Retrieval cache initialized (max_entries={max_entries}, ttl={ttl_seconds}s, "
+            f"data version refresh={version_refresh_seconds}s)"
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def _version_due(self) -> bool:
+        return self.version is None or time.monotonic() - self.version_checked_at >= self.version_refresh_seconds
+
+    def set_version(self, version: int):
+        with self.lock:
+            self.version_checked_at = time.monotonic()
+            if version == self.version:
+                return
+            if self.version is not None:
+                logger.info(
+                    f"Graph data version changed {self.version} -> {version}, "
+                    f"dropping {len(self.entries)} cached retrievals"
+                )
+            self.version = version
+            self._clear()
+
+    def refresh_version(self):
+        if not self._version_due():
+            return
+        try:
+            self.set_version(self.graph.data_version())
+        except Exception as exc:
+            self.version_checked_at = time.monotonic()
+            logger.warning(f"Graph data version check failed: {exc}")
+
+    async def arefresh_version(self):
+        if not self._version_due():
+            return
+        try:
+            self.set_version(await self.graph.adata_version())
+        except Exception as exc:
+            self.version_checked_at = time.monotonic()
+            logger.warning(f"Graph data version check failed: {exc}")
+
+    def _drop(self, key: str):
+        _, _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def _publish(self):
+        RETRIEVAL_CACHE_BYTES.set(self.bytes)
+        RETRIEVAL_CACHE_ENTRIES.set(len(self.entries))
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            self.lookups += 1
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, version, _, retrieval_result = entry
+                if expires_at > time.monotonic() and version == self.version:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    RETRIEVAL_CACHE_REQUESTS.labels("hit").inc()
+                    return copy.deepcopy(retrieval_result)
+                self._drop(key)
+                self._publish()
+        RETRIEVAL_CACHE_REQUESTS.labels("miss").inc()
+        return None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        self.refresh_version()
+        return self._lookup(key)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        await self.arefresh_version()
+        return self._lookup(key)
+
+    def put(self, key: str, retrieval_result: Dict[str, Any], version: Optional[int]):
+        entry = copy.deepcopy(retrieval_result)
+        size = _size(entry) + len(key)
+        with self.lock:
+            if version is None or version != self.version:
+                return
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, version, size, entry)
+            self.bytes += size
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+            self._publish()
+
+    def _clear(self):
+        self.entries.clear()
+        self.bytes = 0
+        self._publish()
+
+    def clear(self):
+        with self.lock:
+            self._clear()
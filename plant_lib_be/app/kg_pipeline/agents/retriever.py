@@ -1,17 +1,79 @@
-from typing import Any, Dict
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
+from app.kg_pipeline.agents.retrieval_cache import RetrievalCache, retrieval_key
+from app.kg_pipeline.agents.slow_query_log import SlowQueryLog
 from app.kg_pipeline.config.logging_config import get_logger
+from app.kg_pipeline.config.settings import settings
+from app.kg_pipeline.utils.cypher_params import FUSED_COUNT_KEY, QueryTextTracker, fuse_count_query, parameterize
+from app.kg_pipeline.utils.result_budget import inject_limit, shape_results
+from app.kg_pipeline.utils.timing import timed
 
 logger = get_logger(__name__)
 
 
 class InformationRetriever:
-    def __init__(self, graph):
+    def __init__(
+        self,
+        graph,
+        mode: str | None = None,
+        cache: RetrievalCache | None = None,
+        slow_log: SlowQueryLog | None = None,
+    ):
         self.graph = graph
-        logger.info("Information retriever initialized")
+        self.cache = cache
+        self.slow_log = slow_log
+        self.mode = mode or settings.cypher.retrieval_mode
+        self._pool: ThreadPoolExecutor | None = None
+        self.row_limit = settings.cypher.result_row_limit
+        self.parameterize_literals = settings.cypher.parameterize_literals
+        self.query_texts = QueryTextTracker(settings.cypher.query_text_tracker_size)
+        logger.info(f"Information retriever initialized (mode: {self.mode})")
 
-    def retrieve(self, cypher_result: Dict) -> Dict[str, Any]:
-        retrieval_result: Dict[str, Any] = {
+    def _observe(self, kind: str, query: str, params: Dict, start: float, rows: List[Dict[str, Any]]):
+        if self.slow_log is not None:
+            self.slow_log.observe(kind, query, params, (time.perf_counter() - start) * 1000, len(rows))
+
+    def query(
+        self, query: str, params: Dict | None = None, max_rows: int | None = None, kind: str = "query"
+    ) -> List[Dict[str, Any]]:
+        params = params or {}
+        start = time.perf_counter()
+        rows = self.graph.query(query, params, max_rows=max_rows)
+        self._observe(kind, query, params, start, rows)
+        return rows
+
+    async def aquery(
+        self, query: str, params: Dict | None = None, max_rows: int | None = None, kind: str = "query"
+    ) -> List[Dict[str, Any]]:
+        params = params or {}
+        start = time.perf_counter()
+        rows = await self.graph.aquery(query, params, max_rows=max_rows)
+        self._observe(kind, query, params, start, rows)
+        return rows
+
+    def _prepare(
+        self, query: str, params: Dict[str, Any], retrieval_result: Dict[str, Any], kind: str
+    ) -> Tuple[str, Dict[str, Any]]:
+        if self.parameterize_literals:
+            query, literals = parameterize(query, params.keys())
+            params = {**params, **literals}
+            retrieval_result["cypher_used"][kind] = query
+            retrieval_result["cypher_used"][f"{kind}_literals"] = literals
+        if not self.query_texts.observe(query):
+            logger.debug(f"New Cypher query text for {kind} (repeat rate {self.query_texts.repeat_rate:.2%})")
+        return query, params
+
+    @staticmethod
+    def _query_params(cypher_result: Dict) -> Dict[str, Any]:
+        return {**cypher_result.get("params", {}), **cypher_result.get("embeddings", {})}
+
+    @staticmethod
+    def _empty_result(cypher_result: Dict) -> Dict[str, Any]:
+        return {
             "total_count": 0,
             "results": [],
             "success": False,
@@ -22,31 +84,218 @@ class InformationRetriever:
             },
         }
 
+    @staticmethod
+    def _apply_count(retrieval_result: Dict[str, Any], count_result: List[Dict[str, Any]]):
+        if count_result and len(count_result) > 0:
+            retrieval_result["total_count"] = count_result[0].get("total_count", 0)
+        logger.debug(f"Count query result: {retrieval_result['total_count']}")
+
+    @staticmethod
+    def _apply_results(retrieval_result: Dict[str, Any], results: List[Dict[str, Any]]):
+        with timed("shape_results"):
+            shaped = shape_results(
+                results,
+                settings.cypher.result_field_max_chars,
+                settings.cypher.result_list_max_items,
+                settings.cypher.group_results,
+            )
+        retrieval_result["results"] = shaped
+        retrieval_result["raw_row_count"] = len(results)
+        retrieval_result["success"] = True
+        logger.info(f"Successfully retrieved {len(results)} rows ({len(shaped)} after shaping)")
+
+    @staticmethod
+    def _fail(retrieval_result: Dict[str, Any], exc: Exception):
+        retrieval_result["error"] = str(exc)
+        retrieval_result["success"] = False
+        logger.error(f"RESULT query failed: {exc}")
+
+    def _apply_fused(self, retrieval_result: Dict[str, Any], rows: List[Dict[str, Any]]):
+        total_count = rows[0].get(FUSED_COUNT_KEY) if rows else None
+        self._apply_results(retrieval_result, [{k: v for k, v in row.items() if k != FUSED_COUNT_KEY} for row in rows])
+        retrieval_result["total_count"] = total_count or 0
+        logger.debug(f"Fused query result: {retrieval_result['total_count']} total")
+
+    def _fused_query(
+        self, count_query: str, result_query: str, params: Dict[str, Any], retrieval_result: Dict[str, Any]
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        query = fuse_count_query(count_query, inject_limit(result_query, self.row_limit))
+        if query is None:
+            logger.debug("Result query has a top-level ORDER BY, running count and result queries separately")
+            return None
+        query, params = self._prepare(query, params, retrieval_result, "fused_query")
+        retrieval_result["cypher_used"]["fused_query"] = query
+        return query, params
+
+    def _count(self, count_query: str, params: Dict[str, Any], retrieval_result: Dict[str, Any]):
+        try:
+            count_query, count_params = self._prepare(count_query, params, retrieval_result, "count_query")
+            with timed("count_query"):
+                count_result = self.query(count_query, count_params, kind="count_query")
+            self._apply_count(retrieval_result, count_result)
+        except Exception as exc:
+            logger.warning(f"COUNT query failed: {exc}")
+            retrieval_result["total_count"] = -1
+
+    def _results(self, result_query: str, params: Dict[str, Any], retrieval_result: Dict[str, Any]):
         try:
-            params = cypher_result.get("embeddings", {})
+            result_query = inject_limit(result_query, self.row_limit)
+            result_query, result_params = self._prepare(result_query, params, retrieval_result, "result_query")
+            with timed("result_query"):
+                results = self.query(result_query, result_params, max_rows=self.row_limit, kind="result_query")
+            self._apply_results(retrieval_result, results)
+        except Exception as exc:
+            self._fail(retrieval_result, exc)
+
+    async def _acount(self, count_query: str, params: Dict[str, Any], retrieval_result: Dict[str, Any]):
+        try:
+            count_query, count_params = self._prepare(count_query, params, retrieval_result, "count_query")
+            with timed("count_query"):
+                count_result = await self.aquery(count_query, count_params, kind="count_query")
+            self._apply_count(retrieval_result, count_result)
+        except Exception as exc:
+            logger.warning(f"COUNT query failed: {exc}")
+            retrieval_result["total_count"] = -1
+
+    async def _aresults(self, result_query: str, params: Dict[str, Any], retrieval_result: Dict[str, Any]):
+        try:
+            result_query = inject_limit(result_query, self.row_limit)
+            result_query, result_params = self._prepare(result_query, params, retrieval_result, "result_query")
+            with timed("result_query"):
+                results = await self.aquery(result_query, result_params, max_rows=self.row_limit, kind="result_query")
+            self._apply_results(retrieval_result, results)
+        except Exception as exc:
+            self._fail(retrieval_result, exc)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="kg-retriever")
+        return self._pool
+
+    def _cache_key(self, cypher_result: Dict) -> str | None:
+        if self.cache is None or not cypher_result.get("result_query"):
+            return None
+        return retrieval_key(
+            cypher_result.get("count_query", ""), cypher_result["result_query"], self._query_params(cypher_result)
+        )
+
+    def _cache_put(self, key: str | None, retrieval_result: Dict[str, Any], version: int | None):
+        if key is None or not retrieval_result["success"] or (retrieval_result["total_count"] or 0) < 0:
+            return
+        self.cache.put(key, retrieval_result, version)
+
+    def retrieve(self, cypher_result: Dict) -> Dict[str, Any]:
+        key = self._cache_key(cypher_result)
+        if key is None:
+            return self._retrieve(cypher_result)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug(f"Retrieval cache hit (hit rate {self.cache.hit_rate:.2%})")
+            return cached
+        version = self.cache.version
+        retrieval_result = self._retrieve(cypher_result)
+        self._cache_put(key, retrieval_result, version)
+        return retrieval_result
+
+    async def aretrieve(self, cypher_result: Dict) -> Dict[str, Any]:
+        key = self._cache_key(cypher_result)
+        if key is None:
+            return await self._aretrieve(cypher_result)
+        cached = await self.cache.aget(key)
+        if cached is not None:
+            logger.debug(f"Retrieval cache hit (hit rate {self.cache.hit_rate:.2%})")
+            return cached
+        version = self.cache.version
+        retrieval_result = await self._aretrieve(cypher_result)
+        self._cache_put(key, retrieval_result, version)
+        return retrieval_result
+
+    def _retrieve(self, cypher_result: Dict) -> Dict[str, Any]:
+        retrieval_result = self._empty_result(cypher_result)
 
+        try:
+            params = self._query_params(cypher_result)
             count_query = cypher_result.get("count_query", "")
-            if count_query:
+            result_query = cypher_result.get("result_query", "")
+
+            if self.mode == "fused" and count_query and result_query:
                 try:
-                    count_result = self.graph.query(count_query, params)
-                    if count_result and len(count_result) > 0:
-                        retrieval_result["total_count"] = count_result[0].get("total_count", 0)
-                    logger.debug(f"Count query result: {retrieval_result['total_count']}")
+                    fused = self._fused_query(count_query, result_query, params, retrieval_result)
+                    if fused is not None:
+                        fused_query, fused_params = fused
+                        with timed("fused_query"):
+                            rows = self.query(fused_query, fused_params, max_rows=self.row_limit, kind="fused_query")
+                        self._apply_fused(retrieval_result, rows)
+                        if not rows:
+                            self._count(count_query, params, retrieval_result)
+                        return retrieval_result
                 except Exception as exc:
-                    logger.warning(f"COUNT query failed: {exc}")
-                    retrieval_result["total_count"] = -1
+                    logger.warning(f"Fused query failed, running count and result queries separately: {exc}")
 
-            result_query = cypher_result.get("result_query", "")
+            if count_query and result_query and self.mode != "sequential":
+                futures = [
+                    self._executor().submit(
+                        contextvars.copy_context().run, self._count, count_query, params, retrieval_result
+                    ),
+                    self._executor().submit(
+                        contextvars.copy_context().run, self._results, result_query, params, retrieval_result
+                    ),
+                ]
+                for future in futures:
+                    future.result()
+                return retrieval_result
+
+            if count_query:
+                self._count(count_query, params, retrieval_result)
             if result_query:
+                self._results(result_query, params, retrieval_result)
+            else:
+                retrieval_result["error"] = "No result query provided"
+                retrieval_result["success"] = False
+
+            return retrieval_result
+
+        except Exception as exc:
+            retrieval_result["error"] = str(exc)
+            retrieval_result["success"] = False
+            logger.error(f"Retrieval failed: {exc}")
+            return retrieval_result
+
+    async def _aretrieve(self, cypher_result: Dict) -> Dict[str, Any]:
+        retrieval_result = self._empty_result(cypher_result)
+
+        try:
+            params = self._query_params(cypher_result)
+            count_query = cypher_result.get("count_query", "")
+            result_query = cypher_result.get("result_query", "")
+
+            if self.mode == "fused" and count_query and result_query:
                 try:
-                    results = self.graph.query(result_query, params)
-                    retrieval_result["results"] = results
-                    retrieval_result["success"] = True
-                    logger.info(f"Successfully retrieved {len(results)} results")
+                    fused = self._fused_query(count_query, result_query, params, retrieval_result)
+                    if fused is not None:
+                        fused_query, fused_params = fused
+                        with timed("fused_query"):
+                            rows = await self.aquery(
+                                fused_query, fused_params, max_rows=self.row_limit, kind="fused_query"
+                            )
+                        self._apply_fused(retrieval_result, rows)
+                        if not rows:
+                            await self._acount(count_query, params, retrieval_result)
+                        return retrieval_result
                 except Exception as exc:
-                    retrieval_result["error"] = str(exc)
-                    retrieval_result["success"] = False
-                    logger.error(f"RESULT query failed: {exc}")
+                    logger.warning(f"Fused query failed, running count and result queries separately: {exc}")
+
+            if count_query and result_query and self.mode != "sequential":
+                await asyncio.gather(
+                    self._acount(count_query, params, retrieval_result),
+                    self._aresults(result_query, params, retrieval_result),
+                )
+                return retrieval_result
+
+            if count_query:
+                await self._acount(count_query, params, retrieval_result)
+            if result_query:
+                await self._aresults(result_query, params, retrieval_result)
             else:
                 retrieval_result["error"] = "No result query provided"
                 retrieval_result["success"] = False
@@ -0,0 +1,133 @@
+import hashlib
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.metrics import NEO4J_SLOW_QUERIES
+from app.kg_pipeline.agents.retrieval_cache import digest_value
+from app.kg_pipeline.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_current_chat_id: ContextVar[Optional[str]] = ContextVar("kg_chat_id", default=None)
+
+
+@contextmanager
+def chat_context(chat_id: str):
+    token = _current_chat_id.set(chat_id)
+    try:
+        yield chat_id
+    finally:
+        _current_chat_id.reset(token)
+
+
+def current_chat_id() -> Optional[str]:
+    return _current_chat_id.get()
+
+
+def summarize_plan(profile: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    children = [summarize_plan(child) for child in profile.get("children") or []]
+    db_hits = (profile.get("dbHits") or 0) + sum(hits for _, hits in children)
+    args = profile.get("args") or {}
+    plan = {
+        "operator": profile.get("operatorType"),
+        "details": args.get("Details"),
+        "rows": profile.get("rows"),
+        "db_hits": profile.get("dbHits"),
+        "estimated_rows": args.get("EstimatedRows"),
+        "children": [child for child, _ in children],
+    }
+    return {k: v for k, v in plan.items() if v not in (None, [])}, db_hits
+
+
+class SlowQueryLog:
+    def __init__(
+        self,
+        graph,
+        store,
+        threshold_ms: int = 500,
+        profile: bool = True,
+        sample_rate: float = 0.1,
+        cooldown_seconds: int = 300,
+        max_pending: int = 4,
+    ):
+        self.graph = graph
+        self.store = store
+        self.threshold_ms = threshold_ms
+        self.profile = profile
+        self.sample_rate = sample_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.max_pending = max_pending
+        self.profiled_at: Dict[str, float] = {}
+        self.pending = 0
+        self.lock = Lock()
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kg-slow-query")
+        logger.info(f"Slow query log initialized (threshold={threshold_ms}ms, profile={profile})")
+
+    def _should_profile(self, query_hash: str) -> bool:
+        if not self.profile or random.random() >= self.sample_rate:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            if self.pending >= self.max_pending:
+                return False
+            if now - self.profiled_at.get(query_hash, float("-inf")) < self.cooldown_seconds:
+                return False
+            if len(self.profiled_at) > 1000:
+                self.profiled_at = {k: t for k, t in self.profiled_at.items() if now - t < self.cooldown_seconds}
+            self.profiled_at[query_hash] = now
+            self.pending += 1
+            return True
+
+    def observe(self, kind: str, query: str, params: Dict[str, Any], elapsed_ms: float, rows: int):
+        if elapsed_ms < self.threshold_ms:
+            return
+        query_hash = hashlib.sha256(" ".join(query.split()).encode()).hexdigest()
+        profile = self._should_profile(query_hash)
+        chat_id = current_chat_id()
+        NEO4J_SLOW_QUERIES.labels(kind, str(profile).lower()).inc()
+        logger.warning(
+            f"Slow {kind} ({elapsed_ms:.0f}ms, {rows} rows, chat {chat_id}): {' '.join(query.split())[:200]}"
+        )
+        self.pool.submit(self._record, chat_id, kind, query_hash, query, params, elapsed_ms, rows, profile)
+
+    def _record(
+        self,
+        chat_id: Optional[str],
+        kind: str,
+        query_hash: str,
+        query: str,
+        params: Dict[str, Any],
+        elapsed_ms: float,
+        rows: int,
+        profile: bool,
+    ):
+        plan = None
+        db_hits = None
+        if profile:
+            try:
+                plan, db_hits = summarize_plan(self.graph.profile(query, params))
+            except Exception as exc:
+                logger.warning(f"PROFILE of slow {kind} failed: {exc}")
+            finally:
+                with self.lock:
+                    self.pending -= 1
+
+        try:
+            self.store.queue_slow_query(
+                chat_id=chat_id,
+                query_kind=kind,
+                query_hash=query_hash,
+                query_text=query,
+                params=digest_value(params),
+                elapsed_ms=round(elapsed_ms, 2),
+                rows=rows,
+                db_hits=db_hits,
+                plan=plan,
+            )
+        except Exception as exc:
+            logger.warning(f"Failed to record slow {kind}: {exc}")
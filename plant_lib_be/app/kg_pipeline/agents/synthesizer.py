@@ -1,10 +1,11 @@
 import json
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict
 
 from langchain_core.prompts.prompt import PromptTemplate
 
 from app.kg_pipeline.config.logging_config import get_logger
-from app.kg_pipeline.utils.retry import retry_with_backoff
+from app.kg_pipeline.utils.retry import async_retry_with_backoff, retry_with_backoff
+from app.kg_pipeline.utils.timing import timed
 
 logger = get_logger(__name__)
 
@@ -49,33 +50,80 @@ class AnswerSynthesizer:
         )
         logger.info("Answer synthesizer initialized")
 
+    def _build_prompt(self, clarification: Dict, retrieval_result: Dict) -> str:
+        results_str = json.dumps(
+            retrieval_result["results"][:10], ensure_ascii=False, separators=(",", ":"), default=str
+        )
+        return self.synthesis_prompt.format(
+            query=clarification["clarified_query"],
+            intent=clarification["intent"],
+            results=results_str,
+            total_count=retrieval_result["total_count"],
+        )
+
+    @staticmethod
+    def _fallback_answer(retrieval_result: Dict) -> str:
+        if retrieval_result["results"]:
+            answer_vi = f"Tìm thấy {len(retrieval_result['results'])} kết quả:\n"
+            for idx, result in enumerate(retrieval_result["results"][:5], 1):
+                answer_vi += f"\n{idx}. {json.dumps(result, ensure_ascii=False)}"
+            return answer_vi
+        return "Xin lỗi, không tìm thấy kết quả phù hợp."
+
+    @staticmethod
+    def _build_result(answer: str, answer_vi: str, original_lang: str, retrieval_result: Dict) -> Dict[str, Any]:
+        return {
+            "answer": answer,
+            "answer_vi": answer_vi,
+            "success": True,
+            "metadata": {
+                "total_results": retrieval_result["total_count"],
+                "displayed_results": len(retrieval_result["results"][:10]),
+                "original_language": original_lang,
+            },
+        }
+
     @retry_with_backoff(max_retries=3)
     def synthesize(self, clarification: Dict, retrieval_result: Dict) -> Dict[str, Any]:
-        results_str = json.dumps(retrieval_result["results"][:10], ensure_ascii=False, indent=2)
+        try:
+            with timed("synthesize"):
+                response = self.llm.invoke(self._build_prompt(clarification, retrieval_result))
+            answer_vi = response.content.strip()
+            logger.debug("Answer synthesized successfully in Vietnamese")
+        except Exception as exc:
+            logger.error(f"Answer synthesis failed: {exc}")
+            answer_vi = self._fallback_answer(retrieval_result)
+
+        original_lang = clarification["language"]
+        if original_lang != self.translator.data_language:
+            try:
+                with timed("translate"):
+                    answer = self.translator.translate_response(answer_vi, original_lang)
+                logger.debug(f"Answer translated to {original_lang}")
+            except Exception as exc:
+                logger.warning(f"Translation failed: {exc}, using Vietnamese answer")
+                answer = answer_vi
+        else:
+            answer = answer_vi
+
+        return self._build_result(answer, answer_vi, original_lang, retrieval_result)
 
+    @async_retry_with_backoff(max_retries=3)
+    async def asynthesize(self, clarification: Dict, retrieval_result: Dict) -> Dict[str, Any]:
         try:
-            prompt = self.synthesis_prompt.format(
-                query=clarification["clarified_query"],
-                intent=clarification["intent"],
-                results=results_str,
-                total_count=retrieval_result["total_count"],
-            )
-            response = self.llm.invoke(prompt)
+            with timed("synthesize"):
+                response = await self.llm.ainvoke(self._build_prompt(clarification, retrieval_result))
             answer_vi = response.content.strip()
             logger.debug("Answer synthesized successfully in Vietnamese")
         except Exception as exc:
             logger.error(f"Answer synthesis failed: {exc}")
-            if retrieval_result["results"]:
-                answer_vi = f"Tìm thấy {len(retrieval_result['results'])} kết quả:\n"
-                for idx, result in enumerate(retrieval_result["results"][:5], 1):
-                    answer_vi += f"\n{idx}. {json.dumps(result, ensure_ascii=False)}"
-            else:
-                answer_vi = "Xin lỗi, không tìm thấy kết quả phù hợp."
+            answer_vi = self._fallback_answer(retrieval_result)
 
         original_lang = clarification["language"]
         if original_lang != self.translator.data_language:
             try:
-                answer = self.translator.translate_response(answer_vi, original_lang)
+                with timed("translate"):
+                    answer = await self.translator.atranslate_response(answer_vi, original_lang)
                 logger.debug(f"Answer translated to {original_lang}")
             except Exception as exc:
                 logger.warning(f"Translation failed: {exc}, using Vietnamese answer")
@@ -83,13 +131,48 @@ class AnswerSynthesizer:
         else:
             answer = answer_vi
 
-        return {
-            "answer": answer,
-            "answer_vi": answer_vi,
-            "success": True,
-            "metadata": {
-                "total_results": retrieval_result["total_count"],
-                "displayed_results": len(retrieval_result["results"][:10]),
-                "original_language": original_lang,
-            },
-        }
+        return self._build_result(answer, answer_vi, original_lang, retrieval_result)
+
+    async def astream(self, clarification: Dict, retrieval_result: Dict) -> AsyncIterator[Dict[str, Any]]:
+        original_lang = clarification["language"]
+        translate = original_lang != self.translator.data_language
+
+        parts = []
+        try:
+            with timed("synthesize"):
+                async for chunk in self.llm.astream(self._build_prompt(clarification, retrieval_result)):
+                    if not chunk.content:
+                        continue
+                    parts.append(chunk.content)
+                    if not translate:
+                        yield {"type": "token", "text": chunk.content}
+            answer_vi = "".join(parts).strip()
+            logger.debug("Answer streamed successfully in Vietnamese")
+        except Exception as exc:
+            logger.error(f"Answer streaming failed: {exc}")
+            if parts and not translate:
+                answer_vi = "".join(parts).strip()
+            else:
+                answer_vi = self._fallback_answer(retrieval_result)
+                if not translate:
+                    yield {"type": "token", "text": answer_vi}
+
+        answer = answer_vi
+        if translate:
+            translated_parts = []
+            try:
+                with timed("translate"):
+                    async for text in self.translator.astream_translate(answer_vi, original_lang, context="response"):
+                        translated_parts.append(text)
+                        yield {"type": "token", "text": text}
+                answer = "".join(translated_parts).strip()
+                logger.debug(f"Answer translated to {original_lang}")
+            except Exception as exc:
+                logger.warning(f"Translation failed: {exc}, using Vietnamese answer")
+                if not translated_parts:
+                    yield {"type": "token", "text": answer_vi}
+                    answer = answer_vi
+                else:
+                    answer = "".join(translated_parts).strip()
+
+        yield {"type": "result", "result": self._build_result(answer, answer_vi, original_lang, retrieval_result)}
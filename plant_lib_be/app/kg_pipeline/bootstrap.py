@@ -1,27 +1,33 @@
 from __future__ import annotations
 
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from threading import Lock
-
-import google.generativeai as genai
-from langchain_community.graphs import Neo4jGraph
-from langchain_google_genai import ChatGoogleGenerativeAI
-
-from app.kg_pipeline.agents import (
-    AnswerSynthesizer,
-    CypherGenerator,
-    InformationRetriever,
-    QueryClarifier,
-)
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from app.core.metrics import PIPELINE_COMPONENT_INIT_SECONDS
 from app.kg_pipeline.config import get_logger, settings, setup_logging
 from app.kg_pipeline.database import SessionManager, db_connection, session_manager
-from app.kg_pipeline.embeddings import ImageEmbedder, TextEmbedder
-from app.kg_pipeline.orchestrator import Pipeline
-from app.kg_pipeline.utils import APIKeyManager, Translator
+
+if TYPE_CHECKING:
+    from app.kg_pipeline.embeddings import ImageEmbedder, TextEmbedder
+    from app.kg_pipeline.orchestrator import Pipeline
+    from app.kg_pipeline.utils import APIKeyManager
 
 logger = get_logger(__name__)
 _bundle_lock = Lock()
 _bundle: "PipelineBundle | None" = None
+_warmup_thread: Thread | None = None
+_warmup_error: str | None = None
+_status_lock = Lock()
+_components: Dict[str, Dict[str, Any]] = {}
+_preloaded: Dict[str, Any] = {}
+
+
+class PipelineWarmingUp(RuntimeError):
+    pass
 
 
 class EmbedderWrapper:
@@ -32,6 +38,9 @@ class EmbedderWrapper:
     def embed_text(self, text: str):
         return self.text.embed(text)
 
+    def embed_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
+        return self.text.embed_batch(texts)
+
     def embed(self, path: str):
         return self.image.embed(path)
 
@@ -46,16 +55,40 @@ class PipelineBundle:
     api_key_manager: APIKeyManager
 
 
-def _build_bundle() -> PipelineBundle:
-    setup_logging()
-    logger.info("=" * 60)
-    logger.info("Initializing KG Plant Disease pipeline")
-    logger.info("=" * 60)
+def _set_status(name: str, status: str, seconds: float | None = None, error: str | None = None):
+    with _status_lock:
+        _components[name] = {"status": status, "seconds": seconds, "error": error}
+
+
+def _component(name: str, build: Callable[[], Any]) -> Any:
+    _set_status(name, "loading")
+    start = time.perf_counter()
+    try:
+        value = build()
+    except Exception as exc:
+        seconds = time.perf_counter() - start
+        _set_status(name, "failed", round(seconds, 3), str(exc))
+        logger.error(f"KG component {name} failed after {seconds:.2f}s: {exc}")
+        raise
+    seconds = time.perf_counter() - start
+    _set_status(name, "ready", round(seconds, 3))
+    PIPELINE_COMPONENT_INIT_SECONDS.labels(name).set(seconds)
+    logger.info(f"KG component {name} ready in {seconds:.2f}s")
+    return value
+
 
+def _init_database():
     db_connection.create_tables()
     if not db_connection.test_connection():
         raise RuntimeError("KG database connection failed")
 
+
+def _init_llm():
+    import google.generativeai as genai
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    from app.kg_pipeline.utils import APIKeyManager
+
     if not settings.gemini.api_keys:
         raise RuntimeError("KG Gemini API keys are not configured")
 
@@ -68,25 +101,138 @@ def _build_bundle() -> PipelineBundle:
         temperature=0.3,
     )
     logger.info(f"LLM initialized: {settings.gemini.chat_model}")
+    return api_manager, llm
 
-    graph = Neo4jGraph(
-        url=settings.neo4j.url,
-        username=settings.neo4j.username,
-        password=settings.neo4j.password,
-    )
+
+def _init_neo4j():
+    from app.kg_pipeline.graph import GraphClient
+
+    graph = GraphClient()
     logger.info("Neo4j connected successfully")
+    return graph
+
+
+def _init_text_embedder():
+    if settings.embedding.serving == "server":
+        from app.kg_pipeline.embeddings.model_server import RemoteTextEmbedder, connect
+
+        return RemoteTextEmbedder(connect())
+    if "text" in _preloaded:
+        return _preloaded["text"]
+
+    from app.kg_pipeline.embeddings.text_embedder import TextEmbedder
+
+    return TextEmbedder()
+
+
+def _init_image_embedder():
+    if settings.embedding.serving == "server":
+        from app.kg_pipeline.embeddings.model_server import RemoteImageEmbedder, connect
 
-    text_embedder = TextEmbedder()
-    image_embedder = ImageEmbedder()
-    embedder = EmbedderWrapper(text_embedder, image_embedder)
+        return RemoteImageEmbedder(connect())
+    if "image" in _preloaded:
+        return _preloaded["image"]
+
+    from app.kg_pipeline.embeddings.image_embedder import ImageEmbedder
+
+    return ImageEmbedder()
+
+
+def preload_embedders():
+    if _preloaded:
+        return
+    logger.info(f"Preloading embedders in pid {os.getpid()} so forked workers share the weights")
+    _preloaded["text"] = _init_text_embedder()
+    _preloaded["image"] = _init_image_embedder()
+
+
+def _build_bundle() -> PipelineBundle:
+    setup_logging()
+    logger.info("=" * 60)
+    logger.info("Initializing KG Plant Disease pipeline")
+    logger.info("=" * 60)
+
+    builders = {
+        "database": _init_database,
+        "llm": _init_llm,
+        "neo4j": _init_neo4j,
+        "text_embedder": _init_text_embedder,
+        "image_embedder": _init_image_embedder,
+    }
+    for name in list(builders) + ["pipeline"]:
+        _set_status(name, "pending")
+    with ThreadPoolExecutor(max_workers=len(builders), thread_name_prefix="kg-warmup") as pool:
+        futures = {name: pool.submit(_component, name, build) for name, build in builders.items()}
+    results = {name: future.result() for name, future in futures.items()}
+
+    return _component("pipeline", lambda: _assemble(results))
+
+
+def _assemble(results: Dict[str, Any]) -> PipelineBundle:
+    from app.kg_pipeline.agents import (
+        AnswerSynthesizer,
+        CypherCache,
+        CypherGenerator,
+        CypherTemplateLibrary,
+        EntityDictionary,
+        InformationRetriever,
+        IntentClassifier,
+        QueryClarifier,
+        QueryPlanner,
+        RetrievalCache,
+        RuleBasedClarifier,
+        SlowQueryLog,
+    )
+    from app.kg_pipeline.orchestrator import Pipeline
+    from app.kg_pipeline.utils import Translator
+
+    api_manager, llm = results["llm"]
+    graph = results["neo4j"]
+    embedder = EmbedderWrapper(results["text_embedder"], results["image_embedder"])
     dims = embedder.get_dimensions()
     logger.info(f"Embedders ready: text={dims['text']}D, image={dims['image']}D")
 
     translator = Translator(llm)
-    agent1_clarifier = QueryClarifier(llm, translator)
-    agent2_cypher = CypherGenerator(llm, embedder, graph)
-    agent3_retriever = InformationRetriever(graph)
+    fast_path = None
+    if settings.clarifier.fast_path_enabled:
+        intent_classifier = None
+        if settings.clarifier.intent_classifier_enabled:
+            intent_classifier = IntentClassifier.load(embedder)
+        fast_path = RuleBasedClarifier(EntityDictionary.load(graph), intent_classifier)
+    agent1_clarifier = QueryClarifier(llm, translator, fast_path)
+    cypher_templates = CypherTemplateLibrary() if settings.cypher.templates_enabled else None
+    cypher_cache = None
+    if settings.cypher.cache_enabled:
+        cypher_cache = CypherCache(
+            max_entries=settings.cypher.cache_max_entries,
+            ttl_seconds=settings.cypher.cache_ttl_hours * 3600,
+            store=session_manager if settings.cypher.cache_persistent else None,
+        )
+    agent2_cypher = CypherGenerator(llm, embedder, graph, cypher_templates, cypher_cache)
+    retrieval_cache = None
+    if settings.cypher.retrieval_cache_enabled:
+        retrieval_cache = RetrievalCache(
+            graph,
+            max_entries=settings.cypher.retrieval_cache_max_entries,
+            ttl_seconds=settings.cypher.retrieval_cache_ttl_seconds,
+            version_refresh_seconds=settings.cypher.data_version_refresh_seconds,
+        )
+    slow_log = None
+    if settings.slow_query.enabled:
+        slow_log = SlowQueryLog(
+            graph,
+            session_manager,
+            threshold_ms=settings.slow_query.threshold_ms,
+            profile=settings.slow_query.profile,
+            sample_rate=settings.slow_query.profile_sample_rate,
+            cooldown_seconds=settings.slow_query.profile_cooldown_seconds,
+            max_pending=settings.slow_query.max_pending_profiles,
+        )
+    agent3_retriever = InformationRetriever(graph, cache=retrieval_cache, slow_log=slow_log)
     agent4_synthesizer = AnswerSynthesizer(llm, translator)
+    planner = None
+    if settings.pipeline.mode == "combined":
+        planner = QueryPlanner(llm, agent1_clarifier, agent2_cypher)
 
     pipeline = Pipeline(
         agent1_clarifier,
@@ -95,6 +241,7 @@ def _build_bundle() -> PipelineBundle:
         agent4_synthesizer,
         session_manager,
         embedder,
+        planner,
     )
 
     logger.info("KG pipeline initialization complete")
@@ -110,3 +257,49 @@ def get_pipeline_bundle() -> PipelineBundle:
             return _bundle
         _bundle = _build_bundle()
         return _bundle
+
+
+def _warmup():
+    global _warmup_error
+    try:
+        get_pipeline_bundle()
+        _warmup_error = None
+    except Exception as exc:
+        _warmup_error = str(exc)
+        logger.error(f"KG pipeline warmup failed: {exc}")
+
+
+def start_warmup() -> bool:
+    global _warmup_thread
+    with _status_lock:
+        if _bundle is not None or (_warmup_thread is not None and _warmup_thread.is_alive()):
+            return False
+        _warmup_thread = Thread(target=_warmup, name="kg-warmup", daemon=True)
+        _warmup_thread.start()
+    logger.info("KG pipeline warmup started in background")
+    return True
+
+
+def get_ready_bundle() -> PipelineBundle:
+    if _bundle is not None:
+        return _bundle
+    error = _warmup_error
+    start_warmup()
+    if error:
+        raise PipelineWarmingUp(f"KG pipeline init failed, retrying: {error}")
+    raise PipelineWarmingUp("KG pipeline is warming up")
+
+
+def readiness() -> Dict[str, Any]:
+    with _status_lock:
+        components = {name: dict(state) for name, state in _components.items()}
+        warming = _warmup_thread is not None and _warmup_thread.is_alive()
+    if _bundle is not None:
+        status = "ready"
+    elif warming:
+        status = "warming"
+    elif _warmup_error:
+        status = "failed"
+    else:
+        status = "idle"
+    return {"ready": _bundle is not None, "status": status, "error": _warmup_error, "components": components}
@@ -0,0 +1,132 @@
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from app.kg_pipeline.cli.common import pss_mb, rss_mb
+from app.kg_pipeline.config import get_logger, settings
+
+logger = get_logger(__name__)
+
+MODES = ("local", "preload", "server")
+
+
+def _worker(index: int, seconds: float, batch: int, barrier, results):
+    from app.kg_pipeline import bootstrap
+    from app.kg_pipeline.agents.intent_classifier import load_examples
+
+    embedder = bootstrap.EmbedderWrapper(bootstrap._init_text_embedder(), bootstrap._init_image_embedder())
+    texts = [text for text, _ in load_examples()]
+    barrier.wait()
+
+    count = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        chunk = [f"{texts[(count + offset) % len(texts)]} #{index}-{count + offset}" for offset in range(batch)]
+        embedder.embed_texts(chunk)
+        count += batch
+    results.put({"worker": index, "embeddings": count, "rss_mb": rss_mb(), "pss_mb": pss_mb()})
+
+
+def _start_server(socket_path: str) -> subprocess.Popen:
+    from app.kg_pipeline.embeddings.model_server import PROJECT_ROOT, ModelServerClient
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.kg_pipeline.cli.model_server", "--socket", socket_path],
+        cwd=PROJECT_ROOT,
+    )
+    client = ModelServerClient(socket_path)
+    deadline = time.monotonic() + settings.embedding.server_start_timeout_seconds
+    while not client.ping():
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError("Embedding model server failed to start")
+        time.sleep(0.5)
+    return process
+
+
+def _run_mode(mode: str, workers: int, seconds: float, batch: int, out):
+    server = None
+    if mode == "server":
+        server = _start_server(settings.embedding.server_socket)
+    if mode == "preload":
+        from app.kg_pipeline import preload_embedders
+
+        preload_embedders()
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context("spawn")
+
+    barrier = context.Barrier(workers + 1)
+    results = context.Queue()
+    processes = [context.Process(target=_worker, args=(i, seconds, batch, barrier, results)) for i in range(workers)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    barrier.wait(timeout=settings.embedding.server_start_timeout_seconds)
+    ready_seconds = time.perf_counter() - start
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    shared_pss = 0.0
+    if server is not None:
+        shared_pss = pss_mb(server.pid)
+        server.terminate()
+        server.wait()
+    elif mode == "preload":
+        shared_pss = pss_mb()
+
+    out.put({"mode": mode, "ready_seconds": ready_seconds, "workers": reports, "shared_pss_mb": shared_pss})
+
+
+def _measure(mode: str, workers: int, seconds: float, batch: int, socket_path: str) -> Dict:
+    os.environ.update(
+        {
+            "KG_EMBEDDING__SERVING": mode,
+            "KG_EMBEDDING__SERVER_SOCKET": socket_path,
+            "KG_EMBEDDING__SERVER_AUTOSTART": "false",
+            "KG_EMBEDDING__TEXT_CACHE_ENABLED": "false",
+        }
+    )
+    context = multiprocessing.get_context("spawn")
+    out = context.Queue()
+    runner = context.Process(target=_run_mode, args=(mode, workers, seconds, batch, out))
+    runner.start()
+    report = out.get()
+    runner.join()
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare per-worker memory and embeddings/sec for local, preload (fork) and model-server serving"
+    )
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--batch", type=int, default=1, help="Texts per embed_texts call")
+    args = parser.parse_args(argv)
+
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="kg-bench-"), "embeddings.sock")
+    for mode in args.modes:
+        report = _measure(mode, args.workers, args.seconds, args.batch, socket_path)
+        workers: List[Dict] = report["workers"]
+        total = sum(worker["embeddings"] for worker in workers)
+        worker_rss = sum(worker["rss_mb"] for worker in workers) / len(workers)
+        worker_pss = sum(worker["pss_mb"] for worker in workers) / len(workers)
+        total_pss = sum(worker["pss_mb"] for worker in workers) + report["shared_pss_mb"]
+        logger.info(
+            f"{mode:>7}: {total / args.seconds:8.1f} embeddings/s with {len(workers)} workers, "
+            f"ready in {report['ready_seconds']:.1f}s, per worker RSS {worker_rss:.0f}MB / PSS {worker_pss:.0f}MB, "
+            f"total PSS {total_pss:.0f}MB (model host {report['shared_pss_mb']:.0f}MB)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+from app.kg_pipeline.agents.cypher_templates import TEMPLATES
+from app.kg_pipeline.agents.retriever import InformationRetriever
+from app.kg_pipeline.config import get_logger
+
+logger = get_logger(__name__)
+
+MODES = ("sequential", "concurrent", "fused")
+DEFAULT_SYMPTOMS = ("lá vàng", "đốm nâu trên lá", "thối rễ", "héo rũ")
+
+
+def _workload(graph, samples: int, with_embeddings: bool) -> List[Dict[str, Any]]:
+    crops = [r["name"] for r in graph.query(f"MATCH (c:Crop) RETURN c.name AS name LIMIT {samples}") if r["name"]]
+    diseases = [r["name"] for r in graph.query(f"MATCH (d:Disease) RETURN d.name AS name LIMIT {samples}") if r["name"]]
+    symptoms = list(DEFAULT_SYMPTOMS[:samples])
+
+    embed = None
+    if with_embeddings:
+        from app.kg_pipeline.embeddings.text_embedder import TextEmbedder
+
+        embed = TextEmbedder().embed
+
+    workload = []
+    for template in TEMPLATES:
+        if template.embedding_params and embed is None:
+            continue
+        values = {"crop": crops, "disease": diseases, "symptom": symptoms}[template.required[0]]
+        for value in values:
+            slots = {"crop": None, "disease": None, "symptom": None, template.required[0]: value}
+            cypher_result = template.render(slots)
+            cypher_result["embeddings"] = {
+                param: embed(slots[slot]) for param, slot in template.embedding_params.items()
+            }
+            workload.append(cypher_result)
+    return workload
+
+
+async def _run(retriever: InformationRetriever, workload: List[Dict[str, Any]], iterations: int):
+    for cypher_result in workload:
+        await retriever.aretrieve(cypher_result)
+
+    latencies = []
+    outcomes = []
+    for _ in range(iterations):
+        for cypher_result in workload:
+            start = time.perf_counter()
+            result = await retriever.aretrieve(cypher_result)
+            latencies.append((time.perf_counter() - start) * 1000)
+            outcomes.append((result["total_count"], len(result["results"]), result["success"]))
+    return sorted(latencies), outcomes
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+async def _bench(args) -> int:
+    from app.kg_pipeline.bootstrap import _init_neo4j
+
+    graph = _init_neo4j()
+    try:
+        workload = _workload(graph, args.samples, not args.no_embeddings)
+        logger.info(f"Benchmarking {len(workload)} retrievals x {args.iterations} iterations")
+
+        baseline = None
+        mismatched = False
+        for mode in args.modes:
+            latencies, outcomes = await _run(InformationRetriever(graph, mode), workload, args.iterations)
+            logger.info(
+                f"{mode:>10}: mean {statistics.mean(latencies):.1f}ms, p50 {_percentile(latencies, 0.5):.1f}ms, "
+                f"p95 {_percentile(latencies, 0.95):.1f}ms per retrieval"
+            )
+            if baseline is None:
+                baseline = outcomes
+            elif outcomes != baseline:
+                logger.error(f"{mode} returned different counts/rows than {args.modes[0]}")
+                mismatched = True
+        return 1 if mismatched else 0
+    finally:
+        await graph.aclose()
+        graph.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare Neo4j time per retrieval for sequential, concurrent and fused count/result queries"
+    )
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--samples", type=int, default=5, help="Entity values per template")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--no-embeddings", action="store_true", help="Skip vector-search templates")
+    args = parser.parse_args(argv)
+    return asyncio.run(_bench(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+import argparse
+import sys
+
+from app.kg_pipeline.config import get_logger
+
+logger = get_logger(__name__)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Bump the graph data version after ingestion so API workers drop cached retrieval results"
+    )
+    parser.add_argument("--show", action="store_true", help="Print the current data version without bumping it")
+    args = parser.parse_args(argv)
+
+    from app.kg_pipeline.graph import GraphClient
+
+    graph = GraphClient()
+    try:
+        if args.show:
+            logger.info(f"Graph data version: {graph.data_version()}")
+        else:
+            graph.bump_data_version()
+        return 0
+    finally:
+        graph.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import queue
+import time
+from pathlib import Path
+from typing import Dict, List
+
+DEFAULT_IMAGES_DIR = Path(__file__).resolve().parents[3] / "assets" / "images" / "diseases"
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def pss_mb(pid: int | str = "self") -> float:
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as rollup:
+            for line in rollup:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return rss_mb() if pid == "self" else 0.0
+
+
+def wait_for_report(process, results, timeout: float) -> Dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            report = results.get(timeout=1.0)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                try:
+                    report = results.get(timeout=1.0)
+                    break
+                except queue.Empty:
+                    raise RuntimeError(f"{process.name} exited with code {process.exitcode} without a report")
+            if time.monotonic() > deadline:
+                process.kill()
+                process.join()
+                raise RuntimeError(f"{process.name} did not report within {timeout:.0f}s")
+    process.join()
+    return report
+
+
+def collect_image_paths(sources: List[str], limit: int) -> List[str]:
+    paths: List[str] = []
+    for source in sources:
+        source_path = Path(source)
+        if source_path.is_dir():
+            paths.extend(str(p) for p in sorted(source_path.iterdir()) if p.suffix.lower() in IMAGE_SUFFIXES)
+        else:
+            paths.append(str(source_path))
+    return paths[:limit]
@@ -0,0 +1,112 @@
+import argparse
+import multiprocessing
+import sys
+import time
+from typing import Dict, List
+
+from app.kg_pipeline.cli.common import DEFAULT_IMAGES_DIR, collect_image_paths, rss_mb, wait_for_report
+from app.kg_pipeline.config import get_logger, settings
+
+logger = get_logger(__name__)
+
+
+def _run_variant(variant: str, paths: List[str], results):
+    import torch
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+
+    if variant == "full":
+        from transformers import CLIPModel, CLIPProcessor
+
+        from app.kg_pipeline.embeddings.image_embedder import ImageEmbedder
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        model = CLIPModel.from_pretrained(settings.embedding.image_model)
+        processor = CLIPProcessor.from_pretrained(settings.embedding.image_model)
+        model.to(device)
+        model.eval()
+        load_seconds = time.perf_counter() - start
+        rss_loaded = rss_mb()
+
+        vectors = []
+        for path in paths:
+            inputs = processor(images=ImageEmbedder._load_image(path), return_tensors="pt")
+            inputs = {key: tensor.to(device) for key, tensor in inputs.items()}
+            with torch.no_grad():
+                features = model.get_image_features(**inputs)
+                features = features / features.norm(dim=-1, keepdim=True)
+            vectors.append(features.squeeze().tolist())
+    else:
+        from app.kg_pipeline.embeddings.image_embedder import ImageEmbedder
+
+        embedder = ImageEmbedder(backend="torch")
+        load_seconds = time.perf_counter() - start
+        rss_loaded = rss_mb()
+        vectors = [embedder.embed(path) for path in paths]
+
+    results.put(
+        {
+            "variant": variant,
+            "load_seconds": load_seconds,
+            "rss_before_mb": rss_before,
+            "rss_loaded_mb": rss_loaded,
+            "rss_after_mb": rss_mb(),
+            "vectors": vectors,
+        }
+    )
+
+
+def _measure(variant: str, paths: List[str], timeout: float) -> Dict:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run_variant, args=(variant, paths, results), name=f"compare-{variant}")
+    process.start()
+    return wait_for_report(process, results, timeout)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Check that the vision-only CLIP embedder matches full CLIPModel output and report load cost"
+    )
+    parser.add_argument("images", nargs="*", default=[str(DEFAULT_IMAGES_DIR)], help="Image files or directories")
+    parser.add_argument("--limit", type=int, default=16, help="Maximum number of images to compare")
+    parser.add_argument("--tolerance", type=float, default=1e-5, help="Maximum allowed absolute difference")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Seconds to wait for each variant")
+    args = parser.parse_args(argv)
+
+    paths = collect_image_paths(args.images, args.limit)
+    if not paths:
+        logger.error("No images found to compare")
+        return 2
+    logger.info(f"Comparing {len(paths)} images with {settings.embedding.image_model}")
+
+    try:
+        reports = {variant: _measure(variant, paths, args.timeout) for variant in ("full", "vision")}
+    except RuntimeError as exc:
+        logger.error(str(exc))
+        return 2
+    for report in reports.values():
+        logger.info(
+            f"{report['variant']:>6}: load {report['load_seconds']:.2f}s, "
+            f"RSS after load {report['rss_loaded_mb']:.0f}MB "
+            f"(+{report['rss_loaded_mb'] - report['rss_before_mb']:.0f}MB), "
+            f"after embedding {report['rss_after_mb']:.0f}MB"
+        )
+
+    max_diff = 0.0
+    min_cosine = 1.0
+    for full, vision in zip(reports["full"]["vectors"], reports["vision"]["vectors"]):
+        max_diff = max(max_diff, max(abs(a - b) for a, b in zip(full, vision)))
+        min_cosine = min(min_cosine, sum(a * b for a, b in zip(full, vision)))
+    logger.info(f"Parity: max |diff| = {max_diff:.2e}, min cosine = {min_cosine:.6f}")
+
+    if max_diff > args.tolerance:
+        logger.error(f"Vision-only embeddings differ from CLIPModel by more than {args.tolerance}")
+        return 1
+    logger.info("Vision-only embeddings match CLIPModel.get_image_features")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
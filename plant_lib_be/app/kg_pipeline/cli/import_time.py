@@ -0,0 +1,86 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.kg_pipeline.config import get_logger
+
+logger = get_logger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+HEAVY_MODULES = (
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "onnxruntime",
+    "langchain",
+    "langchain_core",
+    "langchain_community",
+    "langchain_google_genai",
+    "google.generativeai",
+)
+LINE_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(module: str, env_overrides: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    env = {**os.environ, **env_overrides}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match:
+            entries.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return entries
+
+
+def _is_heavy(name: str) -> bool:
+    return any(name == heavy or name.startswith(heavy + ".") for heavy in HEAVY_MODULES)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure import time of the API entrypoint with python -X importtime and fail on regressions"
+    )
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--kg-enabled", choices=("true", "false"), default="true")
+    parser.add_argument("--max-seconds", type=float, default=0.0, help="Fail if the total import time exceeds this")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    args = parser.parse_args(argv)
+
+    entries = measure(args.module, {"KG_ENABLED": args.kg_enabled, "KG_PIPELINE__WARMUP_ON_STARTUP": "false"})
+    total = next((cumulative for name, _, cumulative in entries if name == args.module), 0) / 1e6
+    logger.info(f"import {args.module} (KG_ENABLED={args.kg_enabled}): {total:.2f}s, {len(entries)} modules")
+
+    top_level = {}
+    for name, _, cumulative in entries:
+        root = name.split(".")[0]
+        top_level[root] = max(top_level.get(root, 0), cumulative)
+    for root, cumulative in sorted(top_level.items(), key=lambda item: -item[1])[: args.top]:
+        logger.info(f"  {cumulative / 1e6:8.3f}s  {root}")
+
+    failed = False
+    heavy = sorted({name for name, _, _ in entries if _is_heavy(name)})
+    if heavy:
+        roots = sorted({name for name in heavy if "." not in name or name in HEAVY_MODULES})
+        logger.error(f"Heavy modules imported at startup: {', '.join(roots or heavy[:10])}")
+        failed = True
+    if args.max_seconds and total > args.max_seconds:
+        logger.error(f"Import time {total:.2f}s exceeds budget {args.max_seconds:.2f}s")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+import argparse
+
+from app.kg_pipeline.config import settings
+from app.kg_pipeline.embeddings.model_server import serve
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host the text and image embedders for all API workers")
+    parser.add_argument("--socket", default=settings.embedding.server_socket, help="Unix socket path")
+    args = parser.parse_args(argv)
+
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
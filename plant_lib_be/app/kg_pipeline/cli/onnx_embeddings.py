@@ -0,0 +1,179 @@
+import argparse
+import multiprocessing
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from app.kg_pipeline.cli.common import DEFAULT_IMAGES_DIR, collect_image_paths, rss_mb, wait_for_report
+from app.kg_pipeline.config import get_logger, settings
+
+logger = get_logger(__name__)
+
+TARGETS = ("text", "image")
+VARIANTS = ("torch", "onnx-fp32", "onnx-int8")
+
+
+def _sample_inputs(target: str, limit: int) -> List:
+    if target == "text":
+        from app.kg_pipeline.agents.intent_classifier import load_examples
+
+        return [text for text, _ in load_examples()][:limit]
+
+    from app.kg_pipeline.embeddings.image_embedder import ImageEmbedder
+
+    return [ImageEmbedder._load_image(path) for path in collect_image_paths([str(DEFAULT_IMAGES_DIR)], limit)]
+
+
+def _load_encoder(target: str, variant: str) -> Callable[[List], List[List[float]]]:
+    from app.kg_pipeline.embeddings.onnx_backend import OnnxImageEncoder, OnnxTextEncoder, onnx_model_dir
+
+    if variant == "torch":
+        if target == "text":
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(settings.embedding.text_model, device="cpu")
+            return lambda texts: model.encode(texts, convert_to_numpy=True, show_progress_bar=False).tolist()
+
+        from app.kg_pipeline.embeddings.image_embedder import ImageEmbedder
+
+        return ImageEmbedder(backend="torch")._encode
+
+    quantized = variant == "onnx-int8"
+    if target == "text":
+        return OnnxTextEncoder(onnx_model_dir(settings.embedding.text_model), quantized=quantized).encode
+    return OnnxImageEncoder(onnx_model_dir(settings.embedding.image_model), quantized=quantized).encode
+
+
+def _cosines(reference: List[List[float]], candidate: List[List[float]]) -> List[float]:
+    import numpy as np
+
+    a = np.asarray(reference, dtype=np.float32)
+    b = np.asarray(candidate, dtype=np.float32)
+    a /= np.linalg.norm(a, axis=-1, keepdims=True)
+    b /= np.linalg.norm(b, axis=-1, keepdims=True)
+    return (a * b).sum(axis=-1).tolist()
+
+
+def export(args) -> int:
+    from app.kg_pipeline.embeddings.onnx_backend import export_image_model, export_text_model, model_size_mb
+
+    for target in args.targets:
+        if target == "text":
+            model_dir = export_text_model(settings.embedding.text_model, quantize=not args.no_quantize)
+        else:
+            model_dir = export_image_model(settings.embedding.image_model, quantize=not args.no_quantize)
+        logger.info(
+            f"{target}: fp32 {model_size_mb(model_dir, False):.0f}MB, "
+            f"int8 {model_size_mb(model_dir, True):.0f}MB in {model_dir}"
+        )
+    return 0
+
+
+def check(args) -> int:
+    failed = False
+    for target in args.targets:
+        inputs = _sample_inputs(target, args.limit)
+        reference = _load_encoder(target, "torch")(inputs)
+        for variant in VARIANTS[1:]:
+            cosines = _cosines(reference, _load_encoder(target, variant)(inputs))
+            worst = min(cosines)
+            status = "ok" if worst >= args.min_cosine else "FAIL"
+            logger.info(
+                f"{target} {variant}: min cosine {worst:.4f}, mean {statistics.mean(cosines):.4f} "
+                f"over {len(cosines)} inputs [{status}]"
+            )
+            failed = failed or worst < args.min_cosine
+    return 1 if failed else 0
+
+
+def _bench_variant(target: str, variant: str, batch: int, iterations: int, results):
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    encode = _load_encoder(target, variant)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_mb()
+
+    inputs = _sample_inputs(target, batch)
+    latencies: Dict[int, List[float]] = {}
+    for size in sorted({1, batch}):
+        encode(inputs[:size])
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            encode(inputs[:size])
+            timings.append((time.perf_counter() - started) * 1000)
+        latencies[size] = sorted(timings)
+
+    results.put(
+        {
+            "load_seconds": load_seconds,
+            "rss_load_mb": rss_loaded - rss_before,
+            "rss_peak_mb": rss_mb(),
+            "latencies": latencies,
+        }
+    )
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def bench(args) -> int:
+    context = multiprocessing.get_context("spawn")
+    for target in args.targets:
+        for variant in VARIANTS:
+            results = context.Queue()
+            process = context.Process(
+                target=_bench_variant,
+                args=(target, variant, args.batch, args.iterations, results),
+                name=f"bench-{target}-{variant}",
+            )
+            process.start()
+            try:
+                report = wait_for_report(process, results, args.timeout)
+            except RuntimeError as exc:
+                logger.error(str(exc))
+                return 2
+
+            latency_text = ", ".join(
+                f"batch {size}: p50 {_percentile(values, 0.5):.1f}ms p95 {_percentile(values, 0.95):.1f}ms"
+                for size, values in report["latencies"].items()
+            )
+            logger.info(
+                f"{target} {variant:>9}: load {report['load_seconds']:.2f}s, "
+                f"+{report['rss_load_mb']:.0f}MB RSS ({report['rss_peak_mb']:.0f}MB total), {latency_text}"
+            )
+    return 0
+
+
+def _targets(value: str) -> Tuple[str, ...]:
+    return TARGETS if value == "all" else (value,)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export, verify and benchmark ONNX Runtime embedding backends")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export models to ONNX (and int8)")
+    export_parser.add_argument("--no-quantize", action="store_true", help="Skip dynamic int8 quantization")
+
+    check_parser = subparsers.add_parser("check", help="Compare ONNX vectors with the torch output")
+    check_parser.add_argument("--limit", type=int, default=32)
+    check_parser.add_argument("--min-cosine", type=float, default=0.99)
+
+    bench_parser = subparsers.add_parser("bench", help="Compare latency and memory of each backend")
+    bench_parser.add_argument("--batch", type=int, default=8)
+    bench_parser.add_argument("--iterations", type=int, default=20)
+    bench_parser.add_argument("--timeout", type=float, default=600.0, help="Seconds to wait for each variant")
+
+    for subparser in (export_parser, check_parser, bench_parser):
+        subparser.add_argument("--target", choices=("all",) + TARGETS, default="all")
+
+    args = parser.parse_args(argv)
+    args.targets = _targets(args.target)
+    return {"export": export, "check": check, "bench": bench}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
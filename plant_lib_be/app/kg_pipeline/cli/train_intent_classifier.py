@@ -0,0 +1,37 @@
+import argparse
+
+from app.kg_pipeline.agents.intent_classifier import (
+    DEFAULT_CENTROIDS_PATH,
+    DEFAULT_EXAMPLES_PATH,
+    IntentClassifier,
+    load_examples,
+    load_history_examples,
+)
+from app.kg_pipeline.config import get_logger, settings
+from app.kg_pipeline.embeddings.text_embedder import TextEmbedder
+
+logger = get_logger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train nearest-centroid intent classifier over text embeddings")
+    parser.add_argument("--examples", default=str(DEFAULT_EXAMPLES_PATH), help="Labelled examples JSON")
+    parser.add_argument("--output", default=settings.clarifier.intent_centroids_path or str(DEFAULT_CENTROIDS_PATH))
+    parser.add_argument("--no-history", action="store_true", help="Skip kg_chat_histories intents")
+    parser.add_argument("--history-limit", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    examples = load_examples(args.examples)
+    logger.info(f"Loaded {len(examples)} labelled examples from {args.examples}")
+    if not args.no_history:
+        history = load_history_examples(args.history_limit)
+        logger.info(f"Loaded {len(history)} examples from chat history")
+        examples.extend(history)
+
+    embedder = TextEmbedder()
+    centroids, labels = IntentClassifier.train(embedder.embed_batch, examples)
+    IntentClassifier.save(args.output, centroids, labels, settings.embedding.text_model)
+
+
+if __name__ == "__main__":
+    main()
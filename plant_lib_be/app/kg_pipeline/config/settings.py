@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import json
-from typing import List
+from typing import List, Literal
 
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, field_validator
@@ -24,6 +24,11 @@ class Neo4jSettings(BaseModel):
     url: str = Field("neo4j://localhost:7687", description="Neo4j bolt URL")
     username: str = Field("neo4j", description="Neo4j user")
     password: str = Field("password", description="Neo4j password")
+    database: str | None = None
+    max_pool_size: int = 50
+    acquisition_timeout_seconds: float = 30.0
+    fetch_size: int = 1000
+    max_rows: int = 1000
 
 
 class GeminiSettings(BaseModel):
@@ -54,9 +59,24 @@ class EmbeddingSettings(BaseModel):
     text_model: str = Field("keepitreal/vietnamese-sbert")
     image_model: str = Field("openai/clip-vit-base-patch32")
     text_batch_size: int = 32
+    text_micro_batching: bool = True
+    text_batch_max_wait_ms: int = 5
     image_batch_size: int = 16
+    image_decode_workers: int = 4
     text_max_length: int = 10_000
     image_max_size: tuple[int, int] = (1024, 1024)
+    text_cache_enabled: bool = True
+    text_cache_path: str = "~/.cache/kg_plant/text_embeddings.mmap"
+    text_cache_max_mb: int = 64
+    text_backend: Literal["torch", "onnx"] = "torch"
+    image_backend: Literal["torch", "onnx"] = "torch"
+    onnx_dir: str = "~/.cache/kg_plant/onnx"
+    onnx_quantized: bool = True
+    onnx_threads: int = 0
+    serving: Literal["local", "server", "preload"] = "local"
+    server_socket: str = "/tmp/kg_plant_embeddings.sock"
+    server_autostart: bool = True
+    server_start_timeout_seconds: int = 180
 
 
 class CacheSettings(BaseModel):
@@ -64,12 +84,66 @@ class CacheSettings(BaseModel):
     session_ttl_hours: int = 168
 
 
+class WriteBehindSettings(BaseModel):
+    enabled: bool = True
+    max_queue_size: int = 1000
+    batch_size: int = 100
+    flush_interval_ms: int = 200
+    enqueue_timeout_ms: int = 500
+
+
 class LanguageSettings(BaseModel):
     data_language: str = "vi"
     supported_languages: List[str] = Field(default_factory=lambda: ["vi", "en"])
     auto_translate: bool = True
 
 
+class ClarifierSettings(BaseModel):
+    fast_path_enabled: bool = True
+    fast_path_min_confidence: float = 0.8
+    fast_path_max_words: int = 12
+    intent_classifier_enabled: bool = True
+    intent_centroids_path: str = ""
+
+
+class CypherSettings(BaseModel):
+    templates_enabled: bool = True
+    parameterize_literals: bool = True
+    query_text_tracker_size: int = 1000
+    cache_enabled: bool = True
+    cache_persistent: bool = True
+    cache_max_entries: int = 1000
+    cache_ttl_hours: int = 24
+    schema_refresh_seconds: int = 600
+    retrieval_mode: Literal["sequential", "concurrent", "fused"] = "concurrent"
+    result_row_limit: int = 100
+    result_field_max_chars: int = 400
+    result_list_max_items: int = 10
+    group_results: bool = True
+    retrieval_cache_enabled: bool = True
+    retrieval_cache_max_entries: int = 2000
+    retrieval_cache_ttl_seconds: int = 900
+    data_version_refresh_seconds: int = 30
+
+
+class SlowQuerySettings(BaseModel):
+    enabled: bool = True
+    threshold_ms: int = 500
+    profile: bool = True
+    profile_sample_rate: float = 0.1
+    profile_cooldown_seconds: int = 300
+    max_pending_profiles: int = 4
+    admin_token: str = ""
+
+
+class PipelineSettings(BaseModel):
+    mode: Literal["sequential", "combined"] = "sequential"
+    # Chỉ áp dụng cho /kg/query; /kg/query/stream không gộp truy vấn
+    coalesce_queries: bool = True
+    warmup_on_startup: bool = True
+    warmup_retry_after_seconds: int = 5
+
+
 class KGSettings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="KG_", env_nested_delimiter="__")
 
@@ -78,7 +152,12 @@ class KGSettings(BaseSettings):
     gemini: GeminiSettings = GeminiSettings()
     embedding: EmbeddingSettings = EmbeddingSettings()
     cache: CacheSettings = CacheSettings()
+    write_behind: WriteBehindSettings = WriteBehindSettings()
     language: LanguageSettings = LanguageSettings()
+    pipeline: PipelineSettings = PipelineSettings()
+    cypher: CypherSettings = CypherSettings()
+    clarifier: ClarifierSettings = ClarifierSettings()
+    slow_query: SlowQuerySettings = SlowQuerySettings()
     log_level: str = "INFO"
 
 
@@ -1,6 +1,14 @@
 from app.kg_pipeline.database.connection import db_connection
 from app.kg_pipeline.database.session_manager import session_manager, SessionManager
-from app.kg_pipeline.database.models import Base, User, UserSession, ChatHistory, QueryCache
+from app.kg_pipeline.database.models import (
+    Base,
+    User,
+    UserSession,
+    ChatHistory,
+    QueryCache,
+    CypherCacheEntry,
+    SlowQuery,
+)
 
 __all__ = [
     "db_connection",
@@ -11,4 +19,6 @@ __all__ = [
     "UserSession",
     "ChatHistory",
     "QueryCache",
+    "CypherCacheEntry",
+    "SlowQuery",
 ]
@@ -1,6 +1,9 @@
+from threading import Lock
+
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
+from app.core.metrics import register_engine_pool
 from app.kg_pipeline.config import settings, get_logger
 from app.kg_pipeline.database.models import Base
 
@@ -9,19 +12,41 @@ logger = get_logger(__name__)
 
 class DatabaseConnection:
     def __init__(self):
-        self.engine = create_engine(
-            settings.database.url,
-            pool_pre_ping=True,
-            pool_recycle=3600,
-            echo=False,
-            future=True,
-        )
-        self.SessionLocal = sessionmaker(
-            autocommit=False,
-            autoflush=False,
-            bind=self.engine,
-        )
-        logger.info(f"KG DB connection ready: {settings.database.url.split('@')[-1]}")
+        self._engine = None
+        self._session_factory = None
+        self._lock = Lock()
+
+    def _connect(self):
+        with self._lock:
+            if self._engine is not None:
+                return
+            engine = create_engine(
+                settings.database.url,
+                pool_pre_ping=True,
+                pool_recycle=3600,
+                echo=False,
+                future=True,
+            )
+            register_engine_pool("kg", engine)
+            self._session_factory = sessionmaker(
+                autocommit=False,
+                autoflush=False,
+                bind=engine,
+            )
+            self._engine = engine
+            logger.info(f"KG DB connection ready: {settings.database.url.split('@')[-1]}")
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._connect()
+        return self._engine
+
+    @property
+    def SessionLocal(self):
+        if self._engine is None:
+            self._connect()
+        return self._session_factory
 
     def create_tables(self):
         Base.metadata.create_all(bind=self.engine)
@@ -3,9 +3,11 @@ import uuid
 from datetime import datetime, timedelta
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
+    Float,
     ForeignKey,
     Integer,
     JSON,
@@ -122,3 +124,42 @@ class QueryCache(Base):
     @property
     def is_expired(self) -> bool:
         return datetime.utcnow() > self.expires_at
+
+
+class CypherCacheEntry(Base):
+    __tablename__ = "kg_cypher_caches"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    cache_key = Column(String(64), unique=True, nullable=False, index=True)
+    schema_fingerprint = Column(String(64), nullable=False)
+    clarification_key = Column(Text, nullable=False)
+
+    cypher_result = Column(JSON, nullable=False)
+
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_accessed = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    @property
+    def is_expired(self) -> bool:
+        return datetime.utcnow() > self.expires_at
+
+
+class SlowQuery(Base):
+    __tablename__ = "kg_slow_queries"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Không dùng ForeignKey: chat history ghi sau qua write-behind, có thể không tồn tại nếu pipeline lỗi
+    chat_id = Column(String(36), index=True)
+    query_kind = Column(String(20), nullable=False)
+    query_hash = Column(String(64), nullable=False, index=True)
+    query_text = Column(Text, nullable=False)
+    params = Column(JSON)
+
+    elapsed_ms = Column(Float, nullable=False)
+    rows = Column(Integer)
+    db_hits = Column(BigInteger)
+    plan = Column(JSON)
+
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
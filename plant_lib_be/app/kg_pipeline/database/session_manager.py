@@ -1,3 +1,4 @@
+import atexit
 import uuid
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
@@ -6,7 +7,15 @@ from sqlalchemy import func
 
 from app.kg_pipeline.config import get_logger, settings
 from app.kg_pipeline.database.connection import db_connection
-from app.kg_pipeline.database.models import ChatHistory, QueryCache, User, UserSession
+from app.kg_pipeline.database.models import ChatHistory, CypherCacheEntry, QueryCache, SlowQuery, User, UserSession
+from app.kg_pipeline.database.write_behind import (
+    CHAT_HISTORY,
+    CYPHER_CACHE,
+    QUERY_CACHE,
+    SLOW_QUERY,
+    WriteBehindWriter,
+    snapshot,
+)
 
 logger = get_logger(__name__)
 
@@ -15,6 +24,14 @@ class SessionManager:
     def __init__(self):
         self.cache_ttl_hours = settings.cache.ttl_hours
         self.session_ttl_hours = settings.cache.session_ttl_hours
+        self.writer = None
+        if settings.write_behind.enabled:
+            self.writer = WriteBehindWriter(
+                max_queue_size=settings.write_behind.max_queue_size,
+                batch_size=settings.write_behind.batch_size,
+                flush_interval_ms=settings.write_behind.flush_interval_ms,
+                enqueue_timeout_ms=settings.write_behind.enqueue_timeout_ms,
+            )
         logger.info("KG session manager initialized")
 
     def create_user(self, username: str, email: str, password: str, full_name: str | None = None) -> User:
@@ -229,11 +246,9 @@ class SessionManager:
     def cleanup_expired_cache(self) -> int:
         db = db_connection.get_session()
         try:
-            expired_count = (
-                db.query(QueryCache)
-                .filter(QueryCache.expires_at < datetime.utcnow())
-                .delete()
-            )
+            now = datetime.utcnow()
+            expired_count = db.query(QueryCache).filter(QueryCache.expires_at < now).delete()
+            expired_count += db.query(CypherCacheEntry).filter(CypherCacheEntry.expires_at < now).delete()
             db.commit()
             logger.info(f"Cleaned up {expired_count} expired KG cache entries")
             return expired_count
@@ -274,6 +289,257 @@ class SessionManager:
         finally:
             db.close()
 
+    def queue_chat_history(
+        self,
+        session_id: str,
+        user_id: str,
+        query: str,
+        answer: str,
+        pipeline_data: Dict,
+        **kwargs,
+    ) -> str:
+        chat_id = kwargs.pop("id", None) or str(uuid.uuid4())
+        if self.writer is None:
+            self.save_chat_history(session_id, user_id, query, answer, pipeline_data, id=chat_id, **kwargs)
+            return chat_id
+
+        row = {
+            "id": chat_id,
+            "session_id": session_id,
+            "user_id": user_id,
+            "query": query,
+            "answer": answer,
+            "pipeline_data": snapshot(pipeline_data),
+            "query_language": kwargs.pop("query_language", "vi"),
+            "intent": kwargs.pop("intent", None),
+            "answer_language": kwargs.pop("answer_language", None),
+            "image_path": kwargs.pop("image_path", None),
+            "total_results": kwargs.pop("total_results", 0),
+            "processing_time": kwargs.pop("processing_time", None),
+            "from_cache": kwargs.pop("from_cache", False),
+            "created_at": datetime.utcnow(),
+        }
+        if kwargs:
+            raise TypeError(f"Unexpected chat history fields: {sorted(kwargs)}")
+
+        self.writer.submit(CHAT_HISTORY, row, lambda: self.save_chat_history(**row))
+        return chat_id
+
+    def queue_cached_query(self, session_id: str, query: str, result: Dict, image_path: str | None = None):
+        if self.writer is None:
+            self.set_cached_query(session_id=session_id, query=query, result=result, image_path=image_path)
+            return
+
+        now = datetime.utcnow()
+        cached_result = snapshot(result)
+        row = {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "query_hash": QueryCache.generate_hash(query, image_path),
+            "query_text": query,
+            "image_path": image_path,
+            "cached_result": cached_result,
+            "hit_count": 0,
+            "created_at": now,
+            "last_accessed": now,
+            "expires_at": now + timedelta(hours=self.cache_ttl_hours),
+        }
+        self.writer.submit(
+            QUERY_CACHE,
+            row,
+            lambda: self.set_cached_query(session_id=session_id, query=query, result=cached_result, image_path=image_path),
+        )
+
+    def get_cached_cypher(self, cache_key: str, schema_fingerprint: str) -> Optional[Dict]:
+        db = db_connection.get_session()
+        try:
+            entry = (
+                db.query(CypherCacheEntry)
+                .filter(
+                    CypherCacheEntry.cache_key == cache_key,
+                    CypherCacheEntry.schema_fingerprint == schema_fingerprint,
+                )
+                .first()
+            )
+
+            if entry and not entry.is_expired:
+                entry.hit_count += 1
+                entry.last_accessed = datetime.utcnow()
+                db.commit()
+
+                logger.debug(f"KG cypher cache hit for key: {cache_key[:8]}")
+                return entry.cypher_result
+
+            return None
+        finally:
+            db.close()
+
+    def set_cached_cypher(
+        self,
+        cache_key: str,
+        schema_fingerprint: str,
+        clarification_key: str,
+        cypher_result: Dict,
+        expires_at: datetime,
+    ):
+        db = db_connection.get_session()
+        try:
+            entry = db.query(CypherCacheEntry).filter(CypherCacheEntry.cache_key == cache_key).first()
+            if entry:
+                entry.schema_fingerprint = schema_fingerprint
+                entry.cypher_result = cypher_result
+                entry.expires_at = expires_at
+                entry.last_accessed = datetime.utcnow()
+            else:
+                entry = CypherCacheEntry(
+                    cache_key=cache_key,
+                    schema_fingerprint=schema_fingerprint,
+                    clarification_key=clarification_key,
+                    cypher_result=cypher_result,
+                    expires_at=expires_at,
+                )
+                db.add(entry)
+
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.error(f"Failed to cache KG cypher: {exc}")
+            raise exc
+        finally:
+            db.close()
+
+    def queue_cached_cypher(
+        self,
+        cache_key: str,
+        schema_fingerprint: str,
+        clarification_key: str,
+        cypher_result: Dict,
+        expires_at: datetime,
+    ):
+        cypher_result = snapshot(cypher_result)
+        if self.writer is None:
+            self.set_cached_cypher(cache_key, schema_fingerprint, clarification_key, cypher_result, expires_at)
+            return
+
+        now = datetime.utcnow()
+        row = {
+            "id": str(uuid.uuid4()),
+            "cache_key": cache_key,
+            "schema_fingerprint": schema_fingerprint,
+            "clarification_key": clarification_key,
+            "cypher_result": cypher_result,
+            "hit_count": 0,
+            "created_at": now,
+            "last_accessed": now,
+            "expires_at": expires_at,
+        }
+        self.writer.submit(
+            CYPHER_CACHE,
+            row,
+            lambda: self.set_cached_cypher(cache_key, schema_fingerprint, clarification_key, cypher_result, expires_at),
+        )
+
+    def save_slow_query(self, **row):
+        db = db_connection.get_session()
+        try:
+            db.add(SlowQuery(**row))
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.error(f"Failed to save KG slow query: {exc}")
+            raise exc
+        finally:
+            db.close()
+
+    def queue_slow_query(
+        self,
+        chat_id: Optional[str],
+        query_kind: str,
+        query_hash: str,
+        query_text: str,
+        params: Dict,
+        elapsed_ms: float,
+        rows: Optional[int] = None,
+        db_hits: Optional[int] = None,
+        plan: Optional[Dict] = None,
+    ):
+        row = {
+            "id": str(uuid.uuid4()),
+            "chat_id": chat_id,
+            "query_kind": query_kind,
+            "query_hash": query_hash,
+            "query_text": query_text,
+            "params": snapshot(params),
+            "elapsed_ms": elapsed_ms,
+            "rows": rows,
+            "db_hits": db_hits,
+            "plan": snapshot(plan),
+            "created_at": datetime.utcnow(),
+        }
+        if self.writer is None:
+            self.save_slow_query(**row)
+            return
+        self.writer.submit(SLOW_QUERY, row, lambda: self.save_slow_query(**row))
+
+    def get_slow_query_offenders(self, limit: int = 20, since_hours: int = 24) -> List[Dict]:
+        since = datetime.utcnow() - timedelta(hours=since_hours)
+        db = db_connection.get_session()
+        try:
+            groups = (
+                db.query(
+                    SlowQuery.query_hash,
+                    func.count(SlowQuery.id).label("executions"),
+                    func.sum(SlowQuery.elapsed_ms).label("total_ms"),
+                    func.avg(SlowQuery.elapsed_ms).label("avg_ms"),
+                    func.max(SlowQuery.elapsed_ms).label("max_ms"),
+                    func.max(SlowQuery.db_hits).label("max_db_hits"),
+                    func.max(SlowQuery.created_at).label("last_seen"),
+                )
+                .filter(SlowQuery.created_at >= since)
+                .group_by(SlowQuery.query_hash)
+                .order_by(func.sum(SlowQuery.elapsed_ms).desc())
+                .limit(limit)
+                .all()
+            )
+
+            offenders: List[Dict] = []
+            for group in groups:
+                entries = (
+                    db.query(SlowQuery)
+                    .filter(SlowQuery.query_hash == group.query_hash, SlowQuery.created_at >= since)
+                    .order_by(SlowQuery.created_at.desc())
+                    .limit(5)
+                    .all()
+                )
+                latest = entries[0]
+                profiled = next((entry for entry in entries if entry.plan), None)
+                offenders.append(
+                    {
+                        "query_hash": group.query_hash,
+                        "query_kind": latest.query_kind,
+                        "query_text": latest.query_text,
+                        "executions": group.executions,
+                        "total_ms": round(group.total_ms, 2),
+                        "avg_ms": round(group.avg_ms, 2),
+                        "max_ms": round(group.max_ms, 2),
+                        "max_db_hits": group.max_db_hits,
+                        "last_seen": group.last_seen,
+                        "chat_ids": [entry.chat_id for entry in entries if entry.chat_id],
+                        "plan": profiled.plan if profiled else None,
+                    }
+                )
+            return offenders
+        finally:
+            db.close()
+
+    def flush_writes(self):
+        if self.writer is not None:
+            self.writer.flush()
+
+    def shutdown(self):
+        if self.writer is not None:
+            self.writer.stop()
+
     def get_session_stats(self, session_id: str) -> Dict:
         db = db_connection.get_session()
         try:
@@ -326,3 +592,4 @@ class SessionManager:
 
 
 session_manager = SessionManager()
+atexit.register(session_manager.shutdown)
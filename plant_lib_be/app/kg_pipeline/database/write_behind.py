@@ -0,0 +1,211 @@
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.metrics import (
+    WRITE_BEHIND_DROPPED_ROWS,
+    WRITE_BEHIND_QUEUE_DEPTH,
+    WRITE_BEHIND_ROWS,
+    WRITE_BEHIND_SYNC_FALLBACKS,
+)
+from app.kg_pipeline.config import get_logger
+from app.kg_pipeline.database.connection import db_connection
+from app.kg_pipeline.database.models import ChatHistory, CypherCacheEntry, QueryCache, SlowQuery
+
+logger = get_logger(__name__)
+
+CHAT_HISTORY = "chat_history"
+QUERY_CACHE = "query_cache"
+CYPHER_CACHE = "cypher_cache"
+SLOW_QUERY = "slow_query"
+
+_STOP = object()
+
+
+def snapshot(value: Any) -> Any:
+    return json.loads(json.dumps(value, ensure_ascii=False, default=str))
+
+
+class WriteBehindWriter:
+    def __init__(
+        self,
+        max_queue_size: int = 1000,
+        batch_size: int = 100,
+        flush_interval_ms: int = 200,
+        enqueue_timeout_ms: int = 500,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._stopped = False
+        WRITE_BEHIND_QUEUE_DEPTH.set_function(self._queue.qsize)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="kg-write-behind", daemon=True)
+                self._thread.start()
+                logger.info("KG write-behind writer started")
+
+    def submit(self, kind: str, row: Dict[str, Any], fallback: Callable[[], Any]) -> bool:
+        if self._stopped:
+            fallback()
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put((kind, row), timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            logger.warning(f"KG write-behind queue full, writing {kind} synchronously")
+            WRITE_BEHIND_SYNC_FALLBACKS.labels(kind).inc()
+            fallback()
+            return False
+
+    def flush(self):
+        if self._thread is not None:
+            self._queue.join()
+
+    def stop(self, timeout: float = 10.0):
+        if self._stopped:
+            return
+        self._stopped = True
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        logger.info("KG write-behind writer stopped")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+
+            batch: List[Tuple[str, Dict[str, Any]]] = [item]
+            stop_after = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop_after = True
+                    break
+                batch.append(item)
+
+            try:
+                self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if stop_after:
+                self._drain()
+                self._queue.task_done()
+                return
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+            else:
+                self._queue.task_done()
+        if batch:
+            try:
+                self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _flush(self, batch: List[Tuple[str, Dict[str, Any]]]):
+        try:
+            self._write(batch)
+            return
+        except Exception as exc:
+            logger.warning(f"KG write-behind flush of {len(batch)} rows failed, retrying row by row: {exc}")
+
+        for kind, row in batch:
+            try:
+                self._write([(kind, row)])
+            except Exception as exc:
+                WRITE_BEHIND_DROPPED_ROWS.labels(kind).inc()
+                logger.error(f"KG write-behind dropped {kind} row {row.get('id')}: {exc}", exc_info=True)
+
+    def _write(self, batch: List[Tuple[str, Dict[str, Any]]]):
+        chat_rows = [row for kind, row in batch if kind == CHAT_HISTORY]
+        slow_rows = [row for kind, row in batch if kind == SLOW_QUERY]
+        cache_rows: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        cypher_rows: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        for kind, row in batch:
+            if kind == QUERY_CACHE:
+                cache_rows.pop(row["query_hash"], None)
+                cache_rows[row["query_hash"]] = row
+            elif kind == CYPHER_CACHE:
+                cypher_rows.pop(row["cache_key"], None)
+                cypher_rows[row["cache_key"]] = row
+
+        db = db_connection.get_session()
+        try:
+            if chat_rows:
+                db.execute(insert(ChatHistory), chat_rows)
+            if cache_rows:
+                stmt = pg_insert(QueryCache).values(list(cache_rows.values()))
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[QueryCache.query_hash],
+                    set_={
+                        "cached_result": stmt.excluded.cached_result,
+                        "expires_at": stmt.excluded.expires_at,
+                        "last_accessed": stmt.excluded.last_accessed,
+                    },
+                )
+                db.execute(stmt)
+            if cypher_rows:
+                stmt = pg_insert(CypherCacheEntry).values(list(cypher_rows.values()))
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[CypherCacheEntry.cache_key],
+                    set_={
+                        "schema_fingerprint": stmt.excluded.schema_fingerprint,
+                        "cypher_result": stmt.excluded.cypher_result,
+                        "expires_at": stmt.excluded.expires_at,
+                        "last_accessed": stmt.excluded.last_accessed,
+                    },
+                )
+                db.execute(stmt)
+            if slow_rows:
+                db.execute(insert(SlowQuery), slow_rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        WRITE_BEHIND_ROWS.labels(CHAT_HISTORY).inc(len(chat_rows))
+        WRITE_BEHIND_ROWS.labels(QUERY_CACHE).inc(len(cache_rows))
+        WRITE_BEHIND_ROWS.labels(CYPHER_CACHE).inc(len(cypher_rows))
+        WRITE_BEHIND_ROWS.labels(SLOW_QUERY).inc(len(slow_rows))
+        logger.debug(
+            f"KG write-behind flushed {len(chat_rows)} chat rows, {len(cache_rows)} cache rows, "
+            f"{len(cypher_rows)} cypher cache rows, {len(slow_rows)} slow query rows"
+        )
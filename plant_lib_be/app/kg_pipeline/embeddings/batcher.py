@@ -0,0 +1,94 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Tuple
+
+from app.core.metrics import EMBEDDING_BATCH_SIZE
+from app.kg_pipeline.config import get_logger
+
+logger = get_logger(__name__)
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        encode: Callable[[List[Any]], List[Any]],
+        max_batch: int = 32,
+        max_wait_ms: int = 5,
+        name: str = "text",
+    ):
+        self.encode = encode
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._pid = os.getpid()
+        self._start_lock = threading.Lock()
+        logger.info(f"Micro-batcher for {name} ready (max_batch={self.max_batch}, max_wait_ms={max_wait_ms})")
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = None
+                self._pid = os.getpid()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"kg-{self.name}-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((item, future))
+        return future
+
+    def map(self, items: List[Any]) -> List[Future]:
+        return [self.submit(item) for item in items]
+
+    def _collect(self) -> List[Tuple[Any, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [(item, future) for item, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            EMBEDDING_BATCH_SIZE.labels(self.name).observe(len(batch))
+
+            try:
+                results = list(self.encode([item for item, _ in batch]))
+            except Exception as exc:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(exc)
+                    continue
+                logger.warning(f"{self.name} batch of {len(batch)} failed, retrying per item: {exc}")
+                for item, future in batch:
+                    try:
+                        future.set_result(self.encode([item])[0])
+                    except Exception as item_exc:
+                        future.set_exception(item_exc)
+                continue
+
+            if len(results) != len(batch):
+                error = RuntimeError(f"{self.name} encoder returned {len(results)} results for {len(batch)} items")
+                logger.error(str(error))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.core.metrics import EMBEDDING_CACHE_REQUESTS
+from app.kg_pipeline.config import get_logger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = get_logger(__name__)
+
+MAGIC = 0x4B47454D42434831
+HEADER_WORDS = 8
+WAYS = 8
+
+
+def cache_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, dim: int, max_mb: int = 64, path: str | None = None):
+        self.model_name = model_name
+        self.dim = dim
+        slot_bytes = 16 + 8 + dim * 4
+        self.n_sets = max(1, (max_mb * 1024 * 1024) // (slot_bytes * WAYS))
+        self.capacity = self.n_sets * WAYS
+        self.model_digest = int.from_bytes(hashlib.blake2b(model_name.encode(), digest_size=8).digest(), "little")
+        self.lock = threading.Lock()
+        self.lock_file = None
+        self.lock_pid = os.getpid()
+        self.path = None
+
+        try:
+            if path:
+                self._open_file(Path(path).expanduser())
+            else:
+                self._open_memory()
+        except OSError as exc:
+            logger.warning(f"Embedding cache file {path} unavailable ({exc}), using process memory")
+            self._open_memory()
+
+        logger.info(
+            f"Text embedding cache ready ({self.capacity} vectors, {max_mb}MB, "
+            f"{'mmap ' + str(self.path) if self.path else 'in-memory'})"
+        )
+
+    def _header(self) -> np.ndarray:
+        return np.array(
+            [MAGIC, 1, self.dim, self.n_sets, WAYS, self.model_digest, 0, 0],
+            dtype=np.uint64,
+        )
+
+    def _layout(self, buffer: np.ndarray):
+        offset = HEADER_WORDS * 8
+        self.keys = np.ndarray((self.capacity, 2), dtype=np.uint64, buffer=buffer, offset=offset)
+        offset += self.capacity * 16
+        self.stamps = np.ndarray((self.capacity,), dtype=np.uint64, buffer=buffer, offset=offset)
+        offset += self.capacity * 8
+        self.vectors = np.ndarray((self.capacity, self.dim), dtype=np.float32, buffer=buffer, offset=offset)
+
+    def _total_bytes(self) -> int:
+        return HEADER_WORDS * 8 + self.capacity * (16 + 8 + self.dim * 4)
+
+    def _open_memory(self):
+        self.buffer = np.zeros(self._total_bytes(), dtype=np.uint8)
+        self._layout(self.buffer)
+
+    def _open_file(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        total = self._total_bytes()
+        expected = self._header()
+
+        if path.exists() and path.stat().st_size == total:
+            buffer = np.memmap(path, dtype=np.uint8, mode="r+", shape=(total,))
+            header = np.ndarray((HEADER_WORDS,), dtype=np.uint64, buffer=buffer)
+            if not np.array_equal(header[:6], expected[:6]):
+                logger.info(f"Embedding cache {path} was built for another model/size, resetting it")
+                buffer[:] = 0
+                header[:] = expected
+                buffer.flush()
+        else:
+            with open(path, "wb") as handle:
+                handle.truncate(total)
+            buffer = np.memmap(path, dtype=np.uint8, mode="r+", shape=(total,))
+            np.ndarray((HEADER_WORDS,), dtype=np.uint64, buffer=buffer)[:] = expected
+            buffer.flush()
+
+        self.buffer = buffer
+        self.path = path
+        if fcntl is not None:
+            self.lock_file = open(f"{path}.lock", "a")
+        self._layout(buffer)
+
+    def _key(self, text: str) -> np.ndarray:
+        digest = hashlib.blake2b(f"{self.model_name}\0{text}".encode(), digest_size=16).digest()
+        key = np.frombuffer(digest, dtype=np.uint64).copy()
+        key[0] |= 1
+        return key
+
+    def _set(self, key: np.ndarray) -> slice:
+        start = int(key[1] % self.n_sets) * WAYS
+        return slice(start, start + WAYS)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self._key(text)
+        ways = self._set(key)
+        keys = self.keys[ways]
+        for way in np.flatnonzero((keys[:, 0] == key[0]) & (keys[:, 1] == key[1])):
+            slot = ways.start + int(way)
+            vector = np.array(self.vectors[slot])
+            if self.keys[slot, 0] == key[0] and self.keys[slot, 1] == key[1]:
+                self.stamps[slot] = time.time_ns()
+                EMBEDDING_CACHE_REQUESTS.labels("hit").inc()
+                return vector
+        EMBEDDING_CACHE_REQUESTS.labels("miss").inc()
+        return None
+
+    def put(self, text: str, vector) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            return
+        key = self._key(text)
+        ways = self._set(key)
+
+        with self.lock:
+            if self.lock_file is not None and self.lock_pid != os.getpid():
+                self.lock_file = open(f"{self.path}.lock", "a")
+                self.lock_pid = os.getpid()
+            if self.lock_file is not None:
+                fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+            try:
+                keys = self.keys[ways]
+                existing = np.flatnonzero((keys[:, 0] == key[0]) & (keys[:, 1] == key[1]))
+                if existing.size:
+                    way = int(existing[0])
+                else:
+                    empty = np.flatnonzero(keys[:, 0] == 0)
+                    way = int(empty[0]) if empty.size else int(np.argmin(self.stamps[ways]))
+                slot = ways.start + way
+
+                self.keys[slot] = 0
+                self.vectors[slot] = vector
+                self.stamps[slot] = time.time_ns()
+                self.keys[slot] = key
+            finally:
+                if self.lock_file is not None:
+                    fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def flush(self):
+        if isinstance(self.buffer, np.memmap):
+            self.buffer.flush()
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.keys[:, 0]))
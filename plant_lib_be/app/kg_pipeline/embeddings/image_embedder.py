@@ -1,28 +1,42 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
 import torch
 from PIL import Image
-from transformers import CLIPModel, CLIPProcessor
+from transformers import CLIPImageProcessor, CLIPVisionModelWithProjection
 
 from app.kg_pipeline.config import get_logger, settings
+from app.kg_pipeline.embeddings.onnx_backend import OnnxImageEncoder, onnx_model_dir
 
 logger = get_logger(__name__)
 
 
 class ImageEmbedder:
-    def __init__(self):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Loading image embedding model: {settings.embedding.image_model}")
+    def __init__(self, backend: str | None = None):
+        self.backend = backend or settings.embedding.image_backend
+        logger.info(f"Loading image embedding model: {settings.embedding.image_model} ({self.backend})")
+
+        if self.backend == "onnx":
+            self.device = "cpu"
+            self.model = OnnxImageEncoder(
+                onnx_model_dir(settings.embedding.image_model),
+                quantized=settings.embedding.onnx_quantized,
+            )
+            self.processor = self.model.processor
+            self.embedding_dim = self.model.dim
+        else:
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.model = CLIPVisionModelWithProjection.from_pretrained(settings.embedding.image_model)
+            self.processor = CLIPImageProcessor.from_pretrained(settings.embedding.image_model)
+            self.model.to(self.device)
+            self.model.eval()
+            self.embedding_dim = self.model.config.projection_dim
 
-        self.model = CLIPModel.from_pretrained(settings.embedding.image_model)
-        self.processor = CLIPProcessor.from_pretrained(settings.embedding.image_model)
-        self.model.to(self.device)
-
-        self.embedding_dim = self.model.config.projection_dim
         logger.info(f"Image embedder initialized (dim: {self.embedding_dim}, device: {self.device})")
 
-    def _validate_image_path(self, image_path: str) -> str:
+    @staticmethod
+    def _validate_image_path(image_path: str) -> str:
         if not image_path:
             raise ValueError("Empty image path")
         if not os.path.exists(image_path):
@@ -38,33 +52,76 @@ class ImageEmbedder:
             raise ValueError(f"Invalid image format: {ext} (supported: {valid_extensions})")
         return image_path
 
-    def embed(self, image_path: str) -> List[float]:
-        image_path = self._validate_image_path(image_path)
+    @staticmethod
+    def _load_image(image_path: str) -> Image.Image:
+        image_path = ImageEmbedder._validate_image_path(image_path)
         image = Image.open(image_path).convert("RGB")
 
         max_width, max_height = settings.embedding.image_max_size
         if image.size[0] > max_width or image.size[1] > max_height:
             image.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
             logger.debug(f"Image resized to {image.size}")
+        return image
 
-        inputs = self.processor(images=image, return_tensors="pt")
+    def _encode(self, images: List[Image.Image]) -> List[List[float]]:
+        if self.backend == "onnx":
+            return self.model.encode(images)
+        inputs = self.processor(images=images, return_tensors="pt")
         inputs = {key: tensor.to(self.device) for key, tensor in inputs.items()}
 
         with torch.no_grad():
-            image_features = self.model.get_image_features(**inputs)
+            image_features = self.model(**inputs).image_embeds
             image_features = image_features / image_features.norm(dim=-1, keepdim=True)
 
-        return image_features.cpu().squeeze().tolist()
+        return image_features.cpu().tolist()
+
+    def embed(self, image_path: str) -> List[float]:
+        return self._encode([self._load_image(image_path)])[0]
+
+    def _try_load(self, image_path: str) -> Optional[Image.Image]:
+        try:
+            return self._load_image(image_path)
+        except Exception as exc:
+            logger.warning(f"Failed to load image {image_path}: {exc}")
+            return None
 
     def embed_batch(self, image_paths: List[str]) -> List[Optional[List[float]]]:
-        embeddings: List[Optional[List[float]]] = []
-        for image_path in image_paths:
-            try:
-                embedding = self.embed(image_path)
-                embeddings.append(embedding)
-            except Exception as exc:
-                logger.warning(f"Failed to embed image {image_path}: {exc}")
-                embeddings.append(None)
+        embeddings: List[Optional[List[float]]] = [None] * len(image_paths)
+        batch_size = max(1, settings.embedding.image_batch_size)
+        workers = max(1, settings.embedding.image_decode_workers)
+
+        starts = list(range(0, len(image_paths), batch_size))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kg-image-decode") as pool:
+            pending = [pool.submit(self._try_load, path) for path in image_paths[:batch_size]]
+            for position, start in enumerate(starts):
+                images = [future.result() for future in pending]
+                if position + 1 < len(starts):
+                    next_start = starts[position + 1]
+                    next_paths = image_paths[next_start : next_start + batch_size]
+                    pending = [pool.submit(self._try_load, path) for path in next_paths]
+
+                loaded = [(start + offset, image) for offset, image in enumerate(images) if image is not None]
+                if not loaded:
+                    continue
+
+                try:
+                    vectors = self._encode([image for _, image in loaded])
+                except Exception as exc:
+                    logger.warning(f"Batch image embedding failed, retrying per image: {exc}")
+                    vectors = []
+                    for index, image in loaded:
+                        try:
+                            vectors.append(self._encode([image])[0])
+                        except Exception as item_exc:
+                            logger.warning(f"Failed to embed image {image_paths[index]}: {item_exc}")
+                            vectors.append(None)
+
+                for (index, _), vector in zip(loaded, vectors):
+                    embeddings[index] = vector
+
+        embedded = sum(vector is not None for vector in embeddings)
+        logger.info(f"Embedded {embedded}/{len(image_paths)} images in batches of {batch_size}")
         return embeddings
 
     def get_dimension(self) -> int:
@@ -0,0 +1,234 @@
+import json
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.kg_pipeline.config import get_logger, settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = get_logger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+FRAME = struct.Struct("!II")
+ERROR_TYPES = {"ValueError": ValueError, "FileNotFoundError": FileNotFoundError}
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("model server connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _send(sock: socket.socket, header: Dict[str, Any], payload: bytes = b""):
+    encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    sock.sendall(FRAME.pack(len(encoded), len(payload)) + encoded + payload)
+
+
+def _recv(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    header_size, payload_size = FRAME.unpack(_recv_exact(sock, FRAME.size))
+    header = json.loads(_recv_exact(sock, header_size).decode("utf-8"))
+    return header, _recv_exact(sock, payload_size) if payload_size else b""
+
+
+def _pack(vectors: List[Optional[List[float]]]) -> Tuple[Dict[str, Any], bytes]:
+    present = [vector is not None for vector in vectors]
+    rows = [vector for vector in vectors if vector is not None]
+    payload = np.asarray(rows, dtype=np.float32).tobytes() if rows else b""
+    return {"ok": True, "present": present}, payload
+
+
+def _unpack(header: Dict[str, Any], payload: bytes, dim: int) -> List[Optional[List[float]]]:
+    rows = iter(np.frombuffer(payload, dtype=np.float32).reshape(-1, dim).tolist())
+    return [next(rows) if present else None for present in header["present"]]
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request, _ = _recv(self.request)
+            except (ConnectionError, OSError, struct.error):
+                return
+            try:
+                header, payload = self.server.dispatch(request)
+            except Exception as exc:
+                header, payload = {"ok": False, "error": str(exc), "error_type": type(exc).__name__}, b""
+            try:
+                _send(self.request, header, payload)
+            except OSError:
+                return
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, text_embedder, image_embedder):
+        self.text = text_embedder
+        self.image = image_embedder
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o600)
+
+    def dispatch(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        op = request.get("op")
+        if op == "info":
+            return {"ok": True, "text_dim": self.text.get_dimension(), "image_dim": self.image.get_dimension()}, b""
+        if op == "embed_text":
+            return _pack([self.text.embed(request["text"])])
+        if op == "embed_texts":
+            return _pack(self.text.embed_batch(request["texts"]))
+        if op == "embed_image":
+            return _pack([self.image.embed(request["path"])])
+        if op == "embed_images":
+            return _pack(self.image.embed_batch(request["paths"]))
+        raise ValueError(f"Unknown model server op: {op}")
+
+
+def serve(socket_path: str | None = None):
+    from app.kg_pipeline.embeddings.image_embedder import ImageEmbedder
+    from app.kg_pipeline.embeddings.text_embedder import TextEmbedder
+
+    socket_path = os.path.expanduser(socket_path or settings.embedding.server_socket)
+    server = ModelServer(socket_path, TextEmbedder(), ImageEmbedder())
+    logger.info(f"Embedding model server listening on {socket_path} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+class ModelServerClient:
+    def __init__(self, socket_path: str, timeout: float = 60.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def call(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                _send(sock, request)
+                header, payload = _recv(sock)
+                break
+            except (ConnectionError, OSError):
+                self._close()
+                if attempt:
+                    raise
+        if not header.get("ok"):
+            raise ERROR_TYPES.get(header.get("error_type"), RuntimeError)(header.get("error"))
+        return header, payload
+
+    def ping(self) -> bool:
+        try:
+            self.call({"op": "info"})
+            return True
+        except (ConnectionError, OSError):
+            return False
+
+
+def _start_server(client: ModelServerClient, timeout: float):
+    if fcntl is None:
+        raise RuntimeError("Embedding model server autostart requires a POSIX system")
+
+    with open(f"{client.socket_path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if client.ping():
+            return
+        logger.info(f"Starting embedding model server on {client.socket_path}")
+        subprocess.Popen(
+            [sys.executable, "-m", "app.kg_pipeline.cli.model_server", "--socket", client.socket_path],
+            cwd=PROJECT_ROOT,
+            start_new_session=True,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if client.ping():
+                return
+            time.sleep(0.5)
+    raise RuntimeError(f"Embedding model server did not start within {timeout:.0f}s")
+
+
+@lru_cache(maxsize=None)
+def connect(socket_path: str | None = None) -> ModelServerClient:
+    client = ModelServerClient(os.path.expanduser(socket_path or settings.embedding.server_socket))
+    if client.ping():
+        return client
+    if not settings.embedding.server_autostart:
+        raise RuntimeError(f"Embedding model server is not running on {client.socket_path}")
+    _start_server(client, settings.embedding.server_start_timeout_seconds)
+    return client
+
+
+class RemoteTextEmbedder:
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+        self.embedding_dim = client.call({"op": "info"})[0]["text_dim"]
+        logger.info(f"Text embedder served by {client.socket_path} (dim: {self.embedding_dim})")
+
+    def embed(self, text: str) -> List[float]:
+        return _unpack(*self.client.call({"op": "embed_text", "text": text}), self.embedding_dim)[0]
+
+    def embed_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        return _unpack(*self.client.call({"op": "embed_texts", "texts": list(texts)}), self.embedding_dim)
+
+    def get_dimension(self) -> int:
+        return self.embedding_dim
+
+
+class RemoteImageEmbedder:
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+        self.embedding_dim = client.call({"op": "info"})[0]["image_dim"]
+        logger.info(f"Image embedder served by {client.socket_path} (dim: {self.embedding_dim})")
+
+    def embed(self, image_path: str) -> List[float]:
+        request = {"op": "embed_image", "path": os.path.abspath(image_path)}
+        return _unpack(*self.client.call(request), self.embedding_dim)[0]
+
+    def embed_batch(self, image_paths: List[str]) -> List[Optional[List[float]]]:
+        request = {"op": "embed_images", "paths": [os.path.abspath(path) for path in image_paths]}
+        return _unpack(*self.client.call(request), self.embedding_dim)
+
+    def get_dimension(self) -> int:
+        return self.embedding_dim
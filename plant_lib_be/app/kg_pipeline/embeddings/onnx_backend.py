@@ -0,0 +1,210 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from app.kg_pipeline.config import get_logger, settings
+
+logger = get_logger(__name__)
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+META_FILE = "meta.json"
+
+
+def onnx_model_dir(model_name: str) -> Path:
+    return Path(settings.embedding.onnx_dir).expanduser() / model_name.replace("/", "__")
+
+
+def _session(model_dir: Path, quantized: bool):
+    import onnxruntime as ort
+
+    path = model_dir / (INT8_FILE if quantized else FP32_FILE)
+    if quantized and not path.exists():
+        logger.warning(f"No quantized model in {model_dir}, using fp32")
+        path = model_dir / FP32_FILE
+    if not path.exists():
+        raise FileNotFoundError(
+            f"ONNX model not found at {path}; run python -m app.kg_pipeline.cli.onnx_embeddings export"
+        )
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if settings.embedding.onnx_threads > 0:
+        options.intra_op_num_threads = settings.embedding.onnx_threads
+    logger.info(f"Loading ONNX model {path}")
+    return ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+
+def _quantize(model_dir: Path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(str(model_dir / FP32_FILE), str(model_dir / INT8_FILE), weight_type=QuantType.QInt8)
+    logger.info(f"Quantized {model_dir / INT8_FILE}")
+
+
+class OnnxTextEncoder:
+    def __init__(self, model_dir: Path, quantized: bool = True):
+        from transformers import AutoTokenizer
+
+        with open(model_dir / META_FILE, encoding="utf-8") as handle:
+            self.meta = json.load(handle)
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        self.session = _session(model_dir, quantized)
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.dim = self.meta["dim"]
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        tokens = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.meta["max_seq_length"],
+            return_tensors="np",
+        )
+        feeds = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        if self.meta["pooling"] == "cls":
+            embeddings = token_embeddings[:, 0]
+        elif self.meta["pooling"] == "max":
+            embeddings = np.where(mask > 0, token_embeddings, -1e9).max(axis=1)
+        else:
+            embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.meta.get("normalize"):
+            embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=-1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32).tolist()
+
+
+class OnnxImageEncoder:
+    def __init__(self, model_dir: Path, quantized: bool = True):
+        from transformers import CLIPImageProcessor
+
+        with open(model_dir / META_FILE, encoding="utf-8") as handle:
+            self.meta = json.load(handle)
+        self.processor = CLIPImageProcessor.from_pretrained(str(model_dir))
+        self.session = _session(model_dir, quantized)
+        self.dim = self.meta["dim"]
+
+    def encode(self, images) -> List[List[float]]:
+        pixel_values = self.processor(images=images, return_tensors="np")["pixel_values"].astype(np.float32)
+        embeddings = self.session.run(None, {"pixel_values": pixel_values})[0]
+        embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=-1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32).tolist()
+
+
+def _pooling_meta(model) -> Dict:
+    pooling = "mean"
+    normalize = False
+    for module in model:
+        name = type(module).__name__
+        if name == "Pooling":
+            config = module.get_config_dict()
+            if config.get("pooling_mode_cls_token"):
+                pooling = "cls"
+            elif config.get("pooling_mode_max_tokens"):
+                pooling = "max"
+        elif name == "Normalize":
+            normalize = True
+    return {"pooling": pooling, "normalize": normalize}
+
+
+def export_text_model(model_name: str, quantize: bool = True) -> Path:
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model_dir = onnx_model_dir(model_name)
+    model_dir.mkdir(parents=True, exist_ok=True)
+
+    sentence_model = SentenceTransformer(model_name, device="cpu")
+    transformer = sentence_model[0].auto_model.eval()
+    tokenizer = sentence_model.tokenizer
+    sample = tokenizer(["cây lúa bị lá vàng"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self, wrapped):
+            super().__init__()
+            self.wrapped = wrapped
+
+        def forward(self, *inputs):
+            return self.wrapped(**dict(zip(input_names, inputs))).last_hidden_state
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(transformer),
+            tuple(sample[name] for name in input_names),
+            str(model_dir / FP32_FILE),
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+        )
+    tokenizer.save_pretrained(str(model_dir))
+
+    meta = {
+        "model": model_name,
+        "kind": "text",
+        "dim": sentence_model.get_sentence_embedding_dimension(),
+        "max_seq_length": sentence_model.max_seq_length,
+        **_pooling_meta(sentence_model),
+    }
+    with open(model_dir / META_FILE, "w", encoding="utf-8") as handle:
+        json.dump(meta, handle, indent=2)
+    logger.info(f"Exported text model {model_name} to {model_dir / FP32_FILE}")
+
+    if quantize:
+        _quantize(model_dir)
+    return model_dir
+
+
+def export_image_model(model_name: str, quantize: bool = True) -> Path:
+    import torch
+    from transformers import CLIPImageProcessor, CLIPVisionModelWithProjection
+
+    model_dir = onnx_model_dir(model_name)
+    model_dir.mkdir(parents=True, exist_ok=True)
+
+    vision = CLIPVisionModelWithProjection.from_pretrained(model_name).eval()
+    processor = CLIPImageProcessor.from_pretrained(model_name)
+    size = processor.crop_size["height"]
+
+    class ImageEmbeds(torch.nn.Module):
+        def __init__(self, wrapped):
+            super().__init__()
+            self.wrapped = wrapped
+
+        def forward(self, pixel_values):
+            return self.wrapped(pixel_values=pixel_values).image_embeds
+
+    with torch.no_grad():
+        torch.onnx.export(
+            ImageEmbeds(vision),
+            (torch.zeros(1, 3, size, size),),
+            str(model_dir / FP32_FILE),
+            input_names=["pixel_values"],
+            output_names=["image_embeds"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+            opset_version=17,
+        )
+    processor.save_pretrained(str(model_dir))
+
+    meta = {"model": model_name, "kind": "image", "dim": vision.config.projection_dim}
+    with open(model_dir / META_FILE, "w", encoding="utf-8") as handle:
+        json.dump(meta, handle, indent=2)
+    logger.info(f"Exported image model {model_name} to {model_dir / FP32_FILE}")
+
+    if quantize:
+        _quantize(model_dir)
+    return model_dir
+
+
+def model_size_mb(model_dir: Path, quantized: bool) -> float:
+    path = model_dir / (INT8_FILE if quantized else FP32_FILE)
+    return os.path.getsize(path) / 1024 / 1024 if path.exists() else 0.0
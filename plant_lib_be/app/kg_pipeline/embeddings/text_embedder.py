@@ -1,24 +1,57 @@
-from typing import List
+from typing import List, Optional
 
 import torch
 from sentence_transformers import SentenceTransformer
 
 from app.kg_pipeline.config import get_logger, settings
+from app.kg_pipeline.embeddings.batcher import MicroBatcher
+from app.kg_pipeline.embeddings.cache import EmbeddingCache, cache_text
+from app.kg_pipeline.embeddings.onnx_backend import OnnxTextEncoder, onnx_model_dir
 
 logger = get_logger(__name__)
 
 
 class TextEmbedder:
-    def __init__(self):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Loading text embedding model: {settings.embedding.text_model}")
+    def __init__(self, backend: str | None = None):
+        self.backend = backend or settings.embedding.text_backend
+        logger.info(f"Loading text embedding model: {settings.embedding.text_model} ({self.backend})")
 
-        self.model = SentenceTransformer(settings.embedding.text_model)
-        self.model.to(self.device)
+        if self.backend == "onnx":
+            self.device = "cpu"
+            self.model = OnnxTextEncoder(
+                onnx_model_dir(settings.embedding.text_model),
+                quantized=settings.embedding.onnx_quantized,
+            )
+            self.embedding_dim = self.model.dim
+        else:
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.model = SentenceTransformer(settings.embedding.text_model)
+            self.model.to(self.device)
+            self.embedding_dim = self.model.get_sentence_embedding_dimension()
 
-        self.embedding_dim = self.model.get_sentence_embedding_dimension()
+        self.batcher = None
+        if settings.embedding.text_micro_batching:
+            self.batcher = MicroBatcher(
+                self._encode,
+                max_batch=settings.embedding.text_batch_size,
+                max_wait_ms=settings.embedding.text_batch_max_wait_ms,
+                name="text",
+            )
+        self.cache = None
+        if settings.embedding.text_cache_enabled:
+            self.cache = EmbeddingCache(
+                self._cache_model_name(),
+                self.embedding_dim,
+                max_mb=settings.embedding.text_cache_max_mb,
+                path=settings.embedding.text_cache_path or None,
+            )
         logger.info(f"Text embedder initialized (dim: {self.embedding_dim}, device: {self.device})")
 
+    def _cache_model_name(self) -> str:
+        if self.backend == "onnx":
+            return f"{settings.embedding.text_model}:onnx{'-int8' if settings.embedding.onnx_quantized else ''}"
+        return settings.embedding.text_model
+
     def _validate_text(self, text: str) -> str:
         if not text:
             raise ValueError("Empty text provided")
@@ -33,31 +66,30 @@ class TextEmbedder:
 
         text = text.encode("utf-8", errors="ignore").decode("utf-8")
         text = text.replace("\x00", "")
-        return text
+        return cache_text(text)
 
     def embed(self, text: str) -> List[float]:
         text = self._validate_text(text)
-        with torch.no_grad():
-            embedding = self.model.encode(
-                text,
-                convert_to_tensor=True,
-                device=self.device,
-                show_progress_bar=False,
-            )
-            return embedding.cpu().tolist()
+        if self.cache is not None:
+            cached = self.cache.get(text)
+            if cached is not None:
+                return cached.tolist()
 
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        validated_texts: List[str] = []
-        for text in texts:
-            try:
-                validated_texts.append(self._validate_text(text))
-            except ValueError as exc:
-                logger.warning(f"Skipping invalid text: {exc}")
-                validated_texts.append("")
+        if self.batcher is not None:
+            vector = self.batcher.submit(text).result()
+        else:
+            vector = self._encode([text])[0]
+
+        if self.cache is not None:
+            self.cache.put(text, vector)
+        return vector
 
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        if self.backend == "onnx":
+            return self.model.encode(texts)
         with torch.no_grad():
             embeddings = self.model.encode(
-                validated_texts,
+                texts,
                 convert_to_tensor=True,
                 device=self.device,
                 show_progress_bar=False,
@@ -65,5 +97,58 @@ class TextEmbedder:
             )
             return embeddings.cpu().tolist()
 
+    def _encode_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        if self.batcher is not None:
+            vectors = []
+            for future in self.batcher.map(texts):
+                try:
+                    vectors.append(future.result())
+                except Exception as exc:
+                    logger.warning(f"Failed to embed text: {exc}")
+                    vectors.append(None)
+            return vectors
+
+        try:
+            return self._encode(texts)
+        except Exception as exc:
+            logger.warning(f"Batch text embedding failed, retrying per item: {exc}")
+            vectors = []
+            for text in texts:
+                try:
+                    vectors.append(self._encode([text])[0])
+                except Exception as item_exc:
+                    logger.warning(f"Failed to embed text: {item_exc}")
+                    vectors.append(None)
+            return vectors
+
+    def embed_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        valid: List[tuple[int, str]] = []
+        for index, text in enumerate(texts):
+            try:
+                valid.append((index, self._validate_text(text)))
+            except ValueError as exc:
+                logger.warning(f"Skipping invalid text: {exc}")
+
+        if self.cache is not None:
+            misses = []
+            for index, text in valid:
+                cached = self.cache.get(text)
+                if cached is not None:
+                    embeddings[index] = cached.tolist()
+                else:
+                    misses.append((index, text))
+            valid = misses
+
+        if not valid:
+            return embeddings
+
+        vectors = self._encode_many([text for _, text in valid])
+        for (index, text), vector in zip(valid, vectors):
+            embeddings[index] = vector
+            if self.cache is not None and vector is not None:
+                self.cache.put(text, vector)
+        return embeddings
+
     def get_dimension(self) -> int:
         return self.embedding_dim
@@ -0,0 +1,3 @@
+from app.kg_pipeline.graph.client import GraphClient
+
+__all__ = ["GraphClient"]
@@ -0,0 +1,212 @@
+import time
+from typing import Any, Dict, List, Tuple
+
+from neo4j import READ_ACCESS, WRITE_ACCESS, AsyncGraphDatabase, GraphDatabase
+
+from app.core.metrics import NEO4J_QUERY_SECONDS, NEO4J_ROWS, NEO4J_TRUNCATED_QUERIES, register_neo4j_driver
+from app.kg_pipeline.config import get_logger, settings
+
+logger = get_logger(__name__)
+
+BASE_ENTITY_LABEL = "__Entity__"
+EXCLUDED_LABELS = ["_Bloom_Perspective_", "_Bloom_Scene_"]
+EXCLUDED_RELS = ["_Bloom_HAS_SCENE_"]
+
+NODE_PROPERTIES_QUERY = """
+CALL apoc.meta.data()
+YIELD label, other, elementType, type, property
+WHERE NOT type = "RELATIONSHIP" AND elementType = "node"
+  AND NOT label IN $EXCLUDED_LABELS
+WITH label AS nodeLabels, collect({property:property, type:type}) AS properties
+RETURN {labels: nodeLabels, properties: properties} AS output
+"""
+
+REL_PROPERTIES_QUERY = """
+CALL apoc.meta.data()
+YIELD label, other, elementType, type, property
+WHERE NOT type = "RELATIONSHIP" AND elementType = "relationship"
+      AND NOT label in $EXCLUDED_LABELS
+WITH label AS nodeLabels, collect({property:property, type:type}) AS properties
+RETURN {type: nodeLabels, properties: properties} AS output
+"""
+
+REL_QUERY = """
+CALL apoc.meta.data()
+YIELD label, other, elementType, type, property
+WHERE type = "RELATIONSHIP" AND elementType = "node"
+UNWIND other AS other_node
+WITH * WHERE NOT label IN $EXCLUDED_LABELS
+    AND NOT other_node IN $EXCLUDED_LABELS
+RETURN {start: label, type: property, end: toString(other_node)} AS output
+"""
+
+DATA_VERSION_QUERY = """
+MATCH (m:KGMeta {key: 'data_version'})
+RETURN m.version AS version
+"""
+
+BUMP_DATA_VERSION_QUERY = """
+MERGE (m:KGMeta {key: 'data_version'})
+SET m.version = coalesce(m.version, 0) + 1, m.updated_at = datetime()
+RETURN m.version AS version
+"""
+
+
+def _format_properties(name: str, properties: List[Dict[str, Any]]) -> str:
+    props = ", ".join(f"{prop['property']}: {prop['type']}" for prop in properties)
+    return f"{name} {{{props}}}"
+
+
+def format_schema(node_props: Dict, rel_props: Dict, relationships: List[Dict]) -> str:
+    return "\n".join(
+        [
+            "Node properties:",
+            "\n".join(_format_properties(label, props) for label, props in node_props.items()),
+            "Relationship properties:",
+            "\n".join(_format_properties(rel_type, props) for rel_type, props in rel_props.items()),
+            "The relationships:",
+            "\n".join(f"(:{el['start']})-[:{el['type']}]->(:{el['end']})" for el in relationships),
+        ]
+    )
+
+
+def _collect(result, max_rows: int) -> Tuple[List[Dict[str, Any]], bool]:
+    rows = []
+    for record in result:
+        rows.append(record.data())
+        if max_rows and len(rows) >= max_rows:
+            truncated = result.peek() is not None
+            result.consume()
+            return rows, truncated
+    return rows, False
+
+
+async def _acollect(result, max_rows: int) -> Tuple[List[Dict[str, Any]], bool]:
+    rows = []
+    async for record in result:
+        rows.append(record.data())
+        if max_rows and len(rows) >= max_rows:
+            truncated = await result.peek() is not None
+            await result.consume()
+            return rows, truncated
+    return rows, False
+
+
+class GraphClient:
+    def __init__(
+        self,
+        url: str | None = None,
+        username: str | None = None,
+        password: str | None = None,
+        database: str | None = None,
+    ):
+        config = settings.neo4j
+        auth = (username or config.username, password or config.password)
+        driver_config = {
+            "max_connection_pool_size": config.max_pool_size,
+            "connection_acquisition_timeout": config.acquisition_timeout_seconds,
+        }
+        self.url = url or config.url
+        self.database = database or config.database
+        self.fetch_size = config.fetch_size
+        self.max_rows = config.max_rows
+        self.driver = GraphDatabase.driver(self.url, auth=auth, **driver_config)
+        self.async_driver = AsyncGraphDatabase.driver(self.url, auth=auth, **driver_config)
+        self.driver.verify_connectivity()
+        register_neo4j_driver("sync", self.driver, config.max_pool_size)
+        register_neo4j_driver("async", self.async_driver, config.max_pool_size)
+
+        self.schema = ""
+        self.structured_schema: Dict[str, Any] = {}
+        self.refresh_schema()
+        logger.info(
+            f"Neo4j graph client ready: {self.url} (pool {config.max_pool_size}, fetch_size {self.fetch_size})"
+        )
+
+    def _session_config(self, write: bool) -> Dict[str, Any]:
+        return {
+            "database": self.database,
+            "default_access_mode": WRITE_ACCESS if write else READ_ACCESS,
+            "fetch_size": self.fetch_size,
+        }
+
+    def _observe(self, write: bool, start: float, rows: int, truncated: bool, max_rows: int):
+        access = "write" if write else "read"
+        NEO4J_QUERY_SECONDS.labels(access).observe(time.perf_counter() - start)
+        NEO4J_ROWS.labels(access).observe(rows)
+        if truncated:
+            NEO4J_TRUNCATED_QUERIES.inc()
+            logger.warning(f"Neo4j result truncated to {max_rows} rows")
+
+    def query(
+        self, query: str, params: Dict[str, Any] | None = None, max_rows: int | None = None, write: bool = False
+    ) -> List[Dict[str, Any]]:
+        max_rows = self.max_rows if max_rows is None else max_rows
+        start = time.perf_counter()
+        with self.driver.session(**self._session_config(write)) as session:
+            execute = session.execute_write if write else session.execute_read
+            rows, truncated = execute(lambda tx: _collect(tx.run(query, params or {}), max_rows))
+        self._observe(write, start, len(rows), truncated, max_rows)
+        return rows
+
+    async def aquery(
+        self, query: str, params: Dict[str, Any] | None = None, max_rows: int | None = None, write: bool = False
+    ) -> List[Dict[str, Any]]:
+        max_rows = self.max_rows if max_rows is None else max_rows
+        start = time.perf_counter()
+
+        async def work(tx):
+            return await _acollect(await tx.run(query, params or {}), max_rows)
+
+        async with self.async_driver.session(**self._session_config(write)) as session:
+            execute = session.execute_write if write else session.execute_read
+            rows, truncated = await execute(work)
+        self._observe(write, start, len(rows), truncated, max_rows)
+        return rows
+
+    def profile(self, query: str, params: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        with self.driver.session(**self._session_config(False)) as session:
+            summary = session.execute_read(lambda tx: tx.run(f"PROFILE {query}", params or {}).consume())
+        return summary.profile or {}
+
+    def refresh_schema(self):
+        excluded_labels = {"EXCLUDED_LABELS": EXCLUDED_LABELS + [BASE_ENTITY_LABEL]}
+        node_properties = [el["output"] for el in self.query(NODE_PROPERTIES_QUERY, excluded_labels, max_rows=0)]
+        rel_properties = [
+            el["output"] for el in self.query(REL_PROPERTIES_QUERY, {"EXCLUDED_LABELS": EXCLUDED_RELS}, max_rows=0)
+        ]
+        relationships = [el["output"] for el in self.query(REL_QUERY, excluded_labels, max_rows=0)]
+
+        self.structured_schema = {
+            "node_props": {el["labels"]: el["properties"] for el in node_properties},
+            "rel_props": {el["type"]: el["properties"] for el in rel_properties},
+            "relationships": relationships,
+        }
+        self.schema = format_schema(
+            self.structured_schema["node_props"],
+            self.structured_schema["rel_props"],
+            relationships,
+        )
+
+    def data_version(self) -> int:
+        rows = self.query(DATA_VERSION_QUERY, max_rows=1)
+        return rows[0]["version"] if rows and rows[0]["version"] is not None else 0
+
+    async def adata_version(self) -> int:
+        rows = await self.aquery(DATA_VERSION_QUERY, max_rows=1)
+        return rows[0]["version"] if rows and rows[0]["version"] is not None else 0
+
+    def bump_data_version(self) -> int:
+        version = self.query(BUMP_DATA_VERSION_QUERY, write=True)[0]["version"]
+        logger.info(f"Graph data version bumped to {version}")
+        return version
+
+    @property
+    def get_schema(self) -> str:
+        return self.schema
+
+    def close(self):
+        self.driver.close()
+
+    async def aclose(self):
+        await self.async_driver.close()
@@ -1,11 +1,30 @@
+import asyncio
+import copy
+import hashlib
 import os
 import time
-from typing import Any, Dict, Optional
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+from app.core.metrics import COALESCED_QUERIES, QUERY_CACHE_REQUESTS
+from app.kg_pipeline.agents.clarifier import apply_image_results
+from app.kg_pipeline.agents.slow_query_log import chat_context, current_chat_id
 from app.kg_pipeline.config.logging_config import get_logger
+from app.kg_pipeline.config.settings import settings
+from app.kg_pipeline.utils.singleflight import AsyncSingleFlight, SingleFlight
+from app.kg_pipeline.utils.timing import StageTimer, timed
 
 logger = get_logger(__name__)
 
+IMAGE_SEARCH_QUERY = """
+CALL db.index.vector.queryNodes('image_vector', 5, $image_embedding)
+YIELD node as img, score
+MATCH (d:Disease)-[:HAS_IMAGE]->(img)
+MATCH (c:Crop)<-[:AFFECTED_BY]-(d)
+RETURN c.name AS crop_name, d.name AS disease_name, score
+ORDER BY score DESC LIMIT 3
+"""
+
 
 class Pipeline:
     def __init__(
@@ -16,6 +35,7 @@ class Pipeline:
         agent4_synthesizer,
         session_manager,
         embedder,
+        planner=None,
     ):
         self.agent1 = agent1_clarifier
         self.agent2 = agent2_cypher
@@ -23,7 +43,214 @@ class Pipeline:
         self.agent4 = agent4_synthesizer
         self.session_manager = session_manager
         self.embedder = embedder
-        logger.info("Multi-agent pipeline initialized")
+        self.planner = planner if settings.pipeline.mode == "combined" else None
+        self.coalesce = settings.pipeline.coalesce_queries
+        self.inflight = SingleFlight()
+        self.ainflight = AsyncSingleFlight()
+        logger.info(f"Multi-agent pipeline initialized (mode={'combined' if self.planner else 'sequential'})")
+
+    @staticmethod
+    def _coalesce_key(query: str, image_path: Optional[str]) -> str:
+        normalized = " ".join(query.lower().split())
+        image_digest = ""
+        if image_path and os.path.exists(image_path):
+            digest = hashlib.sha256()
+            with open(image_path, "rb") as image_file:
+                for block in iter(lambda: image_file.read(1 << 16), b""):
+                    digest.update(block)
+            image_digest = digest.hexdigest()
+        return f"{normalized}|{image_digest}"
+
+    @staticmethod
+    def _new_result(query: str, image_path: Optional[str]) -> Dict[str, Any]:
+        return {
+            "query": query,
+            "image_path": image_path,
+            "answer": "",
+            "success": False,
+            "from_cache": False,
+            "pipeline": {},
+            "metadata": {},
+        }
+
+    @staticmethod
+    def _apply_synthesis(
+        result: Dict[str, Any],
+        synthesis_result: Dict[str, Any],
+        start_time: float,
+        timer: StageTimer,
+    ) -> int:
+        result["pipeline"]["synthesis"] = synthesis_result
+        result["answer"] = synthesis_result["answer"]
+        result["success"] = synthesis_result["success"]
+        result["metadata"] = synthesis_result["metadata"]
+
+        processing_time = int((time.time() - start_time) * 1000)
+        result["metadata"]["processing_time_ms"] = processing_time
+        result["metadata"]["timings"] = timer.timings
+        return processing_time
+
+    @staticmethod
+    def _apply_cache_hit(cached_result: Dict[str, Any], timer: StageTimer) -> Dict[str, Any]:
+        cached_result["from_cache"] = True
+        cached_result.setdefault("metadata", {})["timings"] = timer.timings
+        cached_result["metadata"]["chat_id"] = None
+        return cached_result
+
+    @staticmethod
+    def _record_cache_lookup(cached_result: Optional[Dict[str, Any]]):
+        QUERY_CACHE_REQUESTS.labels("hit" if cached_result else "miss").inc()
+
+    @staticmethod
+    def _history_kwargs(
+        chat_id: str,
+        session: Dict,
+        query: str,
+        image_path: Optional[str],
+        clarification: Dict,
+        result: Dict[str, Any],
+        processing_time: int,
+    ) -> Dict[str, Any]:
+        return {
+            "id": chat_id,
+            "session_id": session["id"],
+            "user_id": session["user_id"],
+            "query": query,
+            "answer": result["answer"],
+            "query_language": clarification.get("language", "vi"),
+            "intent": clarification.get("intent", "unknown"),
+            "answer_language": result["metadata"].get("original_language", "vi"),
+            "pipeline_data": result["pipeline"],
+            "image_path": image_path,
+            "total_results": result["metadata"].get("total_results", 0),
+            "processing_time": processing_time,
+            "from_cache": False,
+        }
+
+    def _search_image(self, image_path: Optional[str]) -> List[Dict[str, Any]]:
+        if not (image_path and os.path.exists(image_path)):
+            return []
+        logger.info("Processing image")
+        try:
+            with timed("image_embed"):
+                image_embedding = self.embedder.embed(image_path)
+            with timed("image_search"):
+                return self.agent3.query(IMAGE_SEARCH_QUERY, {"image_embedding": image_embedding})
+        except Exception as exc:
+            logger.warning(f"Image processing failed: {exc}")
+            return []
+
+    async def _asearch_image(self, image_path: Optional[str]) -> List[Dict[str, Any]]:
+        if not (image_path and os.path.exists(image_path)):
+            return []
+        logger.info("Processing image")
+        try:
+            with timed("image_embed"):
+                image_embedding = await asyncio.to_thread(self.embedder.embed, image_path)
+            with timed("image_search"):
+                return await self.agent3.aquery(IMAGE_SEARCH_QUERY, {"image_embedding": image_embedding})
+        except Exception as exc:
+            logger.warning(f"Image processing failed: {exc}")
+            return []
+
+    def _plan(self, query: str, image_path: Optional[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        if self.planner is not None:
+            image_results = self._search_image(image_path)
+            logger.info("Agents 1+2: Planning query in a single call")
+            return self.planner.plan(query, image_results)
+
+        logger.info("Agent 1: Clarifying query")
+        with timed("clarify"):
+            clarification = self.agent1.clarify(query)
+        apply_image_results(clarification, self._search_image(image_path))
+
+        logger.info("Agent 2: Generating Cypher")
+        return clarification, self.agent2.generate_cypher(clarification)
+
+    async def _aplan(self, query: str, image_path: Optional[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        if self.planner is not None:
+            image_results = await self._asearch_image(image_path)
+            logger.info("Agents 1+2: Planning query in a single call")
+            return await self.planner.aplan(query, image_results)
+
+        logger.info("Agent 1: Clarifying query")
+        with timed("clarify"):
+            clarification = await self.agent1.aclarify(query)
+        apply_image_results(clarification, await self._asearch_image(image_path))
+
+        logger.info("Agent 2: Generating Cypher")
+        return clarification, await self.agent2.agenerate_cypher(clarification)
+
+    def _run_agents(self, query: str, image_path: Optional[str]) -> Dict[str, Any]:
+        clarification, cypher_result = self._plan(query, image_path)
+
+        logger.info("Agent 3: Retrieving information")
+        retrieval_result = self.agent3.retrieve(cypher_result)
+
+        logger.info("Agent 4: Synthesizing answer")
+        synthesis_result = self.agent4.synthesize(clarification, retrieval_result)
+
+        return {
+            "clarification": clarification,
+            "cypher": cypher_result,
+            "retrieval": retrieval_result,
+            "synthesis": synthesis_result,
+        }
+
+    async def _arun_agents(self, query: str, image_path: Optional[str]) -> Dict[str, Any]:
+        clarification, cypher_result = await self._aplan(query, image_path)
+
+        logger.info("Agent 3: Retrieving information")
+        retrieval_result = await self.agent3.aretrieve(cypher_result)
+
+        logger.info("Agent 4: Synthesizing answer")
+        synthesis_result = await self.agent4.asynthesize(clarification, retrieval_result)
+
+        return {
+            "clarification": clarification,
+            "cypher": cypher_result,
+            "retrieval": retrieval_result,
+            "synthesis": synthesis_result,
+        }
+
+    def _run_shared(self, query: str, image_path: Optional[str]) -> Dict[str, Any]:
+        with StageTimer().activate() as shared_timer:
+            stages = self._run_agents(query, image_path)
+        return {"stages": stages, "timings": shared_timer.timings, "chat_id": current_chat_id()}
+
+    async def _arun_shared(self, query: str, image_path: Optional[str]) -> Dict[str, Any]:
+        with StageTimer().activate() as shared_timer:
+            stages = await self._arun_agents(query, image_path)
+        return {"stages": stages, "timings": shared_timer.timings, "chat_id": current_chat_id()}
+
+    @staticmethod
+    def _join(run: Dict[str, Any], shared: bool, timer: StageTimer) -> Tuple[Dict[str, Any], bool]:
+        timer.merge(run["timings"])
+        stages = copy.deepcopy(run["stages"])
+        if shared:
+            COALESCED_QUERIES.inc()
+            logger.info(f"Joined identical in-flight query of chat {run['chat_id']}")
+            # Truy vấn Neo4j (và slow-query log) thuộc về chat dẫn đầu
+            stages["coalesced_with"] = run["chat_id"]
+        return stages, shared
+
+    def _coalesced(self, query: str, image_path: Optional[str], timer: StageTimer) -> Tuple[Dict[str, Any], bool]:
+        if not self.coalesce:
+            return self._run_agents(query, image_path), False
+        run, shared = self.inflight.do(
+            self._coalesce_key(query, image_path),
+            lambda: self._run_shared(query, image_path),
+        )
+        return self._join(run, shared, timer)
+
+    async def _acoalesced(
+        self, query: str, image_path: Optional[str], timer: StageTimer
+    ) -> Tuple[Dict[str, Any], bool]:
+        if not self.coalesce:
+            return await self._arun_agents(query, image_path), False
+        key = await asyncio.to_thread(self._coalesce_key, query, image_path)
+        run, shared = await self.ainflight.do(key, lambda: self._arun_shared(query, image_path))
+        return self._join(run, shared, timer)
 
     def process_query(
         self,
@@ -38,108 +265,252 @@ class Pipeline:
         if image_path:
             logger.info(f"With image: {os.path.basename(image_path)}")
 
-        result: Dict[str, Any] = {
-            "query": query,
-            "image_path": image_path,
-            "answer": "",
-            "success": False,
-            "from_cache": False,
-            "pipeline": {},
-            "metadata": {},
-        }
+        result = self._new_result(query, image_path)
 
-        try:
-            session = self.session_manager.get_session(session_token)
-            if not session:
-                logger.error("Invalid or expired session token")
-                result["answer"] = "Invalid or expired session"
+        chat_id = str(uuid.uuid4())
+        with StageTimer().activate() as timer, chat_context(chat_id):
+            try:
+                with timed("session_lookup"):
+                    session = self.session_manager.get_session(session_token)
+                if not session:
+                    logger.error("Invalid or expired session token")
+                    result["answer"] = "Invalid or expired session"
+                    result["success"] = False
+                    return result
+
+                session_id = session["id"]
+
+                if use_cache:
+                    with timed("cache_lookup"):
+                        cached_result = self.session_manager.get_cached_query(session_id, query, image_path)
+                    self._record_cache_lookup(cached_result)
+                    if cached_result:
+                        logger.info("Using cached result")
+                        return self._apply_cache_hit(cached_result, timer)
+
+                stages, shared = self._coalesced(query, image_path, timer)
+                clarification = stages["clarification"]
+                synthesis_result = stages["synthesis"]
+                result["pipeline"]["clarification"] = clarification
+                result["pipeline"]["cypher"] = stages["cypher"]
+                result["pipeline"]["retrieval"] = stages["retrieval"]
+                if shared:
+                    result["pipeline"]["coalesced_with"] = stages["coalesced_with"]
+                processing_time = self._apply_synthesis(result, synthesis_result, start_time, timer)
+                result["metadata"]["chat_id"] = chat_id
+                result["metadata"]["coalesced"] = shared
+                result["metadata"]["clarifier"] = self.agent1.fast_path_stats(clarification)
+
+                with timed("history_write"):
+                    self.session_manager.queue_chat_history(
+                        **self._history_kwargs(
+                            chat_id, session, query, image_path, clarification, result, processing_time
+                        )
+                    )
+
+                if use_cache:
+                    with timed("cache_write"):
+                        self.session_manager.queue_cached_query(
+                            session_id=session_id,
+                            query=query,
+                            result=result,
+                            image_path=image_path,
+                        )
+
+                logger.info(f"Query processing completed in {processing_time}ms")
+                return result
+
+            except Exception as exc:
+                result["answer"] = f"Xin lỗi, đã xảy ra lỗi: {str(exc)}"
                 result["success"] = False
+                logger.error(f"Pipeline failed: {exc}", exc_info=True)
                 return result
 
-            session_id = session["id"]
-            user_id = session["user_id"]
+    async def aprocess_query(
+        self,
+        session_token: str,
+        query: str,
+        image_path: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
+        start_time = time.time()
 
-            if use_cache:
-                cached_result = self.session_manager.get_cached_query(session_id, query, image_path)
-                if cached_result:
-                    logger.info("Using cached result")
-                    cached_result["from_cache"] = True
-                    return cached_result
+        logger.info(f"Processing query: {query[:80]}...")
+        if image_path:
+            logger.info(f"With image: {os.path.basename(image_path)}")
 
-            logger.info("Agent 1: Clarifying query")
-            clarification = self.agent1.clarify(query)
-            result["pipeline"]["clarification"] = clarification
-
-            if image_path and os.path.exists(image_path):
-                logger.info("Processing image")
-                try:
-                    image_embedding = self.embedder.embed(image_path)
-                    image_results = self.agent3.graph.query(
-                        """
-                        CALL db.index.vector.queryNodes('image_vector', 5, $image_embedding)
-                        YIELD node as img, score
-                        MATCH (d:Disease)-[:HAS_IMAGE]->(img)
-                        MATCH (c:Crop)<-[:AFFECTED_BY]-(d)
-                        RETURN c.name AS crop_name, d.name AS disease_name, score
-                        ORDER BY score DESC LIMIT 3
-                        """,
-                        {"image_embedding": image_embedding},
+        result = self._new_result(query, image_path)
+
+        chat_id = str(uuid.uuid4())
+        with StageTimer().activate() as timer, chat_context(chat_id):
+            try:
+                with timed("session_lookup"):
+                    session = await asyncio.to_thread(self.session_manager.get_session, session_token)
+                if not session:
+                    logger.error("Invalid or expired session token")
+                    result["answer"] = "Invalid or expired session"
+                    result["success"] = False
+                    return result
+
+                session_id = session["id"]
+
+                if use_cache:
+                    with timed("cache_lookup"):
+                        cached_result = await asyncio.to_thread(
+                            self.session_manager.get_cached_query, session_id, query, image_path
+                        )
+                    self._record_cache_lookup(cached_result)
+                    if cached_result:
+                        logger.info("Using cached result")
+                        return self._apply_cache_hit(cached_result, timer)
+
+                stages, shared = await self._acoalesced(query, image_path, timer)
+                clarification = stages["clarification"]
+                synthesis_result = stages["synthesis"]
+                result["pipeline"]["clarification"] = clarification
+                result["pipeline"]["cypher"] = stages["cypher"]
+                result["pipeline"]["retrieval"] = stages["retrieval"]
+                if shared:
+                    result["pipeline"]["coalesced_with"] = stages["coalesced_with"]
+                processing_time = self._apply_synthesis(result, synthesis_result, start_time, timer)
+                result["metadata"]["chat_id"] = chat_id
+                result["metadata"]["coalesced"] = shared
+                result["metadata"]["clarifier"] = self.agent1.fast_path_stats(clarification)
+
+                with timed("history_write"):
+                    await asyncio.to_thread(
+                        self.session_manager.queue_chat_history,
+                        **self._history_kwargs(
+                            chat_id, session, query, image_path, clarification, result, processing_time
+                        ),
                     )
 
-                    if image_results:
-                        image_context = ", ".join([f"{r['disease_name']} ({r['crop_name']})" for r in image_results])
-                        clarification["clarified_query"] += f"\nDựa trên hình ảnh, có thể là: {image_context}"
-                        logger.info(f"Found {len(image_results)} image matches")
-                except Exception as exc:
-                    logger.warning(f"Image processing failed: {exc}")
-
-            logger.info("Agent 2: Generating Cypher")
-            cypher_result = self.agent2.generate_cypher(clarification)
-            result["pipeline"]["cypher"] = cypher_result
-
-            logger.info("Agent 3: Retrieving information")
-            retrieval_result = self.agent3.retrieve(cypher_result)
-            result["pipeline"]["retrieval"] = retrieval_result
-
-            logger.info("Agent 4: Synthesizing answer")
-            synthesis_result = self.agent4.synthesize(clarification, retrieval_result)
-            result["pipeline"]["synthesis"] = synthesis_result
-
-            result["answer"] = synthesis_result["answer"]
-            result["success"] = synthesis_result["success"]
-            result["metadata"] = synthesis_result["metadata"]
-
-            processing_time = int((time.time() - start_time) * 1000)
-            result["metadata"]["processing_time_ms"] = processing_time
-
-            self.session_manager.save_chat_history(
-                session_id=session_id,
-                user_id=user_id,
-                query=query,
-                answer=result["answer"],
-                query_language=clarification.get("language", "vi"),
-                intent=clarification.get("intent", "unknown"),
-                answer_language=result["metadata"].get("original_language", "vi"),
-                pipeline_data=result["pipeline"],
-                image_path=image_path,
-                total_results=result["metadata"].get("total_results", 0),
-                processing_time=processing_time,
-                from_cache=False,
-            )
-
-            if use_cache:
-                self.session_manager.set_cached_query(
-                    session_id=session_id,
-                    query=query,
-                    result=result,
-                    image_path=image_path,
-                )
-
-            logger.info(f"Query processing completed in {processing_time}ms")
-            return result
+                if use_cache:
+                    with timed("cache_write"):
+                        await asyncio.to_thread(
+                            self.session_manager.queue_cached_query,
+                            session_id=session_id,
+                            query=query,
+                            result=result,
+                            image_path=image_path,
+                        )
 
-        except Exception as exc:
-            result["answer"] = f"Xin lỗi, đã xảy ra lỗi: {str(exc)}"
-            result["success"] = False
-            logger.error(f"Pipeline failed: {exc}", exc_info=True)
-            return result
+                logger.info(f"Query processing completed in {processing_time}ms")
+                return result
+
+            except Exception as exc:
+                result["answer"] = f"Xin lỗi, đã xảy ra lỗi: {str(exc)}"
+                result["success"] = False
+                logger.error(f"Pipeline failed: {exc}", exc_info=True)
+                return result
+
+    async def astream_query(
+        self,
+        session_token: str,
+        query: str,
+        image_path: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        start_time = time.time()
+
+        logger.info(f"Streaming query: {query[:80]}...")
+        if image_path:
+            logger.info(f"With image: {os.path.basename(image_path)}")
+
+        result = self._new_result(query, image_path)
+
+        chat_id = str(uuid.uuid4())
+        with StageTimer().activate() as timer, chat_context(chat_id):
+            try:
+                with timed("session_lookup"):
+                    session = await asyncio.to_thread(self.session_manager.get_session, session_token)
+                if not session:
+                    logger.error("Invalid or expired session token")
+                    yield "error", {"message": "Invalid or expired session"}
+                    return
+
+                session_id = session["id"]
+
+                if use_cache:
+                    with timed("cache_lookup"):
+                        cached_result = await asyncio.to_thread(
+                            self.session_manager.get_cached_query, session_id, query, image_path
+                        )
+                    self._record_cache_lookup(cached_result)
+                    if cached_result:
+                        logger.info("Using cached result")
+                        cached_result = self._apply_cache_hit(cached_result, timer)
+                        yield "token", {"text": cached_result.get("answer", "")}
+                        yield "done", self._stream_summary(cached_result)
+                        return
+
+                clarification, cypher_result = await self._aplan(query, image_path)
+                result["pipeline"]["clarification"] = clarification
+                result["pipeline"]["cypher"] = cypher_result
+
+                yield "clarified", {
+                    "intent": clarification.get("intent"),
+                    "entities": clarification.get("entities", {}),
+                    "clarified_query": clarification.get("clarified_query"),
+                    "search_strategy": clarification.get("search_strategy"),
+                    "language": clarification.get("language"),
+                }
+
+                yield "cypher", {
+                    "count_query": cypher_result.get("count_query", ""),
+                    "result_query": cypher_result.get("result_query", ""),
+                    "requires_embeddings": cypher_result.get("requires_embeddings", False),
+                }
+
+                retrieval_result = await self.agent3.aretrieve(cypher_result)
+                result["pipeline"]["retrieval"] = retrieval_result
+                yield "retrieved", {
+                    "rows": len(retrieval_result["results"]),
+                    "total_count": retrieval_result["total_count"],
+                    "success": retrieval_result["success"],
+                }
+
+                synthesis_result = None
+                async for event in self.agent4.astream(clarification, retrieval_result):
+                    if event["type"] == "token":
+                        yield "token", {"text": event["text"]}
+                    else:
+                        synthesis_result = event["result"]
+                processing_time = self._apply_synthesis(result, synthesis_result, start_time, timer)
+                result["metadata"]["chat_id"] = chat_id
+                result["metadata"]["clarifier"] = self.agent1.fast_path_stats(clarification)
+
+                with timed("history_write"):
+                    await asyncio.to_thread(
+                        self.session_manager.queue_chat_history,
+                        **self._history_kwargs(
+                            chat_id, session, query, image_path, clarification, result, processing_time
+                        ),
+                    )
+
+                if use_cache:
+                    with timed("cache_write"):
+                        await asyncio.to_thread(
+                            self.session_manager.queue_cached_query,
+                            session_id=session_id,
+                            query=query,
+                            result=result,
+                            image_path=image_path,
+                        )
+
+                logger.info(f"Query streaming completed in {processing_time}ms")
+                yield "done", self._stream_summary(result)
+
+            except Exception as exc:
+                logger.error(f"Streaming pipeline failed: {exc}", exc_info=True)
+                yield "error", {"message": f"Xin lỗi, đã xảy ra lỗi: {str(exc)}"}
+
+    @staticmethod
+    def _stream_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "answer": result.get("answer", ""),
+            "success": result.get("success", False),
+            "from_cache": result.get("from_cache", False),
+            "chat_id": result.get("metadata", {}).get("chat_id"),
+            "metadata": result.get("metadata", {}),
+        }
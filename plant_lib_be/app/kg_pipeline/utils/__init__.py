@@ -1,5 +1,5 @@
 from app.kg_pipeline.utils.helpers import APIKeyManager
-from app.kg_pipeline.utils.retry import retry_with_backoff
+from app.kg_pipeline.utils.retry import async_retry_with_backoff, retry_with_backoff
 from app.kg_pipeline.utils.translator import Translator
 
-__all__ = ["APIKeyManager", "retry_with_backoff", "Translator"]
+__all__ = ["APIKeyManager", "async_retry_with_backoff", "retry_with_backoff", "Translator"]
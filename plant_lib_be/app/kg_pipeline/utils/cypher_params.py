@@ -0,0 +1,156 @@
+import re
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.core.metrics import CYPHER_QUERY_TEXT_REPEATS
+from app.kg_pipeline.config.logging_config import get_logger
+from app.kg_pipeline.utils.result_budget import has_top_level_order_by
+
+logger = get_logger(__name__)
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+FUSED_COUNT_KEY = "__kg_total_count"
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "'": "'", '"': '"', "\\": "\\"}
+
+
+def _read_string(query: str, start: int) -> Tuple[str, int]:
+    quote = query[start]
+    chars = []
+    i = start + 1
+    while i < len(query):
+        char = query[i]
+        if char == "\\" and i + 1 < len(query):
+            escaped = query[i + 1]
+            if escaped == "u" and i + 6 <= len(query):
+                chars.append(chr(int(query[i + 2 : i + 6], 16)))
+                i += 6
+                continue
+            chars.append(ESCAPES.get(escaped, escaped))
+            i += 2
+            continue
+        if char == quote:
+            return "".join(chars), i + 1
+        chars.append(char)
+        i += 1
+    raise ValueError("Unterminated string literal")
+
+
+def parameterize(query: str, reserved: Iterable[str] = ()) -> Tuple[str, Dict[str, Any]]:
+    taken = set(reserved) | set(re.findall(r"\$([A-Za-z_][A-Za-z0-9_]*)", query))
+    params: Dict[str, Any] = {}
+    names: Dict[Tuple[type, Any], str] = {}
+    counter = 0
+
+    def bind(value: Any) -> str:
+        nonlocal counter
+        key = (type(value), value)
+        if key not in names:
+            while f"p{counter}" in taken:
+                counter += 1
+            name = f"p{counter}"
+            taken.add(name)
+            names[key] = name
+            params[name] = value
+        return f"${names[key]}"
+
+    out = []
+    i = 0
+    in_var_length = False
+    while i < len(query):
+        char = query[i]
+
+        if char in "'\"":
+            try:
+                value, end = _read_string(query, i)
+            except ValueError:
+                logger.warning("Cypher parameterization skipped: unterminated string literal")
+                return query, {}
+            out.append(bind(value))
+            i = end
+        elif query.startswith("//", i):
+            end = query.find("\n", i)
+            end = len(query) if end == -1 else end
+            out.append(query[i:end])
+            i = end
+        elif query.startswith("/*", i):
+            end = query.find("*/", i + 2)
+            end = len(query) if end == -1 else end + 2
+            out.append(query[i:end])
+            i = end
+        elif char == "`":
+            end = query.find("`", i + 1)
+            end = len(query) if end == -1 else end + 1
+            out.append(query[i:end])
+            i = end
+        elif char == "$":
+            match = IDENTIFIER_RE.match(query, i + 1)
+            end = match.end() if match else i + 1
+            out.append(query[i:end])
+            i = end
+        elif IDENTIFIER_RE.match(query, i):
+            match = IDENTIFIER_RE.match(query, i)
+            out.append(match.group())
+            i = match.end()
+            in_var_length = False
+        elif char.isdigit():
+            match = NUMBER_RE.match(query, i)
+            text = match.group()
+            if in_var_length:
+                out.append(text)
+            else:
+                is_float = any(c in text for c in ".eE")
+                out.append(bind(float(text) if is_float else int(text)))
+            i = match.end()
+        else:
+            if char == "*":
+                in_var_length = True
+            elif char not in ". \t\n":
+                in_var_length = False
+            out.append(char)
+            i += 1
+
+    return "".join(out), params
+
+
+def fuse_count_query(count_query: str, result_query: str) -> Optional[str]:
+    count_query = count_query.strip().rstrip(";").strip()
+    result_query = result_query.strip().rstrip(";").strip()
+    # RETURN * bên ngoài CALL {} không giữ thứ tự của ORDER BY bên trong
+    if has_top_level_order_by(result_query):
+        return None
+    return (
+        f"CALL {{\n{count_query}\n}}\n"
+        f"WITH head(collect(total_count)) AS {FUSED_COUNT_KEY}\n"
+        f"CALL {{\n{result_query}\n}}\n"
+        "RETURN *"
+    )
+
+
+class QueryTextTracker:
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.seen: "OrderedDict[str, None]" = OrderedDict()
+        self.lock = Lock()
+        self.repeats = 0
+        self.lookups = 0
+
+    @property
+    def repeat_rate(self) -> float:
+        return self.repeats / self.lookups if self.lookups else 0.0
+
+    def observe(self, query: str) -> bool:
+        key = " ".join(query.split())
+        with self.lock:
+            self.lookups += 1
+            repeat = key in self.seen
+            if repeat:
+                self.repeats += 1
+                self.seen.move_to_end(key)
+            else:
+                self.seen[key] = None
+                if len(self.seen) > self.capacity:
+                    self.seen.popitem(last=False)
+        CYPHER_QUERY_TEXT_REPEATS.labels("repeat" if repeat else "new").inc()
+        return repeat
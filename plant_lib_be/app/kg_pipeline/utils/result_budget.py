@@ -0,0 +1,164 @@
+import json
+import re
+from typing import Any, Dict, List, Sequence
+
+from app.kg_pipeline.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+KEYWORD_RE = re.compile(r"\b(RETURN|UNION|LIMIT)\b", re.IGNORECASE)
+ORDER_BY_RE = re.compile(r"\bORDER\s+BY\b", re.IGNORECASE)
+LIMIT_VALUE_RE = re.compile(r"LIMIT\s+(\d+)\b", re.IGNORECASE)
+GROUP_KEYS = ("disease_name", "disease")
+
+
+def _mask(query: str) -> str:
+    out = []
+    i = 0
+    while i < len(query):
+        char = query[i]
+        if char in "'\"`":
+            end = i + 1
+            while end < len(query) and query[end] != char:
+                end += 2 if query[end] == "\\" and char != "`" else 1
+            end = min(end + 1, len(query))
+            out.append(char + " " * (end - i - 2) + query[end - 1] if end - i >= 2 else char)
+            i = end
+        elif query.startswith("//", i):
+            end = query.find("\n", i)
+            end = len(query) if end == -1 else end
+            out.append(" " * (end - i))
+            i = end
+        elif query.startswith("/*", i):
+            end = query.find("*/", i + 2)
+            end = len(query) if end == -1 else end + 2
+            out.append(" " * (end - i))
+            i = end
+        else:
+            out.append(char)
+            i += 1
+    return "".join(out)
+
+
+def _top_level_keywords(masked: str, pattern: re.Pattern = KEYWORD_RE) -> List[re.Match]:
+    depth = 0
+    depths = []
+    for char in masked:
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        depths.append(depth)
+    return [match for match in pattern.finditer(masked) if depths[match.start()] == 0]
+
+
+def has_top_level_order_by(query: str) -> bool:
+    return bool(_top_level_keywords(_mask(query), ORDER_BY_RE))
+
+
+def inject_limit(query: str, limit: int) -> str:
+    if limit <= 0:
+        return query
+    query = query.strip().rstrip(";").rstrip()
+    masked = _mask(query)
+    keywords = _top_level_keywords(masked)
+
+    if any(match.group(1).upper() == "UNION" for match in keywords):
+        return f"CALL {{\n{query}\n}}\nRETURN *\nLIMIT {limit}"
+
+    returns = [match for match in keywords if match.group(1).upper() == "RETURN"]
+    if not returns:
+        return query
+
+    limits = [match for match in keywords if match.group(1).upper() == "LIMIT" and match.start() > returns[-1].start()]
+    if not limits:
+        return f"{query}\nLIMIT {limit}"
+
+    value = LIMIT_VALUE_RE.match(masked, limits[-1].start())
+    if value and int(value.group(1)) > limit:
+        return f"{query[: value.start(1)]}{limit}{query[value.end(1) :]}"
+    return query
+
+
+def _compact_value(value: Any, max_chars: int, max_items: int) -> Any:
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        return value if len(value) <= max_chars else value[: max_chars - 1].rstrip() + "…"
+    if isinstance(value, dict):
+        compacted = {k: _compact_value(v, max_chars, max_items) for k, v in value.items()}
+        return {k: v for k, v in compacted.items() if v not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        items = []
+        seen = set()
+        for item in value:
+            item = _compact_value(item, max_chars, max_items)
+            if item in (None, "", [], {}):
+                continue
+            key = json.dumps(item, ensure_ascii=False, sort_keys=True, default=str)
+            if key in seen:
+                continue
+            seen.add(key)
+            items.append(item)
+            if len(items) >= max_items:
+                break
+        return items
+    return value
+
+
+def compact_rows(rows: Sequence[Dict[str, Any]], max_chars: int, max_items: int) -> List[Dict[str, Any]]:
+    compacted = []
+    seen = set()
+    for row in rows:
+        row = _compact_value(dict(row), max_chars, max_items)
+        key = json.dumps(row, ensure_ascii=False, sort_keys=True, default=str)
+        if row and key not in seen:
+            seen.add(key)
+            compacted.append(row)
+    return compacted
+
+
+def _merge(existing: Any, value: Any, max_items: int) -> Any:
+    if existing == value or value is None:
+        return existing
+    if existing is None:
+        return value
+    if isinstance(existing, (int, float)) and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return max(existing, value)
+
+    merged = list(existing) if isinstance(existing, list) else [existing]
+    for item in value if isinstance(value, list) else [value]:
+        if item not in merged and len(merged) < max_items:
+            merged.append(item)
+    return merged
+
+
+def group_by_disease(rows: Sequence[Dict[str, Any]], max_items: int) -> List[Dict[str, Any]]:
+    groups: Dict[str, Dict[str, Any]] = {}
+    grouped: List[Dict[str, Any]] = []
+    for row in rows:
+        key_field = next((field for field in GROUP_KEYS if isinstance(row.get(field), str)), None)
+        if key_field is None:
+            grouped.append(row)
+            continue
+
+        key = f"{key_field}:{row[key_field].lower()}"
+        if key not in groups:
+            groups[key] = dict(row)
+            grouped.append(groups[key])
+            continue
+        group = groups[key]
+        for field, value in row.items():
+            if field != key_field:
+                group[field] = _merge(group.get(field), value, max_items)
+    return grouped
+
+
+def shape_results(
+    rows: Sequence[Dict[str, Any]], max_chars: int, max_items: int, group: bool = True
+) -> List[Dict[str, Any]]:
+    shaped = compact_rows(rows, max_chars, max_items)
+    if group:
+        shaped = group_by_disease(shaped, max_items)
+    if len(shaped) != len(rows):
+        logger.debug(f"Result rows shaped from {len(rows)} to {len(shaped)}")
+    return shaped
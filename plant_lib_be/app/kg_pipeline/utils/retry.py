@@ -1,3 +1,4 @@
+import asyncio
 import time
 from functools import wraps
 
@@ -29,3 +30,28 @@ def retry_with_backoff(max_retries: int = 3, base_delay: float = 1.0):
         return wrapper
 
     return decorator
+
+
+def async_retry_with_backoff(max_retries: int = 3, base_delay: float = 1.0):
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            last_exception = None
+            for attempt in range(max_retries):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as exc:
+                    last_exception = exc
+                    if attempt < max_retries - 1:
+                        wait_time = base_delay * (2**attempt)
+                        logger.warning(
+                            f"Attempt {attempt + 1}/{max_retries} failed for {func.__name__}: {str(exc)[:100]}. "
+                            f"Retrying in {wait_time}s..."
+                        )
+                        await asyncio.sleep(wait_time)
+            logger.error(f"{func.__name__} failed after {max_retries} attempts")
+            raise last_exception
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,20 @@
+import unicodedata
+
+
+def fold_char(char: str) -> str:
+    if char in ("đ", "Đ"):
+        return "d"
+    base = unicodedata.normalize("NFD", char)[0]
+    return base.lower()
+
+
+def fold_accents(text: str) -> str:
+    return "".join(fold_char(char) for char in unicodedata.normalize("NFC", text))
+
+
+def has_diacritics(text: str) -> bool:
+    return fold_accents(text) != unicodedata.normalize("NFC", text).lower()
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).lower().split())
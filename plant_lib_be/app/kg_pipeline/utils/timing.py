@@ -0,0 +1,41 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from app.core.metrics import STAGE_LATENCY
+
+_current_timer: ContextVar[Optional["StageTimer"]] = ContextVar("kg_stage_timer", default=None)
+
+
+class StageTimer:
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    def record(self, name: str, elapsed_ms: float):
+        self.timings[name] = round(self.timings.get(name, 0.0) + elapsed_ms, 2)
+
+    def merge(self, timings: Dict[str, float]):
+        for name, elapsed_ms in timings.items():
+            self.record(name, elapsed_ms)
+
+    @contextmanager
+    def activate(self):
+        token = _current_timer.set(self)
+        try:
+            yield self
+        finally:
+            _current_timer.reset(token)
+
+
+@contextmanager
+def timed(name: str, metric_stage: str | None = None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(metric_stage or name).observe(elapsed)
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.record(name, elapsed * 1000)
@@ -1,9 +1,9 @@
-from typing import Tuple
+from typing import AsyncIterator, Tuple
 
 from langdetect import DetectorFactory, detect
 
 from app.kg_pipeline.config import get_logger, settings
-from app.kg_pipeline.utils.retry import retry_with_backoff
+from app.kg_pipeline.utils.retry import async_retry_with_backoff, retry_with_backoff
 
 DetectorFactory.seed = 0
 logger = get_logger(__name__)
@@ -24,18 +24,20 @@ class Translator:
             logger.warning(f"Language detection failed: {exc}")
             return self.data_language
 
+    def _build_prompt(self, text: str, target_lang: str, context: str) -> str:
+        if context == "query":
+            return f"Translate to {target_lang} (Vietnamese), keep technical terms:\n{text}\n\nTranslation:"
+        if context == "response":
+            return f"Translate to {target_lang}, maintain formatting:\n{text}\n\nTranslation:"
+        return f"Translate to {target_lang}: {text}"
+
     @retry_with_backoff(max_retries=3)
     def translate(self, text: str, target_lang: str, context: str = "general") -> str:
         cache_key = f"{text}:{target_lang}:{context}"
         if cache_key in self.cache:
             return self.cache[cache_key]
 
-        if context == "query":
-            prompt = f"Translate to {target_lang} (Vietnamese), keep technical terms:\n{text}\n\nTranslation:"
-        elif context == "response":
-            prompt = f"Translate to {target_lang}, maintain formatting:\n{text}\n\nTranslation:"
-        else:
-            prompt = f"Translate to {target_lang}: {text}"
+        prompt = self._build_prompt(text, target_lang, context)
 
         try:
             response = self.llm.invoke(prompt)
@@ -46,6 +48,36 @@ class Translator:
             logger.error(f"Translation failed: {exc}")
             return text
 
+    @async_retry_with_backoff(max_retries=3)
+    async def atranslate(self, text: str, target_lang: str, context: str = "general") -> str:
+        cache_key = f"{text}:{target_lang}:{context}"
+        if cache_key in self.cache:
+            return self.cache[cache_key]
+
+        prompt = self._build_prompt(text, target_lang, context)
+
+        try:
+            response = await self.llm.ainvoke(prompt)
+            translated = response.content.strip()
+            self.cache[cache_key] = translated
+            return translated
+        except Exception as exc:
+            logger.error(f"Translation failed: {exc}")
+            return text
+
+    async def astream_translate(self, text: str, target_lang: str, context: str = "general") -> AsyncIterator[str]:
+        cache_key = f"{text}:{target_lang}:{context}"
+        if cache_key in self.cache:
+            yield self.cache[cache_key]
+            return
+
+        parts = []
+        async for chunk in self.llm.astream(self._build_prompt(text, target_lang, context)):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+        self.cache[cache_key] = "".join(parts).strip()
+
     def process_query(self, query: str, force_translate: bool | None = None) -> Tuple[str, str]:
         detected_lang = self.detect_language(query)
         should_translate = force_translate if force_translate is not None else self.auto_translate
@@ -63,6 +95,23 @@ class Translator:
         logger.debug(f"Translating response: {self.data_language} -> {target_lang}")
         return self.translate(response, target_lang, context="response")
 
+    async def aprocess_query(self, query: str, force_translate: bool | None = None) -> Tuple[str, str]:
+        detected_lang = self.detect_language(query)
+        should_translate = force_translate if force_translate is not None else self.auto_translate
+
+        if should_translate and detected_lang != self.data_language:
+            logger.debug(f"Translating query: {detected_lang} -> {self.data_language}")
+            translated_query = await self.atranslate(query, self.data_language, context="query")
+            return translated_query, detected_lang
+
+        return query, detected_lang
+
+    async def atranslate_response(self, response: str, target_lang: str) -> str:
+        if target_lang == self.data_language:
+            return response
+        logger.debug(f"Translating response: {self.data_language} -> {target_lang}")
+        return await self.atranslate(response, target_lang, context="response")
+
     def clear_cache(self):
         self.cache.clear()
         logger.info("Translation cache cleared")
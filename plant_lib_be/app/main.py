@@ -4,12 +4,13 @@ from pathlib import Path
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 
 from app.api.routes.diseases import router as diseases_router
 from app.api.routes.crops import router as crops_router
-from app.api.routes.kg_pipeline import router as kg_router
+from app.api.routes.metrics import router as metrics_router
 from app.api.routes.upload import router as upload_router
+from app.core.config import settings
 
 app = FastAPI(title="Plant Lib API")
 
@@ -60,13 +61,59 @@ def get_image(filename: str):
 
     return FileResponse(str(file_path))
 
+@app.on_event("startup")
+def warm_kg_pipeline():
+    if not settings.KG_ENABLED:
+        return
+    from app.kg_pipeline import start_warmup
+    from app.kg_pipeline.config import settings as kg_settings
+
+    if kg_settings.pipeline.warmup_on_startup:
+        start_warmup()
+
+@app.on_event("shutdown")
+def flush_kg_writes():
+    if not settings.KG_ENABLED:
+        return
+    from app.kg_pipeline.database import session_manager
+
+    session_manager.shutdown()
+
 # Health
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready():
+    if not settings.KG_ENABLED:
+        return {"ready": True, "status": "disabled", "components": {}}
+    from app.kg_pipeline import readiness
+    from app.kg_pipeline.config import settings as kg_settings
+
+    report = readiness()
+    if report["ready"]:
+        return report
+    return JSONResponse(
+        report,
+        status_code=503,
+        headers={"Retry-After": str(kg_settings.pipeline.warmup_retry_after_seconds)},
+    )
+
 # Routers
 app.include_router(crops_router)
 app.include_router(diseases_router)
-app.include_router(kg_router)
 app.include_router(upload_router)
+app.include_router(metrics_router)
+
+if settings.KG_ENABLED:
+    from app.api.routes.kg_pipeline import router as kg_router
+    from app.kg_pipeline.config import settings as kg_settings
+
+    app.include_router(kg_router)
+
+    # gunicorn --preload: nạp model ở master trước khi fork để các worker dùng chung (copy-on-write)
+    if kg_settings.embedding.serving == "preload":
+        from app.kg_pipeline import preload_embedders
+
+        preload_embedders()
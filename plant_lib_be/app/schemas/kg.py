@@ -70,3 +70,21 @@ class KGChatHistoryItem(BaseModel):
 
 class KGChatHistoryOut(BaseModel):
     items: list[KGChatHistoryItem]
+
+
+class KGSlowQueryItem(BaseModel):
+    query_hash: str
+    query_kind: str
+    query_text: str
+    executions: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+    max_db_hits: Optional[int] = None
+    last_seen: Optional[str] = None
+    chat_ids: list[str] = []
+    plan: Optional[Dict[str, Any]] = None
+
+
+class KGSlowQueryOut(BaseModel):
+    items: list[KGSlowQueryItem]
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import hmac
+
 from fastapi import HTTPException, status
 from sqlalchemy.exc import IntegrityError
 
-from app.kg_pipeline import get_pipeline_bundle
+from app.kg_pipeline import PipelineWarmingUp, get_ready_bundle
+from app.kg_pipeline.config import settings as kg_settings
 from app.kg_pipeline.database import session_manager
 from app.kg_pipeline.database.models import User
 
@@ -18,11 +21,12 @@ class KGPipelineService:
         if self.pipeline is not None:
             return
         try:
-            bundle = get_pipeline_bundle()
-        except Exception as exc:
+            bundle = get_ready_bundle()
+        except PipelineWarmingUp as exc:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"KG pipeline init failed: {exc}",
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(exc),
+                headers={"Retry-After": str(kg_settings.pipeline.warmup_retry_after_seconds)},
             )
         self.pipeline = bundle.pipeline
         # session_manager từ bundle có thể khác? dùng chung để đồng bộ
@@ -79,6 +83,12 @@ class KGPipelineService:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
         return {"deleted": True}
 
+    def list_slow_queries(self, admin_token: str, limit: int = 20, hours: int = 24):
+        expected = kg_settings.slow_query.admin_token
+        if not expected or not hmac.compare_digest(admin_token.encode(), expected.encode()):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+        return self.sessions.get_slow_query_offenders(limit=limit, since_hours=hours)
+
     def process_query(self, session_token: str, query: str, image_path: str | None, use_cache: bool = True):
         self._ensure_pipeline()
         return self.pipeline.process_query(
@@ -87,3 +97,21 @@ class KGPipelineService:
             image_path=image_path,
             use_cache=use_cache,
         )
+
+    async def aprocess_query(self, session_token: str, query: str, image_path: str | None, use_cache: bool = True):
+        self._ensure_pipeline()
+        return await self.pipeline.aprocess_query(
+            session_token=session_token,
+            query=query,
+            image_path=image_path,
+            use_cache=use_cache,
+        )
+
+    def astream_query(self, session_token: str, query: str, image_path: str | None, use_cache: bool = True):
+        self._ensure_pipeline()
+        return self.pipeline.astream_query(
+            session_token=session_token,
+            query=query,
+            image_path=image_path,
+            use_cache=use_cache,
+        )